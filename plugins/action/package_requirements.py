@@ -0,0 +1,123 @@
+#
+# package_requirements.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Install merged package requirements in one transaction per host."""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from ansible.plugins.action import ActionBase
+
+# os_family -> (requirements key, package module)
+MANAGERS = {
+    "debian": ("apt", "ansible.builtin.apt"),
+    "redhat": ("dnf", "ansible.builtin.dnf"),
+    "archlinux": ("pacman", "community.general.pacman"),
+}
+PACMAN_SYNC_DIR = "/var/lib/pacman/sync"
+
+ARGUMENT_SPEC = {
+    "requirements": {"type": "list", "elements": "dict", "required": True},
+    "cache_valid_time": {"type": "int", "default": 3600},
+}
+
+
+def merge_requirements(requirements: list[dict[str, Any]], manager: str) -> list[str]:
+    """
+    Merge the package lists of one manager across several `pkgs` dictionaries.
+
+    Order of first appearance is kept and duplicates are dropped.
+    """
+    merged: dict[str, None] = {}
+    for pkgs in requirements:
+        names = (pkgs or {}).get(manager) or []
+        if isinstance(names, str):
+            names = [names]
+        for name in names:
+            merged.setdefault(name, None)
+    return list(merged)
+
+
+class ActionModule(ActionBase):  # type: ignore[misc]
+    TRANSFERS_FILES = False
+
+    def _pacman_cache_stale(
+        self, task_vars: dict[str, Any], cache_valid_time: int
+    ) -> bool:
+        """Return whether the pacman sync databases are older than cache_valid_time."""
+        stat = self._execute_module(
+            module_name="ansible.builtin.stat",
+            module_args={"path": PACMAN_SYNC_DIR, "get_checksum": False},
+            task_vars=task_vars,
+        )
+        if not stat.get("stat", {}).get("exists"):
+            return True
+        return bool(time.time() - stat["stat"]["mtime"] > cache_valid_time)
+
+    def run(
+        self, tmp: str | None = None, task_vars: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        task_vars = task_vars or {}
+        result: dict[str, Any] = super().run(tmp, task_vars)
+        del tmp
+
+        _validation, args = self.validate_argument_spec(argument_spec=ARGUMENT_SPEC)
+
+        facts = task_vars.get("ansible_facts", {})
+        os_family = str(facts.get("os_family", "")).lower()
+        if os_family not in MANAGERS:
+            result.update(
+                skipped=True, msg=f"Unsupported os_family: {os_family or 'unknown'}"
+            )
+            return result
+
+        manager, module_name = MANAGERS[os_family]
+        # Always pass the full list: the package modules skip installed
+        # packages cheaply, and a list remembered across runs goes stale.
+        pending = merge_requirements(args["requirements"], manager)
+        result.update(changed=False, manager=manager, packages=pending)
+        if not pending:
+            result["msg"] = f"No {manager} requirements"
+            return result
+
+        cache_valid_time = args["cache_valid_time"]
+        module_args: dict[str, Any] = {"state": "present"}
+        if manager == "apt":
+            module_args.update(
+                pkg=pending, update_cache=True, cache_valid_time=cache_valid_time
+            )
+        elif manager == "dnf":
+            module_args["name"] = pending
+        else:
+            module_args.update(
+                name=pending,
+                update_cache=self._pacman_cache_stale(task_vars, cache_valid_time),
+            )
+
+        module_result = self._execute_module(
+            module_name=module_name, module_args=module_args, task_vars=task_vars
+        )
+        if module_result.get("failed"):
+            result.update(failed=True, msg=module_result.get("msg", ""))
+            return result
+
+        result["changed"] = module_result.get("changed", False)
+        return result
@@ -0,0 +1,246 @@
+#
+# task_profile.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Per-task, per-task-file and per-host timings with a hot-spot report."""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+import time
+from collections import defaultdict
+from typing import Any
+
+from ansible.plugins.callback import CallbackBase
+
+DOCUMENTATION = r"""
+---
+name: task_profile
+type: aggregate
+short_description: Record task, task file, role and host durations
+description:
+    - Records the duration of every task on every host, including C(include_tasks) and C(include_role) tasks.
+    - Aggregates the durations by role and by task file so time spent in helper includes can be told apart from actual compiles.
+    - Prints the slowest task files and tasks when the playbook ends and optionally writes a JSON and CSV summary.
+    - Only monotonic clock reads and dictionary updates happen while tasks run, so it can be left enabled.
+version_added: "1.0.0"
+author:
+    - Jared Cook
+requirements:
+    - Enable in C(callbacks_enabled) in ansible.cfg.
+options:
+    output_dir:
+        description: Directory receiving C(<playbook>-<timestamp>.json) and C(.csv) summaries. Nothing is written when unset.
+        type: path
+        env:
+            - name: JCOOK3701_TASK_PROFILE_DIR
+        ini:
+            - section: callback_task_profile
+              key: output_dir
+    output_format:
+        description: Summary files to write to C(output_dir).
+        type: str
+        default: both
+        choices: ["json", "csv", "both"]
+        env:
+            - name: JCOOK3701_TASK_PROFILE_FORMAT
+        ini:
+            - section: callback_task_profile
+              key: output_format
+    top:
+        description: Number of rows in each table printed at the end of the playbook. C(0) disables the tables.
+        type: int
+        default: 10
+        env:
+            - name: JCOOK3701_TASK_PROFILE_TOP
+        ini:
+            - section: callback_task_profile
+              key: top
+"""
+
+CSV_FIELDS = ["task", "role", "file", "action", "host", "seconds", "status"]
+
+
+class CallbackModule(CallbackBase):  # type: ignore[misc]
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = "aggregate"
+    CALLBACK_NAME = "jcook3701.utils.task_profile"
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self, display: Any = None) -> None:
+        super().__init__(display=display)
+        self.output_dir: str | None = None
+        self.output_format = "both"
+        self.top = 10
+        self.playbook = "playbook"
+        self.play_start = time.monotonic()
+        # task uuid -> task details; (task uuid, host) -> start time
+        self.tasks: dict[str, dict[str, Any]] = {}
+        self.started: dict[tuple[str, str], float] = {}
+        self.records: list[dict[str, Any]] = []
+
+    def set_options(
+        self,
+        task_keys: Any = None,
+        var_options: Any = None,
+        direct: Any = None,
+    ) -> None:
+        super().set_options(task_keys=task_keys, var_options=var_options, direct=direct)
+        self.output_dir = self.get_option("output_dir")
+        self.output_format = self.get_option("output_format")
+        self.top = self.get_option("top")
+
+    def v2_playbook_on_start(self, playbook: Any) -> None:
+        self.playbook = os.path.splitext(os.path.basename(playbook._file_name))[0]
+        self.play_start = time.monotonic()
+
+    def _task_info(self, task: Any) -> dict[str, Any]:
+        uuid = task._uuid
+        info = self.tasks.get(uuid)
+        if info is None:
+            path = task.get_path() or ""
+            role = task._role.get_name() if task._role else ""
+            info = {
+                "task": task.get_name(),
+                "role": role,
+                "file": path.rsplit(":", 1)[0],
+                "action": task.action,
+            }
+            self.tasks[uuid] = info
+        return info
+
+    def v2_runner_on_start(self, host: Any, task: Any) -> None:
+        self._task_info(task)
+        self.started[(task._uuid, host.get_name())] = time.monotonic()
+
+    def _record(self, result: Any, status: str) -> None:
+        task = result._task
+        host = result._host.get_name()
+        start = self.started.pop((task._uuid, host), None)
+        if start is None:
+            return
+        record = dict(self._task_info(task))
+        record.update(host=host, seconds=time.monotonic() - start, status=status)
+        self.records.append(record)
+
+    def v2_runner_on_ok(self, result: Any) -> None:
+        self._record(result, "ok")
+
+    def v2_runner_on_failed(self, result: Any, ignore_errors: bool = False) -> None:
+        self._record(result, "failed")
+
+    def v2_runner_on_skipped(self, result: Any) -> None:
+        self._record(result, "skipped")
+
+    def v2_runner_on_unreachable(self, result: Any) -> None:
+        self._record(result, "unreachable")
+
+    def summary(self) -> dict[str, Any]:
+        """Aggregate the recorded durations by task, task file, role and host."""
+        tasks: dict[str, dict[str, Any]] = {}
+        files: dict[str, float] = defaultdict(float)
+        roles: dict[str, float] = defaultdict(float)
+        hosts: dict[str, float] = defaultdict(float)
+        includes: dict[str, float] = defaultdict(float)
+
+        for record in self.records:
+            seconds = record["seconds"]
+            key = f"{record['file']}: {record['task']}"
+            entry = tasks.setdefault(
+                key,
+                {
+                    "task": record["task"],
+                    "role": record["role"],
+                    "file": record["file"],
+                    "action": record["action"],
+                    "count": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                },
+            )
+            entry["count"] += 1
+            entry["total"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            files[record["file"]] += seconds
+            roles[record["role"] or "(play)"] += seconds
+            hosts[record["host"]] += seconds
+            if record["action"].endswith(("include_tasks", "include_role")):
+                includes[record["file"]] += seconds
+
+        def ranked(values: dict[str, float]) -> list[dict[str, Any]]:
+            return [
+                {"name": name, "seconds": round(seconds, 6)}
+                for name, seconds in sorted(
+                    values.items(), key=lambda item: item[1], reverse=True
+                )
+            ]
+
+        return {
+            "playbook": self.playbook,
+            "wall_seconds": round(time.monotonic() - self.play_start, 6),
+            "tasks": sorted(tasks.values(), key=lambda t: t["total"], reverse=True),
+            "files": ranked(files),
+            "roles": ranked(roles),
+            "hosts": ranked(hosts),
+            "includes": ranked(includes),
+        }
+
+    def _write(self, summary: dict[str, Any]) -> None:
+        if not self.output_dir:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(
+            self.output_dir, f"{self.playbook}-{time.strftime('%Y%m%dT%H%M%S')}"
+        )
+        if self.output_format in ("json", "both"):
+            with open(f"{base}.json", "w") as f:
+                json.dump(summary, f, indent=2)
+        if self.output_format in ("csv", "both"):
+            with open(f"{base}.csv", "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+                writer.writeheader()
+                for record in self.records:
+                    writer.writerow({field: record[field] for field in CSV_FIELDS})
+
+    def _table(self, title: str, rows: list[tuple[str, float]]) -> None:
+        self._display.banner(title)
+        for name, seconds in rows[: self.top]:
+            self._display.display(f"{seconds:10.2f}s  {name}")
+
+    def v2_playbook_on_stats(self, stats: Any) -> None:
+        summary = self.summary()
+        self._write(summary)
+        if self.top <= 0:
+            return
+        self._table(
+            "TASK FILES",
+            [(entry["name"], entry["seconds"]) for entry in summary["files"]],
+        )
+        self._table(
+            "ROLES",
+            [(entry["name"], entry["seconds"]) for entry in summary["roles"]],
+        )
+        self._table(
+            "TASKS",
+            [
+                (f"{task['file']}: {task['task']} (x{task['count']})", task["total"])
+                for task in summary["tasks"]
+            ],
+        )
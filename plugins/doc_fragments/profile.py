@@ -0,0 +1,36 @@
+#
+# profile.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+class ModuleDocFragment:
+    DOCUMENTATION = r"""
+options:
+    _profile:
+        description:
+            - Return phase timings and the peak RSS of the module process under C(metrics).
+            - Also enabled by setting C(JCOOK3701_PROFILE=1) in the module environment.
+        type: bool
+        default: false
+    _profile_top:
+        description:
+            - Run the module under cProfile and return the N functions with the highest cumulative time under C(metrics.cprofile).
+            - Also set by C(JCOOK3701_PROFILE_TOP). C(0) disables cProfile.
+        type: int
+        default: 0
+"""
@@ -0,0 +1,174 @@
+#
+# alternatives.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Read the dpkg alternatives database and apply only the missing changes."""
+
+from __future__ import annotations
+
+import os
+from typing import Any, TypedDict
+
+from ansible.module_utils.basic import AnsibleModule
+
+ADMIN_DIR = "/var/lib/dpkg/alternatives"
+ALTERNATIVES_DIR = "/etc/alternatives"
+DEFAULT_PRIORITY = 50
+
+# argument_spec suboptions of a single alternative
+ALTERNATIVE_OPTIONS: dict[str, Any] = {
+    "name": {"type": "str", "required": True},
+    "link": {"type": "path", "required": True},
+    "path": {"type": "path", "required": True},
+    "priority": {"type": "int", "default": DEFAULT_PRIORITY},
+    "manual": {"type": "bool", "default": False},
+}
+
+
+class AlternativeState(TypedDict):
+    status: str
+    link: str
+    value: str | None
+    # alternative path -> priority
+    choices: dict[str, int]
+
+
+def parse_admin_file(text: str) -> AlternativeState:
+    """
+    Parse an alternatives administrative file.
+
+    The file holds the status, the master link and the slave name/link pairs
+    up to a blank line, then for each alternative its path, its priority and
+    one (possibly empty) line per slave, terminated by a blank line.
+    """
+    lines = text.split("\n")
+    status, link = lines[0], lines[1]
+    i = 2
+    slaves = 0
+    while i < len(lines) and lines[i]:
+        slaves += 1
+        i += 2
+    i += 1
+
+    choices: dict[str, int] = {}
+    while i + 1 < len(lines) and lines[i]:
+        choices[lines[i]] = int(lines[i + 1])
+        i += 2 + slaves
+    return {"status": status, "link": link, "value": None, "choices": choices}
+
+
+def read_state(
+    name: str, admin_dir: str = ADMIN_DIR, alternatives_dir: str = ALTERNATIVES_DIR
+) -> AlternativeState | None:
+    """Return the registered state of an alternative, or None if it is unknown."""
+    try:
+        with open(os.path.join(admin_dir, name)) as f:
+            state = parse_admin_file(f.read())
+    except FileNotFoundError:
+        return None
+    try:
+        state["value"] = os.readlink(os.path.join(alternatives_dir, name))
+    except OSError:
+        state["value"] = None
+    return state
+
+
+def plan_alternatives(
+    entries: list[dict[str, Any]], states: dict[str, AlternativeState | None]
+) -> tuple[list[dict[str, Any]], list[str]]:
+    """
+    Return the entries that must be installed and the manual selections to set.
+
+    An entry is installed when its name is unknown, its path is not registered,
+    or its link or priority differ. Entries with `manual: true` produce a
+    `--set-selections` line unless the name is already set manually to them.
+    """
+    installs: list[dict[str, Any]] = []
+    selections: list[str] = []
+    for entry in entries:
+        name, path = str(entry["name"]), str(entry["path"])
+        priority = (
+            DEFAULT_PRIORITY
+            if entry.get("priority") is None
+            else int(entry["priority"])
+        )
+        state = states.get(name)
+        if (
+            state is None
+            or state["link"] != str(entry["link"])
+            or state["choices"].get(path) != priority
+        ):
+            installs.append({**entry, "priority": priority})
+        if entry.get("manual") and (
+            state is None or state["status"] != "manual" or state["value"] != path
+        ):
+            selections.append(f"{name} manual {path}")
+    return installs, selections
+
+
+def apply_alternatives(
+    module: AnsibleModule,
+    entries: list[dict[str, Any]],
+    admin_dir: str = ADMIN_DIR,
+    alternatives_dir: str = ALTERNATIVES_DIR,
+) -> dict[str, Any]:
+    """
+    Install missing alternatives and set every manual selection at once.
+
+    update-alternatives is pointed at the same directories the state is read
+    from.  Returns the installed entries and the selections that were set;
+    nothing is run in check mode.
+
+    Raises:
+        OSError: If update-alternatives fails.
+    """
+    names = {str(entry["name"]) for entry in entries}
+    states = {
+        name: read_state(name, admin_dir, alternatives_dir) for name in sorted(names)
+    }
+    installs, selections = plan_alternatives(entries, states)
+    summary: dict[str, Any] = {
+        "changed": bool(installs or selections),
+        "installed": installs,
+        "selections": selections,
+    }
+    if module.check_mode or not summary["changed"]:
+        return summary
+
+    binary = module.get_bin_path("update-alternatives", required=True)
+    command = [binary, "--admindir", admin_dir, "--altdir", alternatives_dir]
+    for entry in installs:
+        argv = [
+            *command,
+            "--install",
+            str(entry["link"]),
+            str(entry["name"]),
+            str(entry["path"]),
+            str(entry["priority"]),
+        ]
+        rc, _, err = module.run_command(argv)
+        if rc != 0:
+            raise OSError(f"update-alternatives failed for {entry['name']}: {err}")
+
+    if selections:
+        rc, _, err = module.run_command(
+            [*command, "--set-selections"], data="\n".join(selections) + "\n"
+        )
+        if rc != 0:
+            raise OSError(f"update-alternatives --set-selections failed: {err}")
+    return summary
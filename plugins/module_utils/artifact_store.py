@@ -0,0 +1,190 @@
+#
+# artifact_store.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Local content-addressed artifact store shared by the collection modules."""
+
+from __future__ import annotations
+
+import errno
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+
+# ioctl number of FICLONE (linux/fs.h), used for copy-on-write reflinks
+FICLONE = 0x40049409
+LINK_METHODS = ["auto", "reflink", "hardlink", "copy"]
+READ_SIZE = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    """Return the SHA256 digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(READ_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def reflink(src: str, dest: str) -> None:
+    """Clone `src` to `dest` sharing extents (btrfs, xfs, ...)."""
+    with open(src, "rb") as s, open(dest, "wb") as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.remove(dest)
+            raise
+
+
+class ArtifactStore:
+    """
+    Artifacts keyed by their SHA256 digest with size-bounded LRU eviction.
+
+    Objects live in `<root>/objects/<sha[:2]>/<sha>`.  Their mtime is refreshed
+    on every hit and is used as the LRU clock.  Logical keys,
+    such as a package name and build configuration, can be bound to a digest in
+    `<root>/keys` so build outputs can be found before they are rebuilt.
+    """
+
+    def __init__(self, root: str, max_size: int = 0):
+        self.root = root
+        self.max_size = max_size
+        self.objects = os.path.join(root, "objects")
+        self.keys = os.path.join(root, "keys")
+        os.makedirs(self.objects, exist_ok=True)
+        os.makedirs(self.keys, exist_ok=True)
+
+    def path(self, sha256: str) -> str:
+        return os.path.join(self.objects, sha256[:2], sha256)
+
+    def has(self, sha256: str) -> bool:
+        return os.path.isfile(self.path(sha256))
+
+    def _key_path(self, key: str) -> str:
+        return os.path.join(self.keys, hashlib.sha256(key.encode()).hexdigest())
+
+    def bind(self, key: str, sha256: str) -> None:
+        """Point a logical key at a stored digest."""
+        fd, tmp = tempfile.mkstemp(dir=self.keys)
+        with os.fdopen(fd, "w") as f:
+            f.write(sha256)
+        os.replace(tmp, self._key_path(key))
+
+    def resolve(self, key: str) -> str | None:
+        """Return the digest bound to `key` if it is still stored."""
+        try:
+            with open(self._key_path(key)) as f:
+                sha256 = f.read().strip()
+        except OSError:
+            return None
+        return sha256 if self.has(sha256) else None
+
+    def add(self, src: str, sha256: str | None = None) -> str:
+        """
+        Store a file and return its digest.
+
+        The file is reflinked into the store when the filesystem supports it,
+        so adding a large download costs no extra disk space; otherwise it is
+        copied.  It is never hard linked: the object must not share an inode
+        with a file the caller may rewrite later.  Call evict() afterwards to
+        enforce max_size.
+        """
+        sha256 = sha256 or file_sha256(src)
+        target = self.path(sha256)
+        if os.path.exists(target):
+            os.utime(target)
+            return sha256
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        try:
+            reflink(src, tmp)
+        except OSError:
+            shutil.copyfile(src, tmp)
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, target)
+        return sha256
+
+    def materialize(self, sha256: str, dest: str, method: str = "auto") -> str:
+        """
+        Place a stored object at `dest`.
+
+        Returns the method used: 'reflink', 'hardlink' or 'copy'.
+        """
+        src = self.path(sha256)
+        os.utime(src)
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        methods = ["reflink", "hardlink", "copy"] if method == "auto" else [method]
+
+        for candidate in methods:
+            try:
+                if candidate == "reflink":
+                    reflink(src, tmp)
+                elif candidate == "hardlink":
+                    os.link(src, tmp)
+                else:
+                    shutil.copyfile(src, tmp)
+            except OSError as e:
+                if method != "auto" or e.errno not in (
+                    errno.EOPNOTSUPP,
+                    errno.ENOTTY,
+                    errno.EINVAL,
+                    errno.EXDEV,
+                    errno.EPERM,
+                    errno.EMLINK,
+                ):
+                    raise
+                continue
+            os.replace(tmp, dest)
+            return candidate
+        raise OSError(f"Unable to materialize {sha256} at {dest}")
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _entries(self) -> list[tuple[str, int, float]]:
+        entries = []
+        for prefix in os.listdir(self.objects):
+            directory = os.path.join(self.objects, prefix)
+            for name in os.listdir(directory):
+                if name.endswith(".tmp"):
+                    continue
+                st = os.stat(os.path.join(directory, name))
+                entries.append((name, st.st_size, st.st_mtime))
+        return entries
+
+    def evict(self, keep: str | None = None) -> list[str]:
+        """Remove least recently used objects until the store fits max_size."""
+        if self.max_size <= 0:
+            return []
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        removed = []
+        for sha256, size, _ in entries:
+            if total <= self.max_size:
+                break
+            if sha256 == keep:
+                continue
+            os.remove(self.path(sha256))
+            total -= size
+            removed.append(sha256)
+        return removed
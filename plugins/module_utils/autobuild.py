@@ -0,0 +1,257 @@
+#
+# autobuild.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Shared helpers for the autobuild modules."""
+
+from __future__ import annotations
+
+import os
+import re
+from typing import Any, NamedTuple
+
+BUILD_SCRIPTS = ["make", "cmake", "meson-ninja"]
+PACKAGE_VERSION = re.compile(r"\d[0-9A-Za-z.+~]*")
+
+COMPILER_CACHE_OPTIONS: dict[str, Any] = {
+    "enabled": {"type": "bool", "default": False},
+    "tool": {"type": "str", "default": "ccache", "choices": ["ccache", "sccache"]},
+    "dir": {"type": "path"},
+    "max_size": {"type": "str", "default": "5G"},
+    "cc": {"type": "str", "default": "cc"},
+    "cxx": {"type": "str", "default": "c++"},
+}
+
+
+class BuildPhase(NamedTuple):
+    """A single command of a source build."""
+
+    name: str
+    argv: list[str]
+    cwd: str
+
+
+class DependencyError(ValueError):
+    """Raised when package dependencies are unknown or cyclic."""
+
+
+def build_phases(
+    script: str,
+    source_dir: str,
+    jobs: int,
+    install_prefix: str | None = None,
+    flags: list[str] | None = None,
+) -> list[BuildPhase]:
+    """
+    Return the configure, compile and install commands for a build script.
+
+    Args:
+        script (str): One of 'make', 'cmake' or 'meson-ninja'.
+        source_dir (str): Directory of the cloned source tree.
+        jobs (int): Number of parallel compile jobs.
+        install_prefix (str): Optional installation prefix.
+        flags (list): Extra flags passed to the configure step.
+
+    Returns:
+        list: Ordered build phases.
+    """
+    flags = list(flags or [])
+    jobs = max(1, int(jobs))
+    build_dir = os.path.join(source_dir, "build")
+    phases: list[BuildPhase] = []
+
+    if script == "make":
+        if not os.path.exists(os.path.join(source_dir, "configure")) and os.path.exists(
+            os.path.join(source_dir, "autogen.sh")
+        ):
+            phases.append(BuildPhase("autogen", ["./autogen.sh"], source_dir))
+        if phases or os.path.exists(os.path.join(source_dir, "configure")):
+            prefix = [f"--prefix={install_prefix}"] if install_prefix else []
+            phases.append(
+                BuildPhase("configure", ["./configure", *prefix, *flags], source_dir)
+            )
+        phases.append(BuildPhase("compile", ["make", f"-j{jobs}"], source_dir))
+        phases.append(BuildPhase("install", ["make", "install"], source_dir))
+    elif script == "cmake":
+        prefix = [f"-DCMAKE_INSTALL_PREFIX={install_prefix}"] if install_prefix else []
+        phases.append(
+            BuildPhase(
+                "configure",
+                [
+                    "cmake",
+                    "-S",
+                    source_dir,
+                    "-B",
+                    build_dir,
+                    "-DCMAKE_BUILD_TYPE=Release",
+                    *prefix,
+                    *flags,
+                ],
+                source_dir,
+            )
+        )
+        phases.append(
+            BuildPhase(
+                "compile",
+                ["cmake", "--build", build_dir, "--parallel", str(jobs)],
+                source_dir,
+            )
+        )
+        phases.append(
+            BuildPhase("install", ["cmake", "--install", build_dir], source_dir)
+        )
+    elif script == "meson-ninja":
+        prefix = [f"--prefix={install_prefix}"] if install_prefix else []
+        if not os.path.exists(os.path.join(build_dir, "build.ninja")):
+            phases.append(
+                BuildPhase(
+                    "configure",
+                    ["meson", "setup", "build", *prefix, *flags],
+                    source_dir,
+                )
+            )
+        phases.append(
+            BuildPhase(
+                "compile",
+                ["meson", "compile", "-C", "build", "-j", str(jobs)],
+                source_dir,
+            )
+        )
+        phases.append(
+            BuildPhase("install", ["meson", "install", "-C", "build"], source_dir)
+        )
+    else:
+        raise ValueError(f"Unsupported build script: {script}")
+
+    return phases
+
+
+def clean_phase(script: str, source_dir: str) -> BuildPhase | None:
+    """Return the command that removes previous build outputs, if there are any."""
+    build_dir = os.path.join(source_dir, "build")
+    if script == "make" and os.path.exists(os.path.join(source_dir, "Makefile")):
+        return BuildPhase("clean", ["make", "clean"], source_dir)
+    if script == "cmake" and os.path.isdir(build_dir):
+        return BuildPhase(
+            "clean", ["cmake", "--build", build_dir, "--target", "clean"], source_dir
+        )
+    if script == "meson-ninja" and os.path.exists(
+        os.path.join(build_dir, "build.ninja")
+    ):
+        return BuildPhase(
+            "clean", ["meson", "compile", "-C", "build", "--clean"], source_dir
+        )
+    return None
+
+
+def checkinstall_phase(
+    install: BuildPhase, name: str, version: str | None, pakdir: str
+) -> BuildPhase:
+    """
+    Wrap an install phase with checkinstall so it is installed as a package.
+
+    The package is named `<name>-<version>` like in the autobuild role, where
+    the version is the first run of digits and dots of the checked out tag.
+    """
+    match = PACKAGE_VERSION.search(version or "")
+    pkgversion = match.group(0) if match else "0"
+    pkgname = f"{name}-{pkgversion}"
+    argv = [
+        "checkinstall",
+        "--default",
+        f"--pkgname={pkgname}",
+        f"--pkgversion={pkgversion}",
+        f"--provides={pkgname}",
+        f"--pkgsource={install.cwd}",
+        "--deldoc=yes",
+        "--deldesc=yes",
+        "--delspec=yes",
+        "--backup=no",
+        "--install=yes",
+        f"--pakdir={pakdir}",
+        *install.argv,
+    ]
+    return BuildPhase("checkinstall", argv, install.cwd)
+
+
+def compiler_cache_environment(
+    cache: dict[str, Any], script: str, home: str
+) -> dict[str, str]:
+    """
+    Return the build environment that wraps the compilers with ccache or sccache.
+
+    Mirrors the autobuild role: cmake reads the launcher variables, meson finds
+    the cache on its own and make only sees CC/CXX.
+    """
+    if not cache.get("enabled"):
+        return {}
+    tool = cache.get("tool") or "ccache"
+    directory = cache.get("dir") or os.path.join(home, ".cache", tool)
+    size = cache.get("max_size") or "5G"
+    environment = {
+        "CMAKE_C_COMPILER_LAUNCHER": tool,
+        "CMAKE_CXX_COMPILER_LAUNCHER": tool,
+    }
+    if tool == "ccache":
+        environment.update(CCACHE_DIR=directory, CCACHE_MAXSIZE=size)
+    else:
+        environment.update(
+            SCCACHE_DIR=directory, SCCACHE_CACHE_SIZE=size, RUSTC_WRAPPER=tool
+        )
+    if script == "make":
+        environment["CC"] = f"{tool} {cache.get('cc') or 'cc'}"
+        environment["CXX"] = f"{tool} {cache.get('cxx') or 'c++'}"
+    return environment
+
+
+def dependency_order(dependencies: dict[str, list[str]]) -> list[str]:
+    """
+    Topologically sort packages so that every package follows its dependencies.
+
+    Packages without an ordering constraint keep their input order.
+
+    Args:
+        dependencies (dict): Maps a package name to the names it depends on.
+
+    Returns:
+        list: Package names in build order.
+
+    Raises:
+        DependencyError: If a dependency is unknown or the graph has a cycle.
+    """
+    for name, depends_on in dependencies.items():
+        for dep in depends_on:
+            if dep not in dependencies:
+                raise DependencyError(
+                    f"Package '{name}' depends on unknown package '{dep}'"
+                )
+
+    remaining = {name: set(depends_on) for name, depends_on in dependencies.items()}
+    order: list[str] = []
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise DependencyError(
+                f"Dependency cycle between packages: {', '.join(sorted(remaining))}"
+            )
+        for name in ready:
+            del remaining[name]
+            order.append(name)
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return order
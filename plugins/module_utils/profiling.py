@@ -0,0 +1,131 @@
+#
+# profiling.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Opt-in phase timings, peak RSS and cProfile summaries for modules."""
+
+from __future__ import annotations
+
+import os
+import resource
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import cProfile
+
+PROFILE_ENV = "JCOOK3701_PROFILE"
+PROFILE_TOP_ENV = "JCOOK3701_PROFILE_TOP"
+
+# Merged into the argument_spec of every profiled module
+PROFILE_ARGUMENT_SPEC: dict[str, dict[str, Any]] = {
+    "_profile": {"type": "bool", "default": False},
+    "_profile_top": {"type": "int", "default": 0},
+}
+
+
+class Profiler:
+    """
+    Collect phase timings for a module run and report them as `metrics`.
+
+    Create the profiler before the AnsibleModule so argument parsing can be
+    timed, then call configure() with the parsed params.  While disabled,
+    phase() only costs a generator call, so modules can stay instrumented.
+    """
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.enabled = False
+        self.top = 0
+        self.phases: dict[str, float] = {}
+        self._cprofile: cProfile.Profile | None = None
+
+    def configure(self, params: dict[str, Any]) -> None:
+        """Enable profiling from the `_profile` options or the environment."""
+        env = os.environ.get(PROFILE_ENV, "").lower()
+        self.enabled = bool(params.get("_profile")) or env in ("1", "true", "yes")
+        self.top = int(
+            params.get("_profile_top") or os.environ.get(PROFILE_TOP_ENV) or 0
+        )
+        if self.top > 0:
+            # cProfile and pstats are only imported when a summary is requested
+            import cProfile  # noqa: PLC0415
+
+            self.enabled = True
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self.mark("arg_parsing")
+
+    def mark(self, name: str) -> None:
+        """Attribute the time since the previous mark or phase to `name`."""
+        now = time.perf_counter()
+        if self.enabled:
+            self.phases[name] = self.phases.get(name, 0.0) + now - self.last
+        self.last = now
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a block; repeated phases with the same name are summed."""
+        if not self.enabled:
+            yield
+            return
+        self.last = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(name)
+
+    def _cprofile_top(self, profile: cProfile.Profile) -> list[dict[str, Any]]:
+        import pstats  # noqa: PLC0415
+
+        profile.disable()
+        functions = pstats.Stats(profile).get_stats_profile().func_profiles
+        ranked = sorted(
+            functions.items(), key=lambda item: item[1].cumtime, reverse=True
+        )
+        return [
+            {
+                "function": f"{stat.file_name}:{stat.line_number}({name})",
+                "calls": stat.ncalls,
+                "tottime": round(stat.tottime, 6),
+                "cumtime": round(stat.cumtime, 6),
+            }
+            for name, stat in ranked[: self.top]
+        ]
+
+    def metrics(self) -> dict[str, Any]:
+        """Return the collected metrics."""
+        metrics: dict[str, Any] = {
+            "phases": {name: round(value, 6) for name, value in self.phases.items()},
+            "total": round(time.perf_counter() - self.start, 6),
+            # ru_maxrss is reported in kilobytes on Linux
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+        if self._cprofile is not None:
+            metrics["cprofile"] = self._cprofile_top(self._cprofile)
+        return metrics
+
+    def report(self, result: dict[str, Any]) -> dict[str, Any]:
+        """Add `metrics` to a module result when profiling is enabled."""
+        if self.enabled:
+            result["metrics"] = self.metrics()
+        return result
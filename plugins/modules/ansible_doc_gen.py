@@ -22,8 +22,11 @@ import glob
 from pathlib import Path
 from typing import Any
 
-import yaml
 from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.jcook3701.utils.plugins.module_utils.profiling import (
+    PROFILE_ARGUMENT_SPEC,
+    Profiler,
+)
 
 DOCUMENTATION = r"""
 ---
@@ -35,6 +38,8 @@ description:
 version_added: "1.0.0"
 author:
     - Jared Cook
+extends_documentation_fragment:
+    - jcook3701.utils.profile
 options:
     roles_path:
         description: The path to the directory containing Ansible roles.
@@ -87,16 +92,39 @@ message:
     returned: always
     type: str
     sample: "Docs generated at /tmp/docs"
+metrics:
+    description: Phase timings, peak RSS and optional cProfile summary of the module run.
+    returned: when _profile or _profile_top is set
+    type: dict
 """
 
 
 def yaml_to_md(data: Any) -> str:
     """Converts YAML data to a string without sorting keys."""
+    # PyYAML is imported on first use rather than at module start-up
+    import yaml  # noqa: PLC0415
+
     return yaml.dump(data, sort_keys=False)
 
 
+def load_yaml(path: Path, profiler: Profiler) -> Any:
+    """Read and parse a YAML file, timing the I/O and parse phases."""
+    import yaml  # noqa: PLC0415
+
+    with profiler.phase("io"):
+        text = path.read_text()
+    with profiler.phase("parse"):
+        return yaml.safe_load(text)
+
+
+def render_yaml(data: Any, profiler: Profiler) -> str:
+    with profiler.phase("render"):
+        return yaml_to_md(data)
+
+
 def run_module() -> None:
     """Main logic for the Ansible module."""
+    profiler = Profiler()
     module_args = {
         "roles_path": {"type": "str", "required": True},
         "playbooks_path": {"type": "str", "required": False, "default": None},
@@ -104,11 +132,13 @@ def run_module() -> None:
         "include_tasks": {"type": "bool", "default": True},
         "include_defaults": {"type": "bool", "default": True},
         "include_meta": {"type": "bool", "default": True},
+        **PROFILE_ARGUMENT_SPEC,
     }
 
     result: dict[str, Any] = {"changed": False, "message": "", "generated_files": []}
 
     module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+    profiler.configure(module.params)
 
     roles_path = module.params["roles_path"]
     playbooks_path = module.params["playbooks_path"]
@@ -129,40 +159,44 @@ def run_module() -> None:
         if include_defaults:
             defaults_file = role_dir / "defaults/main.yml"
             if defaults_file.exists():
-                defaults = yaml.safe_load(defaults_file.read_text())
-                md += f"## Defaults\n```yaml\n{yaml_to_md(defaults)}```\n\n"
+                defaults = load_yaml(defaults_file, profiler)
+                md += f"## Defaults\n```yaml\n{render_yaml(defaults, profiler)}```\n\n"
 
         if include_tasks:
             tasks_files = glob.glob(str(role_dir / "tasks/*.yml"))
             if tasks_files:
                 md += "## Tasks\n"
                 for tf in tasks_files:
-                    tasks = yaml.safe_load(Path(tf).read_text())
-                    md += f"### {Path(tf).name}\n```yaml\n{yaml_to_md(tasks)}```\n\n"
+                    tasks = load_yaml(Path(tf), profiler)
+                    md += f"### {Path(tf).name}\n```yaml\n{render_yaml(tasks, profiler)}```\n\n"
 
         if include_meta:
             meta_file = role_dir / "meta/main.yml"
             if meta_file.exists():
-                meta = yaml.safe_load(meta_file.read_text())
-                md += f"## Meta\n```yaml\n{yaml_to_md(meta)}```\n\n"
+                meta = load_yaml(meta_file, profiler)
+                md += f"## Meta\n```yaml\n{render_yaml(meta, profiler)}```\n\n"
 
         output_file = output_path / f"{role_name}.md"
-        output_file.write_text(md)
+        with profiler.phase("write"):
+            output_file.write_text(md)
         result["generated_files"].append(str(output_file))
 
     # Optional: process playbooks
     if playbooks_path:
         for pb_file in glob.glob(f"{playbooks_path}/*.yml"):
             pb_name = Path(pb_file).stem
-            tasks = yaml.safe_load(Path(pb_file).read_text())
-            md = f"# Playbook: {pb_name}\n\n```yaml\n{yaml_to_md(tasks)}```\n"
+            tasks = load_yaml(Path(pb_file), profiler)
+            md = (
+                f"# Playbook: {pb_name}\n\n```yaml\n{render_yaml(tasks, profiler)}```\n"
+            )
             output_file = output_path / f"{pb_name}.md"
-            output_file.write_text(md)
+            with profiler.phase("write"):
+                output_file.write_text(md)
             result["generated_files"].append(str(output_file))
 
     result["changed"] = True
     result["message"] = f"Docs generated at {output_path}"
-    module.exit_json(**result)
+    module.exit_json(**profiler.report(result))
 
 
 def main() -> None:
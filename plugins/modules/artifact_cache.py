@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+#
+# artifact_cache.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import os
+from typing import Any
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.common.text.formatters import human_to_bytes
+from ansible_collections.jcook3701.utils.plugins.module_utils.artifact_store import (
+    LINK_METHODS,
+    ArtifactStore,
+    file_sha256,
+)
+
+DOCUMENTATION = r"""
+---
+module: artifact_cache
+short_description: Fetch or store artifacts in a local content-addressed cache
+description:
+    - This module manages a per-machine artifact store keyed by SHA256 digest.
+    - With C(state=get) an artifact is looked up by digest or logical key and materialized at C(path) with a reflink, hard link or copy.
+    - With C(state=put) the file at C(path) is added to the store and optionally bound to a logical key.
+    - The store is kept below C(max_size) by evicting the least recently used artifacts.
+version_added: "1.0.0"
+author:
+    - Jared Cook
+options:
+    state:
+        description: Whether to fetch an artifact from the store or add one to it.
+        type: str
+        default: get
+        choices: ["get", "put"]
+    path:
+        description: Destination of the artifact for C(get), source file for C(put).
+        type: path
+        required: true
+    sha256:
+        description: Digest of the artifact.
+        type: str
+    key:
+        description: Logical key, such as a package name and build configuration, bound to the artifact digest.
+        type: str
+    store:
+        description: Root directory of the artifact store.
+        type: path
+        default: /var/cache/jcook3701.utils/artifacts
+    max_size:
+        description: Maximum size of the store, for example C(20G). C(0) disables eviction.
+        type: str
+        default: "0"
+    link:
+        description: How artifacts are materialized. C(auto) tries reflink, then hard link, then copy.
+        type: str
+        default: auto
+        choices: ["auto", "reflink", "hardlink", "copy"]
+"""
+
+EXAMPLES = r"""
+- name: Reuse a previously built package
+  jcook3701.utils.artifact_cache:
+    state: get
+    key: "emacs-29.4:{{ build | to_json | hash('sha1') }}"
+    path: /home/builder/pkgs/emacs-29.4.deb
+  register: cached_deb
+
+- name: Store the freshly built package
+  jcook3701.utils.artifact_cache:
+    state: put
+    key: "emacs-29.4:{{ build | to_json | hash('sha1') }}"
+    path: /home/builder/pkgs/emacs-29.4.deb
+  when: not cached_deb.hit
+"""
+
+RETURN = r"""
+hit:
+    description: Whether the artifact was found in the store (C(get) only).
+    returned: always
+    type: bool
+sha256:
+    description: Digest of the artifact.
+    returned: when found or stored
+    type: str
+method:
+    description: How the artifact was materialized, one of C(reflink), C(hardlink) or C(copy).
+    returned: when materialized
+    type: str
+evicted:
+    description: Digests evicted to keep the store below max_size.
+    returned: always
+    type: list
+    elements: str
+"""
+
+
+def run_module() -> None:
+    module_args = {
+        "state": {"type": "str", "default": "get", "choices": ["get", "put"]},
+        "path": {"type": "path", "required": True},
+        "sha256": {"type": "str"},
+        "key": {"type": "str", "no_log": False},
+        "store": {"type": "path", "default": "/var/cache/jcook3701.utils/artifacts"},
+        "max_size": {"type": "str", "default": "0"},
+        "link": {"type": "str", "default": "auto", "choices": LINK_METHODS},
+    }
+
+    result: dict[str, Any] = {"changed": False, "hit": False, "evicted": []}
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        required_if=[("state", "get", ("sha256", "key"), True)],
+        supports_check_mode=True,
+    )
+
+    path: str = module.params["path"]
+    key: str | None = module.params["key"]
+    sha256: str | None = module.params["sha256"]
+
+    try:
+        store = ArtifactStore(
+            module.params["store"], human_to_bytes(module.params["max_size"])
+        )
+
+        if module.params["state"] == "get":
+            sha256 = sha256 or (store.resolve(key) if key else None)
+            if not sha256 or not store.has(sha256):
+                module.exit_json(**result)
+            result.update(hit=True, sha256=sha256)
+            if os.path.exists(path) and file_sha256(path) == sha256:
+                module.exit_json(**result)
+            result["changed"] = True
+            if not module.check_mode:
+                result["method"] = store.materialize(
+                    sha256, path, module.params["link"]
+                )
+            module.exit_json(**result)
+
+        if not os.path.isfile(path):
+            module.fail_json(msg=f"{path} does not exist", **result)
+        sha256 = sha256 or file_sha256(path)
+        result["sha256"] = sha256
+        bound = store.resolve(key) == sha256 if key else True
+        result["changed"] = not store.has(sha256) or not bound
+        if result["changed"] and not module.check_mode:
+            store.add(path, sha256)
+            if key:
+                store.bind(key, sha256)
+            result["evicted"] = store.evict(keep=sha256)
+        module.exit_json(**result)
+
+    except OSError as e:
+        module.fail_json(msg=f"Artifact cache error: {e!s}", **result)
+
+
+def main() -> None:
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
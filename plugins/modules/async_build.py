@@ -0,0 +1,511 @@
+#!/usr/bin/python3
+#
+# async_build.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import signal
+import subprocess
+import tempfile
+import time
+from typing import Any
+
+from ansible.module_utils.basic import AnsibleModule
+
+DOCUMENTATION = r"""
+---
+module: async_build
+short_description: Run long builds in the background and report their progress
+description:
+    - With C(state=started) this module starts a detached driver that runs the given build phases one after another, writing each phase to its own log, and returns at once.
+    - With C(state=status) it reads the status file of the job and returns the current phase, the progress parsed from the log and the duration of every finished phase.  It is cheap enough to poll from an C(until) loop on many hosts at once.
+    - Progress is read from the C([done/total]) lines of ninja, the C([ 42%]) lines of CMake generated makefiles, or estimated from the length of the log of the previous successful run for plain make.
+    - When the build failed the task fails with the last lines of the failed phase's log.
+    - With C(state=absent) a running job is terminated.
+version_added: "1.0.0"
+author:
+    - Jared Cook
+options:
+    job:
+        description: Name of the job, for example the package being built.
+        type: str
+        required: true
+    phases:
+        description: The phases to run with C(state=started), in order.  The job stops at the first phase that fails.
+        type: list
+        elements: dict
+        suboptions:
+            name:
+                description: Name of the phase, for example C(configure), C(compile), C(install) or C(checkinstall).
+                type: str
+                required: true
+            cmd:
+                description: Command to run.  A string is run with C(/bin/bash -c), a list is executed directly.
+                type: raw
+                required: true
+            chdir:
+                description: Directory to run the command in.
+                type: path
+            creates:
+                description: Skip the phase when this path already exists.
+                type: path
+    state:
+        description: Start the job, report its status or terminate it.
+        type: str
+        default: started
+        choices: ["started", "status", "absent"]
+    state_dir:
+        description: Directory holding a status file and the phase logs of each job.
+        type: path
+        default: ~/.cache/jcook3701.utils/async_build
+    wait:
+        description: With C(state=status), seconds to wait for the job to finish before returning.
+        type: int
+        default: 0
+    tail:
+        description: Number of log lines returned in C(log_tail) when a phase failed.
+        type: int
+        default: 40
+notes:
+    - Starting a job that is still running does not start it again; the running job is reported instead.
+    - The phases inherit the environment of the task.
+"""
+
+EXAMPLES = r"""
+- name: Start the build
+  jcook3701.utils.async_build:
+    job: emacs
+    phases:
+      - name: configure
+        cmd: ./configure --prefix=/opt/emacs
+        chdir: /home/user/src/emacs
+      - name: compile
+        cmd: make -j8
+        chdir: /home/user/src/emacs
+
+- name: Wait for the build
+  jcook3701.utils.async_build:
+    job: emacs
+    state: status
+    wait: 15
+  register: build
+  until: build.finished
+  retries: 480
+  delay: 0
+"""
+
+RETURN = r"""
+job_dir:
+    description: Directory holding the status file and the phase logs.
+    returned: always
+    type: str
+pid:
+    description: Process id of the driver.
+    returned: when the job exists
+    type: int
+status:
+    description: One of C(running), C(succeeded) or C(failed).
+    returned: when the job exists
+    type: str
+finished:
+    description: Whether the job is no longer running.
+    returned: always
+    type: bool
+phase:
+    description: Name of the phase running or that ran last.
+    returned: when the job exists
+    type: str
+progress:
+    description: Progress of the current phase; C(done) and C(total) are only set for ninja, C(estimated) when the percentage is derived from the previous run.
+    returned: when the job is running
+    type: dict
+    sample: {"done": 812, "total": 2390, "percent": 34.0}
+phases:
+    description: Every phase started so far with its C(started) time, C(duration) in seconds, C(rc) and C(log).
+    returned: when the job exists
+    type: list
+    elements: dict
+durations:
+    description: Duration in seconds of every finished phase.
+    returned: when the job exists
+    type: dict
+    sample: {"configure": 41.2, "compile": 583.9}
+log_tail:
+    description: The last lines of the log of the failed phase.
+    returned: when the job failed
+    type: list
+    elements: str
+"""
+
+NINJA_PROGRESS = re.compile(rb"^\[(\d+)/(\d+)\]", re.MULTILINE)
+CMAKE_PROGRESS = re.compile(rb"^\[\s*(\d+)%\]", re.MULTILINE)
+TAIL_BYTES = 65536
+
+
+def read_tail(path: str, size: int = TAIL_BYTES) -> bytes:
+    """Return at most the last `size` bytes of `path`, starting at a full line."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+            f.seek(max(0, end - size))
+            data = f.read()
+    except OSError:
+        return b""
+    if end > size:
+        data = data.partition(b"\n")[2]
+    return data
+
+
+def count_lines(path: str) -> int:
+    """Return the number of lines in `path`, or 0 if it cannot be read."""
+    try:
+        with open(path, "rb") as f:
+            return sum(
+                chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b"")
+            )
+    except OSError:
+        return 0
+
+
+def parse_progress(tail: bytes) -> dict[str, Any] | None:
+    """Return the last ninja or CMake progress found in `tail`."""
+    matches = NINJA_PROGRESS.findall(tail)
+    if matches:
+        done, total = (int(n) for n in matches[-1])
+        percent = round(100 * done / total, 1) if total else 0.0
+        return {"done": done, "total": total, "percent": percent}
+    percents = CMAKE_PROGRESS.findall(tail)
+    if percents:
+        return {"percent": float(percents[-1])}
+    return None
+
+
+def process_start(pid: int) -> str | None:
+    """
+    Return the boot id and start time of a process, or None if unknown.
+
+    Together with the pid they identify a process across pid reuse and
+    reboots.  Only available where /proc is mounted.
+    """
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            boot_id = f.read().strip()
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces, so count fields after its ')';
+    # starttime is field 22 of the whole line.
+    return f"{boot_id}/{stat.rpartition(')')[2].split()[19]}"
+
+
+def pid_alive(pid: int, start: str | None = None) -> bool:
+    """Return whether `pid` runs and, if `start` is given, is still that process."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return start is None or process_start(pid) in (start, None)
+
+
+class BuildJob:
+    """The status file and phase logs of one job below `state_dir`."""
+
+    def __init__(self, state_dir: str, job: str):
+        self.directory = os.path.join(state_dir, job)
+        self.status_path = os.path.join(self.directory, "status.json")
+        self.history_path = os.path.join(self.directory, "history.json")
+
+    def log_path(self, phase: str) -> str:
+        return os.path.join(self.directory, f"{phase}.log")
+
+    def load(self, path: str | None = None) -> dict[str, Any] | None:
+        try:
+            with open(path or self.status_path) as f:
+                data: dict[str, Any] = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return data
+
+    def save(self, data: dict[str, Any], path: str | None = None) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path or self.status_path)
+
+    def status(self) -> dict[str, Any] | None:
+        """
+        Return the status of the job.
+
+        A job whose driver died without recording a result, for example after
+        a reboot, is reported as failed.  The recorded start time of the driver
+        tells it apart from an unrelated process that reused its pid.
+        """
+        status = self.load()
+        if (
+            status is not None
+            and status["status"] == "running"
+            and status.get("pid")
+            and not pid_alive(status["pid"], status.get("pid_start"))
+        ):
+            status.update(status="failed", error="The build driver exited unexpectedly")
+        return status
+
+    def start(self, phases: list[dict[str, Any]]) -> int:
+        """Start the driver detached from the module and return its pid."""
+        os.makedirs(self.directory, exist_ok=True)
+        read_fd, write_fd = os.pipe()
+        child = os.fork()
+        if child:
+            os.close(write_fd)
+            os.waitpid(child, 0)
+            with os.fdopen(read_fd) as r:
+                pid = r.read()
+            if not pid:
+                raise OSError(f"The build driver of {self.directory} failed to start")
+            return int(pid)
+
+        # First child: new session, then fork again so the driver is
+        # reparented to init and survives the end of the module.  The driver
+        # leads its own process group so state=absent can stop every phase.
+        os.close(read_fd)
+        os.setsid()
+        if os.fork():
+            os._exit(0)
+        try:
+            os.setpgid(0, 0)
+            self.save(
+                {
+                    "status": "running",
+                    "pid": os.getpid(),
+                    "pid_start": process_start(os.getpid()),
+                    "phases": [],
+                }
+            )
+            os.write(write_fd, str(os.getpid()).encode())
+            os.close(write_fd)
+            devnull = os.open(os.devnull, os.O_RDWR)
+            for fd in (0, 1, 2):
+                os.dup2(devnull, fd)
+            self.run(phases)
+        finally:
+            os._exit(0)
+
+    def run(self, phases: list[dict[str, Any]]) -> None:
+        """Run `phases` in order, recording the status after every step."""
+        status: dict[str, Any] = {
+            "status": "running",
+            "pid": os.getpid(),
+            "pid_start": process_start(os.getpid()),
+            "phase": None,
+            "started": time.time(),
+            "phases": [],
+        }
+        lines: dict[str, int] = {}
+        for phase in phases:
+            name = str(phase["name"])
+            entry: dict[str, Any] = {
+                "name": name,
+                "started": time.time(),
+                "duration": None,
+                "rc": None,
+                "log": self.log_path(name),
+            }
+            status["phase"] = name
+            status["phases"].append(entry)
+            self.save(status)
+
+            creates = phase.get("creates")
+            if creates and os.path.exists(creates):
+                entry.update(rc=0, skipped=True)
+            else:
+                entry["rc"] = run_phase(phase, entry["log"])
+                lines[name] = count_lines(entry["log"])
+            entry["duration"] = round(time.time() - entry["started"], 3)
+            if entry["rc"] != 0:
+                status.update(status="failed", rc=entry["rc"])
+                break
+        else:
+            status.update(status="succeeded", rc=0)
+            self.save(
+                {**(self.load(self.history_path) or {}), **lines}, self.history_path
+            )
+        status["finished"] = time.time()
+        self.save(status)
+
+    def progress(self, status: dict[str, Any]) -> dict[str, Any]:
+        """Return the progress of the running phase."""
+        phase = status.get("phase")
+        if not phase:
+            return {"percent": None}
+        log = self.log_path(phase)
+        progress = parse_progress(read_tail(log))
+        if progress is not None:
+            return progress
+        previous = (self.load(self.history_path) or {}).get(phase)
+        if previous:
+            percent = min(99.0, round(100 * count_lines(log) / previous, 1))
+            return {"percent": percent, "estimated": True}
+        return {"percent": None}
+
+    def stop(self, status: dict[str, Any]) -> bool:
+        """Terminate the driver and its phase processes."""
+        if status["status"] != "running" or not status.get("pid"):
+            return False
+        try:
+            os.killpg(status["pid"], signal.SIGTERM)
+        except ProcessLookupError:
+            return False
+        status.update(status="failed", error="Terminated")
+        self.save(status)
+        return True
+
+
+def run_phase(phase: dict[str, Any], log: str) -> int:
+    """Run one phase with its output written to `log` and return its exit code."""
+    cmd = phase["cmd"]
+    argv = ["/bin/bash", "-c", cmd] if isinstance(cmd, str) else [str(c) for c in cmd]
+    try:
+        with open(log, "wb") as out:
+            return subprocess.call(
+                argv,
+                cwd=phase.get("chdir"),
+                stdin=subprocess.DEVNULL,
+                stdout=out,
+                stderr=subprocess.STDOUT,
+            )
+    except OSError as e:
+        with open(log, "a") as out:
+            out.write(f"{e!s}\n")
+        return 127
+
+
+def wait_for(job: BuildJob, timeout: int) -> dict[str, Any] | None:
+    """Return the status of `job` once it finished or `timeout` seconds passed."""
+    deadline = time.monotonic() + timeout
+    status = job.status()
+    while status is not None and status["status"] == "running":
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        time.sleep(min(1.0, remaining))
+        status = job.status()
+    return status
+
+
+def report(job: BuildJob, status: dict[str, Any], tail: int) -> dict[str, Any]:
+    """Build the module result from a job status."""
+    result: dict[str, Any] = {
+        "pid": status.get("pid"),
+        "status": status["status"],
+        "finished": status["status"] != "running",
+        "phase": status.get("phase"),
+        "phases": status["phases"],
+        "durations": {
+            p["name"]: p["duration"]
+            for p in status["phases"]
+            if p["duration"] is not None
+        },
+    }
+    if status["status"] == "running":
+        result["progress"] = job.progress(status)
+    elif status["status"] == "failed":
+        log = read_tail(job.log_path(status["phase"])) if status["phase"] else b""
+        lines = log.decode(errors="replace").splitlines()
+        result["log_tail"] = lines[-tail:] if tail else []
+    return result
+
+
+def run_module() -> None:
+    phase_options = {
+        "name": {"type": "str", "required": True},
+        "cmd": {"type": "raw", "required": True},
+        "chdir": {"type": "path"},
+        "creates": {"type": "path"},
+    }
+    module_args = {
+        "job": {"type": "str", "required": True},
+        "phases": {"type": "list", "elements": "dict", "options": phase_options},
+        "state": {
+            "type": "str",
+            "default": "started",
+            "choices": ["started", "status", "absent"],
+        },
+        "state_dir": {
+            "type": "path",
+            "default": "~/.cache/jcook3701.utils/async_build",
+        },
+        "wait": {"type": "int", "default": 0},
+        "tail": {"type": "int", "default": 40},
+    }
+
+    result: dict[str, Any] = {"changed": False, "finished": True}
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        required_if=[("state", "started", ["phases"])],
+        supports_check_mode=True,
+    )
+
+    state = module.params["state"]
+    job = BuildJob(module.params["state_dir"], module.params["job"])
+    result["job_dir"] = job.directory
+
+    try:
+        status = job.status()
+        if state == "started" and (status is None or status["status"] != "running"):
+            result["changed"] = True
+            status = None
+            if not module.check_mode:
+                result["pid"] = job.start(module.params["phases"])
+                status = job.status()
+        elif state == "status":
+            status = wait_for(job, module.params["wait"])
+        elif state == "absent" and status is not None:
+            result["changed"] = job.stop(status)
+    except OSError as e:
+        module.fail_json(msg=f"Error running build job: {e!s}", **result)
+
+    if status is None:
+        if state == "status":
+            module.fail_json(msg=f"Unknown build job {module.params['job']}", **result)
+    else:
+        result.update(report(job, status, module.params["tail"]))
+        if state == "status" and result["status"] == "failed":
+            module.fail_json(
+                msg=status.get("error")
+                or f"Build phase {status['phase']} failed with rc {status.get('rc')}",
+                **result,
+            )
+
+    module.exit_json(**result)
+
+
+def main() -> None:
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
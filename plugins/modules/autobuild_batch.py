@@ -0,0 +1,710 @@
+#!/usr/bin/python3
+#
+# autobuild_batch.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import os
+import pwd
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, NamedTuple, TypedDict
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.jcook3701.utils.plugins.module_utils.alternatives import (
+    ALTERNATIVE_OPTIONS,
+    apply_alternatives,
+)
+from ansible_collections.jcook3701.utils.plugins.module_utils.autobuild import (
+    BUILD_SCRIPTS,
+    COMPILER_CACHE_OPTIONS,
+    BuildPhase,
+    DependencyError,
+    build_phases,
+    checkinstall_phase,
+    clean_phase,
+    compiler_cache_environment,
+    dependency_order,
+)
+
+DOCUMENTATION = r"""
+---
+module: autobuild_batch
+short_description: Build several source packages concurrently in dependency order
+description:
+    - This module clones and builds a list of source packages on the target host.
+    - Packages are scheduled topologically from their C(depends_on) lists and independent packages are cloned and built concurrently.
+    - C(ldconfig) and C(update-alternatives) run once after all packages have been built.
+    - With C(build_user) the mirror, clone, clean, configure and compile steps run as that user and only the install step runs as the user of the module, usually root.
+    - Dependents of a failed package are skipped.
+version_added: "1.0.0"
+author:
+    - Jared Cook
+options:
+    packages:
+        description: The package definitions to build.
+        type: list
+        elements: dict
+        required: true
+        suboptions:
+            name:
+                description: Unique package name.
+                type: str
+                required: true
+            repo:
+                description: Git URL of the package source.
+                type: str
+                required: true
+            version:
+                description: Tag, branch or commit to check out.
+                type: str
+            directory:
+                description: Checkout directory. Defaults to C(build_root)/C(name).
+                type: path
+            script:
+                description: Build system used by the package.
+                type: str
+                default: make
+                choices: ["make", "cmake", "meson-ninja"]
+            flags:
+                description: Extra arguments passed to the configure step.
+                type: list
+                elements: str
+                default: []
+            install_prefix:
+                description: Installation prefix passed to the configure step.
+                type: path
+            depends_on:
+                description: Names of packages that must be built first.
+                type: list
+                elements: str
+                default: []
+            library:
+                description: Whether the package installs shared libraries and needs C(ldconfig).
+                type: bool
+                default: false
+            alternatives:
+                description: update-alternatives entries registered once the package is built.
+                type: list
+                elements: dict
+                default: []
+                suboptions:
+                    name:
+                        description: Name of the alternative group.
+                        type: str
+                        required: true
+                    link:
+                        description: Generic name of the master link.
+                        type: path
+                        required: true
+                    path:
+                        description: Alternative for the master link.
+                        type: path
+                        required: true
+                    priority:
+                        description: Priority of the alternative.
+                        type: int
+                        default: 50
+                    manual:
+                        description: Select this alternative manually.
+                        type: bool
+                        default: false
+            jobs:
+                description: Parallel compile jobs for this package. Defaults to C(jobs).
+                type: int
+            environment:
+                description: Extra environment variables for the build commands of this package. The C(compiler_cache) variables are added on top, like in the autobuild role.
+                type: dict
+                default: {}
+            clean:
+                description: Remove the outputs of a previous build before configuring.
+                type: bool
+                default: false
+            checkinstall:
+                description: Install the package with C(checkinstall) into C(pakdir) instead of running the install step directly.
+                type: bool
+                default: false
+            compiler_cache:
+                description: Wrap the compilers with C(ccache) or C(sccache), like the C(build.compiler_cache) settings of the autobuild role.
+                type: dict
+                default: {}
+                suboptions:
+                    enabled:
+                        description: Whether to use a compiler cache.
+                        type: bool
+                        default: false
+                    tool:
+                        description: The compiler cache to use.
+                        type: str
+                        default: ccache
+                        choices: ["ccache", "sccache"]
+                    dir:
+                        description: Cache directory. Defaults to C(~/.cache/<tool>) of C(build_user).
+                        type: path
+                    max_size:
+                        description: Maximum cache size.
+                        type: str
+                        default: 5G
+                    cc:
+                        description: C compiler wrapped for make builds.
+                        type: str
+                        default: cc
+                    cxx:
+                        description: C++ compiler wrapped for make builds.
+                        type: str
+                        default: c++
+    build_root:
+        description: Directory under which packages without an explicit directory are cloned. Build logs are written here.
+        type: path
+        required: true
+    build_user:
+        description:
+            - User that clones and builds the packages, so checkouts stay owned by that user.
+            - Requires C(runuser) when it differs from the user running the module.
+            - Defaults to the user running the module.
+        type: str
+    pakdir:
+        description: Directory where C(checkinstall) writes the packages it builds. Defaults to C(<build_root>/pkgs).
+        type: path
+    workers:
+        description: Maximum number of packages cloned and built at the same time.
+        type: int
+        default: 2
+    jobs:
+        description: Parallel compile jobs per package. Defaults to the CPU count divided by C(workers).
+        type: int
+    install:
+        description: Whether to run the install step of each package.
+        type: bool
+        default: true
+    ldconfig:
+        description: Whether to run C(ldconfig) once when any built package is a library.
+        type: bool
+        default: true
+    environment:
+        description: Extra environment variables for every clone and build command.
+        type: dict
+        default: {}
+    depth:
+        description:
+            - History depth of the clone. Only the requested version is fetched.
+            - Use C(0) for a full clone.
+        type: int
+        default: 1
+    mirror_dir:
+        description:
+            - Directory of bare mirrors shared by all checkouts on the host.
+            - Each package mirror is refreshed before cloning and used as a C(--reference) repository.
+        type: path
+    dissociate:
+        description: Copy the borrowed objects from the mirror so the checkout does not depend on it.
+        type: bool
+        default: false
+"""
+
+EXAMPLES = r"""
+- name: Build a small toolchain stack
+  jcook3701.utils.autobuild_batch:
+    build_root: "/home/builder/git"
+    build_user: builder
+    pakdir: "/home/builder/pkgs"
+    workers: 3
+    packages:
+      - name: libdrm
+        repo: https://gitlab.freedesktop.org/mesa/drm.git
+        version: libdrm-2.4.120
+        script: meson-ninja
+        library: true
+      - name: mesa
+        repo: https://gitlab.freedesktop.org/mesa/mesa.git
+        version: mesa-24.0.0
+        script: meson-ninja
+        checkinstall: true
+        compiler_cache:
+          enabled: true
+        depends_on: [libdrm]
+  become: true
+"""
+
+RETURN = r"""
+order:
+    description: The topological build order.
+    returned: always
+    type: list
+    elements: str
+    sample: ["libdrm", "mesa"]
+packages:
+    description: Per package build results in build order.
+    returned: always
+    type: list
+    elements: dict
+    contains:
+        name:
+            description: The package name.
+            type: str
+        status:
+            description: One of C(built), C(failed) or C(skipped).
+            type: str
+        phases:
+            description: Duration in seconds of each phase (mirror, clone, clean, configure, compile, install or checkinstall).
+            type: dict
+        msg:
+            description: Failure or skip reason.
+            type: str
+        log:
+            description: Path of the package build log.
+            type: str
+        log_tail:
+            description: Last lines of the build log when the build failed.
+            type: list
+            elements: str
+ldconfig:
+    description: Whether ldconfig was run.
+    returned: always
+    type: bool
+alternatives:
+    description: Names of the alternatives that were installed or updated. Alternatives already registered with the same link and priority are left alone.
+    returned: always
+    type: list
+    elements: str
+"""
+
+LOG_TAIL_LINES = 20
+# Phases run as the module user instead of build_user
+ROOT_PHASES = {"install", "checkinstall"}
+
+
+class PackageResult(TypedDict, total=False):
+    name: str
+    status: str  # built, failed or skipped
+    phases: dict[str, float]
+    msg: str
+    log: str
+    log_tail: list[str]
+
+
+def run_batch(
+    dependencies: dict[str, list[str]],
+    workers: int,
+    build: Callable[[str], PackageResult],
+) -> list[PackageResult]:
+    """
+    Run build(name) for every package with at most `workers` builds in flight.
+
+    A package is started as soon as all of its dependencies have been built.
+    When a build fails, every package that transitively depends on it is skipped.
+
+    Args:
+        dependencies (dict): Maps a package name to the names it depends on.
+        workers (int): Maximum number of concurrent builds.
+        build (callable): Builds a single package and returns its result.
+
+    Returns:
+        list: Package results in topological order.
+    """
+    order = dependency_order(dependencies)
+    waiting = {name: set(deps) for name, deps in dependencies.items()}
+    dependents: dict[str, list[str]] = {name: [] for name in dependencies}
+    for name, deps in dependencies.items():
+        for dep in deps:
+            dependents[dep].append(name)
+
+    results: dict[str, PackageResult] = {}
+    started: set[str] = set()
+
+    def skip_dependents(failed: str) -> None:
+        stack = list(dependents[failed])
+        while stack:
+            name = stack.pop()
+            if name in results:
+                continue
+            results[name] = PackageResult(
+                name=name, status="skipped", msg=f"Dependency '{failed}' failed"
+            )
+            stack.extend(dependents[name])
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        running: dict[Future[PackageResult], str] = {}
+
+        def schedule() -> None:
+            for name in order:
+                if name in started or name in results or waiting[name]:
+                    continue
+                started.add(name)
+                running[pool.submit(build, name)] = name
+
+        schedule()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = PackageResult(name=name, status="failed", msg=str(e))
+                results[name] = result
+                if result["status"] == "built":
+                    for dependent in dependents[name]:
+                        waiting[dependent].discard(name)
+                else:
+                    skip_dependents(name)
+            schedule()
+
+    return [results[name] for name in order]
+
+
+def tail(path: str, lines: int = LOG_TAIL_LINES) -> list[str]:
+    """Return the last lines of a log file."""
+    try:
+        with open(path, errors="replace") as f:
+            return f.read().splitlines()[-lines:]
+    except OSError:
+        return []
+
+
+class CloneOptions(NamedTuple):
+    """How sources are fetched: history depth and an optional local mirror."""
+
+    depth: int = 1
+    reference: str | None = None
+    dissociate: bool = False
+
+
+def mirror_commands(repo: str, mirror: str) -> list[list[str]]:
+    """Return the git commands that create or refresh a bare mirror of `repo`."""
+    if os.path.isdir(mirror):
+        return [["git", "-C", mirror, "remote", "update", "--prune"]]
+    return [["git", "clone", "--mirror", repo, mirror]]
+
+
+def clone_commands(
+    repo: str,
+    directory: str,
+    version: str | None,
+    options: CloneOptions = CloneOptions(),
+) -> list[list[str]]:
+    """
+    Return the git commands that bring `directory` to `version`.
+
+    With a depth, only the requested tag or branch is fetched so clone time and
+    disk use follow the checkout size rather than the full history.
+    """
+    depth = [f"--depth={options.depth}"] if options.depth > 0 else []
+    if os.path.isdir(os.path.join(directory, ".git")):
+        if version:
+            return [
+                ["git", "-C", directory, "fetch", *depth, "origin", version],
+                ["git", "-C", directory, "checkout", "--force", "FETCH_HEAD"],
+            ]
+        return [["git", "-C", directory, "pull", "--ff-only", *depth]]
+
+    argv = ["git", "clone", *depth]
+    if depth:
+        argv.append("--single-branch")
+    if version:
+        argv += ["--branch", version]
+    if options.reference:
+        argv += ["--reference-if-able", options.reference]
+        if options.dissociate:
+            argv.append("--dissociate")
+    return [[*argv, repo, directory]]
+
+
+class PackageBuilder:
+    """Clones and builds single packages with the module's command runner."""
+
+    def __init__(self, module: AnsibleModule, packages: dict[str, dict[str, Any]]):
+        self.module = module
+        self.packages = packages
+        self.build_root: str = module.params["build_root"]
+        self.environment = {
+            str(k): str(v) for k, v in module.params["environment"].items()
+        }
+        self.mirror_dir: str | None = module.params["mirror_dir"]
+        self.clone_options = CloneOptions(
+            depth=module.params["depth"], dissociate=module.params["dissociate"]
+        )
+        workers = max(1, module.params["workers"])
+        self.jobs: int = module.params["jobs"] or max(
+            1, (os.cpu_count() or 1) // workers
+        )
+        self.user = build_user(module.params["build_user"])
+        self.runuser: list[str] = []
+        if self.user is not None:
+            runuser = module.get_bin_path("runuser", required=True)
+            self.runuser = [runuser, "-u", self.user.pw_name, "--"]
+
+    def directory(self, pkg: dict[str, Any]) -> str:
+        return str(pkg["directory"] or os.path.join(self.build_root, pkg["name"]))
+
+    def makedirs(self, path: str) -> None:
+        """Create `path` and any missing parents owned by the build user."""
+        if os.path.isdir(path):
+            return
+        self.makedirs(os.path.dirname(os.path.normpath(path)))
+        os.mkdir(path)
+        if self.user is not None:
+            os.chown(path, self.user.pw_uid, self.user.pw_gid)
+
+    def package_environment(self, pkg: dict[str, Any]) -> dict[str, str]:
+        """Return the environment of the build commands of a package."""
+        home = self.user.pw_dir if self.user else os.path.expanduser("~")
+        cache = compiler_cache_environment(pkg["compiler_cache"], pkg["script"], home)
+        cache_dir = cache.get("CCACHE_DIR") or cache.get("SCCACHE_DIR")
+        if cache_dir:
+            self.makedirs(cache_dir)
+        return {
+            **self.environment,
+            **{str(k): str(v) for k, v in pkg["environment"].items()},
+            **cache,
+        }
+
+    def _run(self, phase: BuildPhase, environment: dict[str, str], log: Any) -> int:
+        argv = phase.argv if phase.name in ROOT_PHASES else self.runuser + phase.argv
+        log.write(f"$ {' '.join(argv)}\n")
+        log.flush()
+        try:
+            rc, out, err = self.module.run_command(
+                argv,
+                cwd=phase.cwd,
+                environ_update=environment,
+                handle_exceptions=False,
+            )
+        except OSError as e:
+            log.write(f"{e!s}\n")
+            return 127
+        log.write(out)
+        log.write(err)
+        log.flush()
+        return int(rc)
+
+    def source_phases(self, pkg: dict[str, Any], directory: str) -> list[BuildPhase]:
+        """Return the mirror and clone commands of a package."""
+        options = self.clone_options
+        phases: list[BuildPhase] = []
+        if self.mirror_dir:
+            mirror = os.path.join(self.mirror_dir, f"{pkg['name']}.git")
+            options = options._replace(reference=mirror)
+            phases += [
+                BuildPhase("mirror", argv, self.build_root)
+                for argv in mirror_commands(pkg["repo"], mirror)
+            ]
+        phases += [
+            BuildPhase("clone", argv, self.build_root)
+            for argv in clone_commands(pkg["repo"], directory, pkg["version"], options)
+        ]
+        return phases
+
+    def build_phases(self, pkg: dict[str, Any], directory: str) -> list[BuildPhase]:
+        """Return the clean, configure, compile and install commands of a package."""
+        phases: list[BuildPhase] = build_phases(
+            pkg["script"],
+            directory,
+            pkg["jobs"] or self.jobs,
+            install_prefix=pkg["install_prefix"],
+            flags=pkg["flags"],
+        )
+        clean = clean_phase(pkg["script"], directory) if pkg["clean"] else None
+        if clean is not None:
+            phases.insert(0, clean)
+        if not self.module.params["install"]:
+            return [phase for phase in phases if phase.name != "install"]
+        if pkg["checkinstall"]:
+            pakdir = self.module.params["pakdir"] or os.path.join(
+                self.build_root, "pkgs"
+            )
+            self.makedirs(pakdir)
+            phases = [
+                (
+                    checkinstall_phase(phase, pkg["name"], pkg["version"], pakdir)
+                    if phase.name == "install"
+                    else phase
+                )
+                for phase in phases
+            ]
+        return phases
+
+    def __call__(self, name: str) -> PackageResult:
+        pkg = self.packages[name]
+        directory = self.directory(pkg)
+        log_path = os.path.join(self.build_root, f"{name}.log")
+        result = PackageResult(name=name, status="built", phases={}, log=log_path)
+        environment = self.package_environment(pkg)
+
+        with open(log_path, "w") as log:
+            if self.user is not None:
+                os.chown(log_path, self.user.pw_uid, self.user.pw_gid)
+            for phase in self.source_phases(pkg, directory):
+                if not self._timed(result, phase, environment, log):
+                    return self._failed(result, phase.name, log_path)
+            # The configure step depends on the files of the checkout
+            for phase in self.build_phases(pkg, directory):
+                if not self._timed(result, phase, environment, log):
+                    return self._failed(result, phase.name, log_path)
+
+        return result
+
+    def _timed(
+        self,
+        result: PackageResult,
+        phase: BuildPhase,
+        environment: dict[str, str],
+        log: Any,
+    ) -> bool:
+        start = time.monotonic()
+        rc = self._run(phase, environment, log)
+        phases = result["phases"]
+        phases[phase.name] = round(
+            phases.get(phase.name, 0.0) + time.monotonic() - start, 3
+        )
+        return rc == 0
+
+    def _failed(
+        self, result: PackageResult, phase: str, log_path: str
+    ) -> PackageResult:
+        result["status"] = "failed"
+        result["msg"] = f"{phase} failed"
+        result["log_tail"] = tail(log_path)
+        return result
+
+
+def build_user(name: str | None) -> pwd.struct_passwd | None:
+    """Return the account to build as, or None when it is the current user."""
+    if not name:
+        return None
+    user = pwd.getpwnam(name)
+    return None if user.pw_uid == os.geteuid() else user
+
+
+def finalize(
+    module: AnsibleModule,
+    packages: dict[str, dict[str, Any]],
+    results: list[PackageResult],
+) -> dict[str, Any]:
+    """Run ldconfig and update-alternatives once for all built packages."""
+    built = [packages[r["name"]] for r in results if r["status"] == "built"]
+    summary: dict[str, Any] = {"ldconfig": False, "alternatives": []}
+
+    if module.params["ldconfig"] and any(pkg["library"] for pkg in built):
+        rc, _, err = module.run_command(["ldconfig"])
+        if rc != 0:
+            module.fail_json(msg=f"ldconfig failed: {err}", packages=results)
+        summary["ldconfig"] = True
+
+    entries = [alt for pkg in built for alt in pkg["alternatives"]]
+    if entries:
+        try:
+            applied = apply_alternatives(module, entries)
+        except OSError as e:
+            module.fail_json(msg=str(e), packages=results)
+        summary["alternatives"] = sorted(
+            {str(entry["name"]) for entry in applied["installed"]}
+        )
+
+    return summary
+
+
+def run_module() -> None:
+    package_options = {
+        "name": {"type": "str", "required": True},
+        "repo": {"type": "str", "required": True},
+        "version": {"type": "str"},
+        "directory": {"type": "path"},
+        "script": {"type": "str", "default": "make", "choices": BUILD_SCRIPTS},
+        "flags": {"type": "list", "elements": "str", "default": []},
+        "install_prefix": {"type": "path"},
+        "depends_on": {"type": "list", "elements": "str", "default": []},
+        "library": {"type": "bool", "default": False},
+        "alternatives": {
+            "type": "list",
+            "elements": "dict",
+            "default": [],
+            "options": ALTERNATIVE_OPTIONS,
+        },
+        "jobs": {"type": "int"},
+        "environment": {"type": "dict", "default": {}},
+        "clean": {"type": "bool", "default": False},
+        "checkinstall": {"type": "bool", "default": False},
+        "compiler_cache": {
+            "type": "dict",
+            "default": {},
+            "options": COMPILER_CACHE_OPTIONS,
+        },
+    }
+    module_args = {
+        "packages": {
+            "type": "list",
+            "elements": "dict",
+            "required": True,
+            "options": package_options,
+        },
+        "build_root": {"type": "path", "required": True},
+        "build_user": {"type": "str"},
+        "pakdir": {"type": "path"},
+        "workers": {"type": "int", "default": 2},
+        "jobs": {"type": "int"},
+        "install": {"type": "bool", "default": True},
+        "ldconfig": {"type": "bool", "default": True},
+        "environment": {"type": "dict", "default": {}},
+        "depth": {"type": "int", "default": 1},
+        "mirror_dir": {"type": "path"},
+        "dissociate": {"type": "bool", "default": False},
+    }
+
+    result: dict[str, Any] = {"changed": False, "order": [], "packages": []}
+
+    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+
+    packages = {pkg["name"]: pkg for pkg in module.params["packages"]}
+    if len(packages) != len(module.params["packages"]):
+        module.fail_json(msg="Package names must be unique", **result)
+    dependencies = {name: pkg["depends_on"] for name, pkg in packages.items()}
+
+    try:
+        result["order"] = dependency_order(dependencies)
+    except DependencyError as e:
+        module.fail_json(msg=str(e), **result)
+
+    if module.check_mode:
+        module.exit_json(**result)
+
+    try:
+        builder = PackageBuilder(module, packages)
+        builder.makedirs(module.params["build_root"])
+        if module.params["mirror_dir"]:
+            builder.makedirs(module.params["mirror_dir"])
+    except (KeyError, OSError) as e:
+        module.fail_json(msg=f"Error preparing the build: {e!s}", **result)
+    result["packages"] = run_batch(dependencies, module.params["workers"], builder)
+    result["changed"] = any(r["status"] == "built" for r in result["packages"])
+    result.update(finalize(module, packages, result["packages"]))
+
+    failed = [r["name"] for r in result["packages"] if r["status"] == "failed"]
+    if failed:
+        module.fail_json(msg=f"Failed to build: {', '.join(failed)}", **result)
+    module.exit_json(**result)
+
+
+def main() -> None:
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
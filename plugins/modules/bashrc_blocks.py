@@ -0,0 +1,304 @@
+#!/usr/bin/python3
+#
+# bashrc_blocks.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import os
+import tempfile
+from typing import Any
+
+from ansible.module_utils.basic import AnsibleModule
+
+DOCUMENTATION = r"""
+---
+module: bashrc_blocks
+short_description: Update many marker delimited blocks of a file at once
+description:
+    - This module inserts, updates or removes several marker delimited blocks, like M(ansible.builtin.blockinfile), with a single read and a single atomic write of the file.
+    - Blocks whose content is unchanged are left alone and the file is only written when at least one block changed.
+    - Blocks that are not found in the file yet are appended to its end in the order given.
+    - Symbolic links are followed so the file they point to is updated, and its mode and ownership are kept.
+version_added: "1.0.0"
+author:
+    - Jared Cook
+options:
+    path:
+        description: The file to update, for example C(~/.bashrc).
+        type: path
+        required: true
+    blocks:
+        description: The blocks to manage.  When several blocks share a marker the last one wins.
+        type: list
+        elements: dict
+        required: true
+        suboptions:
+            name:
+                description: Name of the block, used in the default marker and in the results.
+                type: str
+                required: true
+            block:
+                description: The text between the markers.  An empty block is removed like with C(state=absent).
+                type: str
+                default: ""
+            marker:
+                description:
+                    - The marker line template.  C({mark}) is replaced with O(marker_begin) or O(marker_end).
+                    - Defaults to C(# {mark} Ansible - <name>).
+                type: str
+            state:
+                description: Whether the block should be present or absent.
+                type: str
+                default: present
+                choices: ["present", "absent"]
+    marker_begin:
+        description: The text replacing C({mark}) in the opening marker line.
+        type: str
+        default: BEGIN
+    marker_end:
+        description: The text replacing C({mark}) in the closing marker line.
+        type: str
+        default: END
+    create:
+        description: Create the file when it does not exist.
+        type: bool
+        default: true
+"""
+
+EXAMPLES = r"""
+- name: Export the install paths of every source build
+  jcook3701.utils.bashrc_blocks:
+    path: "{{ sudo_user_home }}/.bashrc"
+    blocks:
+      - name: emacs
+        block: export PATH=/opt/emacs/bin:$PATH
+      - name: mesa
+        block: export LD_LIBRARY_PATH=/opt/mesa/lib:$LD_LIBRARY_PATH
+      - name: old-tool
+        state: absent
+  become: true
+  become_user: "{{ sudo_user }}"
+"""
+
+RETURN = r"""
+changed_blocks:
+    description: Names of the blocks that were added, updated or removed.
+    returned: always
+    type: list
+    elements: str
+    sample: ["emacs", "old-tool"]
+blocks:
+    description: The action taken for every block; one of C(added), C(updated), C(removed) or C(unchanged).
+    returned: always
+    type: dict
+    sample: {"emacs": "added", "mesa": "unchanged", "old-tool": "removed"}
+"""
+
+
+def marker_lines(
+    entry: dict[str, Any], marker_begin: str, marker_end: str
+) -> tuple[str, str]:
+    """Return the opening and closing marker lines of a block."""
+    marker = entry.get("marker") or f"# {{mark}} Ansible - {entry['name']}"
+    return marker.replace("{mark}", marker_begin), marker.replace("{mark}", marker_end)
+
+
+def render_block(begin: str, end: str, block: str) -> list[str]:
+    """Return the lines of a block including its markers."""
+    if not block.endswith("\n"):
+        block += "\n"
+    return [f"{begin}\n", *block.splitlines(keepends=True), f"{end}\n"]
+
+
+def find_blocks(
+    lines: list[str], markers: dict[str, str]
+) -> dict[str, tuple[int, int]]:
+    """
+    Locate blocks in a single pass over `lines`.
+
+    `markers` maps opening to closing marker lines.  Returns the first line
+    index of each block found and the index just past its closing marker.
+    """
+    found: dict[str, tuple[int, int]] = {}
+    open_begin: str | None = None
+    start = 0
+    for i, line in enumerate(lines):
+        text = line.rstrip("\r\n")
+        if open_begin is None:
+            if text in markers and text not in found:
+                open_begin, start = text, i
+        elif text == markers[open_begin]:
+            found[open_begin] = (start, i + 1)
+            open_begin = None
+    return found
+
+
+def update_blocks(
+    text: str,
+    entries: list[dict[str, Any]],
+    marker_begin: str = "BEGIN",
+    marker_end: str = "END",
+) -> tuple[str, dict[str, str]]:
+    """
+    Apply every block to `text`.
+
+    Returns the new text and the action taken for each block name.
+    """
+    wanted: dict[str, tuple[str, dict[str, Any]]] = {}
+    for entry in entries:
+        begin, end = marker_lines(entry, marker_begin, marker_end)
+        wanted.pop(begin, None)
+        wanted[begin] = (end, entry)
+
+    lines = text.splitlines(keepends=True)
+    found = find_blocks(lines, {begin: end for begin, (end, _) in wanted.items()})
+
+    actions: dict[str, str] = {}
+    replacements: dict[int, tuple[int, list[str]]] = {}
+    appended: list[str] = []
+    for begin, (end, entry) in wanted.items():
+        name = str(entry["name"])
+        block = entry.get("block") or ""
+        present = entry.get("state", "present") != "absent" and bool(block)
+        new = render_block(begin, end, block) if present else []
+        if begin not in found:
+            actions[name] = "added" if present else "unchanged"
+            appended.extend(new)
+            continue
+        start, stop = found[begin]
+        if lines[start:stop] == new:
+            actions[name] = "unchanged"
+            continue
+        actions[name] = "updated" if present else "removed"
+        replacements[start] = (stop, new)
+
+    if not replacements and not appended:
+        return text, actions
+
+    output: list[str] = []
+    i = 0
+    for start in sorted(replacements):
+        stop, new = replacements[start]
+        output.extend(lines[i:start])
+        output.extend(new)
+        i = stop
+    output.extend(lines[i:])
+    if appended:
+        if output and not output[-1].endswith("\n"):
+            output[-1] += "\n"
+        output.extend(appended)
+    return "".join(output), actions
+
+
+def write_file(path: str, text: str) -> None:
+    """Atomically replace `path`, keeping the mode and owner of the old file."""
+    directory = os.path.dirname(path) or "."
+    try:
+        st: os.stat_result | None = os.stat(path)
+    except FileNotFoundError:
+        st = None
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".bashrc_blocks.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        if st is None:
+            os.chmod(tmp, 0o644)
+        else:
+            os.chmod(tmp, st.st_mode & 0o7777)
+            if (st.st_uid, st.st_gid) != (os.getuid(), os.getgid()):
+                os.chown(tmp, st.st_uid, st.st_gid)
+        os.replace(tmp, path)
+    except OSError:
+        os.unlink(tmp)
+        raise
+
+
+def run_module() -> None:
+    block_options = {
+        "name": {"type": "str", "required": True},
+        "block": {"type": "str", "default": ""},
+        "marker": {"type": "str"},
+        "state": {
+            "type": "str",
+            "default": "present",
+            "choices": ["present", "absent"],
+        },
+    }
+    module_args = {
+        "path": {"type": "path", "required": True},
+        "blocks": {
+            "type": "list",
+            "elements": "dict",
+            "required": True,
+            "options": block_options,
+        },
+        "marker_begin": {"type": "str", "default": "BEGIN"},
+        "marker_end": {"type": "str", "default": "END"},
+        "create": {"type": "bool", "default": True},
+    }
+
+    result: dict[str, Any] = {"changed": False, "changed_blocks": [], "blocks": {}}
+
+    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+
+    path = os.path.realpath(module.params["path"])
+    try:
+        with open(path) as f:
+            before = f.read()
+    except FileNotFoundError:
+        if not module.params["create"]:
+            module.fail_json(msg=f"File {path} does not exist", **result)
+        before = ""
+    except OSError as e:
+        module.fail_json(msg=f"Error reading {path}: {e!s}", **result)
+
+    after, actions = update_blocks(
+        before,
+        module.params["blocks"],
+        module.params["marker_begin"],
+        module.params["marker_end"],
+    )
+    result["blocks"] = actions
+    result["changed_blocks"] = [
+        name for name, action in actions.items() if action != "unchanged"
+    ]
+    result["changed"] = after != before
+
+    if result["changed"]:
+        result["diff"] = {
+            "before_header": path,
+            "after_header": path,
+            "before": before,
+            "after": after,
+        }
+        if not module.check_mode:
+            try:
+                write_file(path, after)
+            except OSError as e:
+                module.fail_json(msg=f"Error writing {path}: {e!s}", **result)
+
+    module.exit_json(**result)
+
+
+def main() -> None:
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
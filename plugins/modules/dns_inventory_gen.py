@@ -20,12 +20,24 @@
 
 from __future__ import annotations  # Allows forward references and cleaner typing
 
+import contextlib
+import hashlib
+import os
 import re
-from ipaddress import ip_address
-from typing import Any
+import socket
+import stat
+import struct
+import tempfile
+import zlib
+from array import array
+from collections.abc import Iterable
+from typing import Any, NamedTuple
 
-import yaml
 from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.jcook3701.utils.plugins.module_utils.profiling import (
+    PROFILE_ARGUMENT_SPEC,
+    Profiler,
+)
 
 DOCUMENTATION = r"""
 ---
@@ -34,9 +46,14 @@ short_description: Generate Ansible inventory from DNS zone files
 description:
     - This module parses a DNS zone file and generates a structured YAML inventory.
     - It extracts A and AAAA records while ignoring SOA and NS records.
+    - When C(index_dir) is set, a binary index of the parsed records is kept per zone. When the SOA serial has not changed since the index was written the zone is not read again.
+    - When the serial changed, only lines that differ from the indexed ones are tokenized, and the hosts added, removed or changed since the previous run are reported.
+    - The inventory file is only rewritten when its content changes.
 version_added: "1.0.0"
 author:
     - Jared Cook
+extends_documentation_fragment:
+    - jcook3701.utils.profile
 options:
     zone_file:
         description: Path to the DNS zone file to parse.
@@ -46,6 +63,13 @@ options:
         description: Path where the generated YAML inventory should be saved.
         type: str
         required: true
+    index_dir:
+        description:
+            - Directory holding the record index of each zone and inventory pair, for example C(/var/cache/jcook3701.utils/dns_inventory_gen).
+            - When unset the whole zone is parsed on every run.
+            - The serial must be incremented on every zone change, as for secondary name servers.
+            - A failure to save the index is reported as a warning.
+        type: path
 """
 
 EXAMPLES = r"""
@@ -53,6 +77,18 @@ EXAMPLES = r"""
   jcook3701.utils.dns_inventory_gen:
     zone_file: "/var/lib/bind/db.example.com"
     output_file: "/etc/ansible/hosts.yml"
+
+- name: Refresh the inventory hourly and show what changed
+  jcook3701.utils.dns_inventory_gen:
+    zone_file: "/var/lib/bind/db.example.com"
+    output_file: "/etc/ansible/hosts.yml"
+    index_dir: /var/cache/jcook3701.utils/dns_inventory_gen
+  register: dns_inventory
+
+- name: Report new hosts
+  ansible.builtin.debug:
+    var: dns_inventory.added
+  when: dns_inventory.added | length > 0
 """
 
 RETURN = r"""
@@ -61,68 +97,516 @@ message:
     returned: success
     type: str
     sample: "Inventory created: /etc/ansible/hosts.yml"
+serial:
+    description: SOA serial of the zone, or C(null) when the zone has no SOA record.
+    returned: when index_dir is set
+    type: int
+    sample: 2026030301
+serial_unchanged:
+    description: Whether the zone was skipped because its serial matches the index.
+    returned: when index_dir is set
+    type: bool
+initialized:
+    description: Whether this run created the index, in which case no delta is reported.
+    returned: when index_dir is set
+    type: bool
+records:
+    description: Number of A and AAAA records in the zone.
+    returned: when index_dir is set
+    type: int
+tokenized_lines:
+    description: Number of zone lines that had to be tokenized because they were not in the index.
+    returned: when index_dir is set
+    type: int
+added:
+    description: Hosts added since the previous run, mapped to their addresses.
+    returned: when index_dir is set
+    type: dict
+    sample: {"web03": "192.168.1.7"}
+removed:
+    description: Hosts removed since the previous run, mapped to their previous addresses.
+    returned: when index_dir is set
+    type: dict
+changed_hosts:
+    description: Hosts whose address changed, mapped to C(before) and C(after) addresses.
+    returned: when index_dir is set
+    type: dict
+    sample: {"db01": {"before": "192.168.1.3", "after": "192.168.1.9"}}
+metrics:
+    description: Phase timings, peak RSS and optional cProfile summary of the module run.
+    returned: when _profile or _profile_top is set
+    type: dict
 """
 
 # Type Aliases using native generics
 DnsRecord = list[str]
 
+# Index layout (native byte order, the index is a local cache):
+#   header, then `count` line offsets (Q), line lengths (I) and CRC32s (I),
+#   then the owner names and addresses as newline separated blobs.
+INDEX_MAGIC = b"JDZI"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("=4sHqIII")
+NO_SERIAL = -1
+
+# Scalars PyYAML emits without quotes unless they resolve to another type
+PLAIN_SCALAR = re.compile(r"[A-Za-z0-9_][A-Za-z0-9_.:-]*")
+STR_TAG = "tag:yaml.org,2002:str"
+# Dotted quads never match the YAML int, float or timestamp patterns
+IPV4_ADDRESS = re.compile(r"[0-9]{1,3}(?:\.[0-9]{1,3}){3}")
+# Longer mapping keys are written as explicit `? key` entries
+SIMPLE_KEY_LENGTH = 128
+
+
+class ZoneIndex(NamedTuple):
+    """Parsed A/AAAA records of a zone with the location of their lines."""
+
+    serial: int | None
+    offsets: array[int]
+    lengths: array[int]
+    crcs: array[int]
+    owners: list[bytes]
+    addresses: list[bytes]
+
+
+def parse_record_line(line: str) -> DnsRecord | None:
+    """Return the fields of an A or AAAA record line, or None for other lines."""
+    line = line.strip()
+    if not line or line.startswith(";"):
+        return None
+    parts = re.split(r"\s+", line)
+    if len(parts) >= 4 and parts[2] in ["A", "AAAA"]:
+        if "@" not in parts[0]:
+            return parts
+    return None
+
 
 def parse_dns_zone(zone_file: str) -> list[DnsRecord]:
     """Parse the DNS zone file using native list generics."""
     records: list[DnsRecord] = []
     with open(zone_file) as file:
         for raw_line in file:
-            line = raw_line.strip()
-            if not line or line.startswith(";"):
-                continue
-            parts = re.split(r"\s+", line)
-            if len(parts) >= 4 and parts[2] in ["A", "AAAA"]:
-                if "@" not in parts[0]:
-                    records.append(parts)
+            record = parse_record_line(raw_line)
+            if record is not None:
+                records.append(record)
     return records
 
 
+def read_soa_serial(zone_file: str) -> int | None:
+    """
+    Return the SOA serial of a zone, reading only up to the SOA record.
+
+    The SOA may span several lines inside parentheses; comments are ignored.
+    """
+    fields: list[str] = []
+    with open(zone_file, encoding="utf-8", errors="replace") as file:
+        for raw_line in file:
+            tokens = raw_line.split(";", 1)[0].replace("(", " ").replace(")", " ")
+            if not fields:
+                words = tokens.split()
+                if "SOA" not in words:
+                    continue
+                tokens = " ".join(words[words.index("SOA") + 1 :])
+                fields.append("SOA")
+            fields.extend(tokens.split())
+            # SOA, MNAME, RNAME, SERIAL
+            if len(fields) >= 4:
+                return int(fields[3]) if fields[3].isdigit() else None
+    return None
+
+
+def scan_zone(data: bytes, previous: ZoneIndex | None) -> tuple[ZoneIndex, int]:
+    """
+    Index the A/AAAA records of a zone.
+
+    Lines whose length and CRC32 match a record line of `previous` reuse its
+    owner and address instead of being tokenized again. Returns the index
+    (without serial) and the number of tokenized lines.
+    """
+    known: dict[tuple[int, int], int] = {}
+    if previous is not None:
+        known = {
+            key: i
+            for i, key in enumerate(zip(previous.crcs, previous.lengths, strict=True))
+        }
+
+    index = ZoneIndex(None, array("Q"), array("I"), array("I"), [], [])
+    tokenized = 0
+    offset = 0
+    for line in data.split(b"\n"):
+        length = len(line)
+        crc = zlib.crc32(line)
+        hit = known.get((crc, length))
+        if hit is not None and previous is not None:
+            owner, address = previous.owners[hit], previous.addresses[hit]
+            # Guard against CRC collisions before trusting the indexed fields
+            if not (line.startswith(owner) and line.rstrip().endswith(address)):
+                hit = None
+        if hit is None:
+            if not line or line.startswith(b";"):
+                offset += length + 1
+                continue
+            tokenized += 1
+            record = parse_record_line(line.decode("utf-8", errors="replace"))
+            if record is None:
+                offset += length + 1
+                continue
+            owner, address = record[0].encode(), record[3].encode()
+        index.offsets.append(offset)
+        index.lengths.append(length)
+        index.crcs.append(crc)
+        index.owners.append(owner)
+        index.addresses.append(address)
+        offset += length + 1
+    return index, tokenized
+
+
+def index_path(index_dir: str, zone_file: str, output_file: str) -> str:
+    """Return the index file of a zone and inventory pair."""
+    key = f"{os.path.realpath(zone_file)}\0{os.path.realpath(output_file)}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return os.path.join(index_dir, f"{os.path.basename(zone_file)}-{digest}.idx")
+
+
+def read_index_header(path: str) -> tuple[int | None, int] | None:
+    """Return the serial and record count of an index without loading it."""
+    try:
+        with open(path, "rb") as f:
+            header = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+    except (OSError, struct.error):
+        return None
+    magic, version, serial, count, _owners_len, _addresses_len = header
+    if magic != INDEX_MAGIC or version != INDEX_VERSION:
+        return None
+    return (None if serial == NO_SERIAL else serial), count
+
+
+def load_index(path: str) -> ZoneIndex | None:
+    """Read an index file, returning None when it is missing or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, serial, count, owners_len, addresses_len = (
+            INDEX_HEADER.unpack_from(data)
+        )
+    except (OSError, struct.error):
+        return None
+    if magic != INDEX_MAGIC or version != INDEX_VERSION:
+        return None
+
+    position = INDEX_HEADER.size
+    columns = []
+    for typecode in ("Q", "I", "I"):
+        column = array(typecode)
+        end = position + count * column.itemsize
+        column.frombytes(data[position:end])
+        columns.append(column)
+        position = end
+    owners = data[position : position + owners_len].split(b"\n")
+    position += owners_len
+    addresses = data[position : position + addresses_len].split(b"\n")
+    if count == 0:
+        owners, addresses = [], []
+    if not (len(columns[0]) == len(owners) == len(addresses) == count):
+        return None
+    return ZoneIndex(
+        None if serial == NO_SERIAL else serial,
+        columns[0],
+        columns[1],
+        columns[2],
+        owners,
+        addresses,
+    )
+
+
+def save_index(path: str, index: ZoneIndex) -> None:
+    """Atomically write an index file."""
+    owners = b"\n".join(index.owners)
+    addresses = b"\n".join(index.addresses)
+    serial = NO_SERIAL if index.serial is None else index.serial
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, "wb") as f:
+        f.write(
+            INDEX_HEADER.pack(
+                INDEX_MAGIC,
+                INDEX_VERSION,
+                serial,
+                len(index.offsets),
+                len(owners),
+                len(addresses),
+            )
+        )
+        for column in (index.offsets, index.lengths, index.crcs):
+            column.tofile(f)
+        f.write(owners)
+        f.write(addresses)
+    os.replace(tmp, path)
+
+
+def address_key(address: str) -> bytes:
+    """Sort IPv4 before IPv6 addresses, numerically within each family."""
+    if ":" in address:
+        return b"\x06" + socket.inet_pton(socket.AF_INET6, address)
+    return b"\x04" + socket.inet_pton(socket.AF_INET, address)
+
+
+def host_map(records: Iterable[tuple[str, str]]) -> dict[str, str]:
+    """
+    Map hostnames to addresses.
+
+    When several hosts share an address the last record wins; a host with
+    several addresses keeps the highest one, IPv6 sorting after IPv4.
+    """
+    # Maps IP -> Hostname (native dict)
+    ip_to_hostname: dict[str, str] = {}
+    for hostname, ip in records:
+        ip_to_hostname[ip] = hostname
+    hosts: dict[str, str] = {}
+    for ip, hostname in ip_to_hostname.items():
+        current = hosts.setdefault(hostname, ip)
+        if current != ip and address_key(ip) > address_key(current):
+            hosts[hostname] = ip
+    return hosts
+
+
+def index_hosts(index: ZoneIndex) -> dict[str, str]:
+    # Decoding the joined blobs is much faster than decoding every entry
+    owners = b"\n".join(index.owners).decode("utf-8", errors="replace").split("\n")
+    addresses = b"\n".join(index.addresses).decode().split("\n")
+    if not index.owners:
+        return {}
+    return host_map(zip(owners, addresses, strict=True))
+
+
+def host_delta(
+    before: dict[str, str], after: dict[str, str]
+) -> tuple[dict[str, str], dict[str, str], dict[str, dict[str, str]]]:
+    """Return the added, removed and changed hosts between two host maps."""
+    added = {name: after[name] for name in sorted(after.keys() - before.keys())}
+    removed = {name: before[name] for name in sorted(before.keys() - after.keys())}
+    changed = {
+        name: {"before": before[name], "after": after[name]}
+        for name in sorted(before.keys() & after.keys())
+        if before[name] != after[name]
+    }
+    return added, removed, changed
+
+
+def render_inventory(hosts: dict[str, str]) -> str:
+    """
+    Render the inventory exactly as `yaml.dump` would, sorted by hostname.
+
+    PyYAML builds a node per scalar, which dominates the run time on large
+    zones, so entries whose names and addresses are plain scalars are written
+    directly and only the others are passed through PyYAML.
+    """
+    # PyYAML is only loaded once there is an inventory to render
+    import yaml  # noqa: PLC0415
+
+    dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+    if not hosts:
+        return str(yaml.dump({"all": {"hosts": {}}}, Dumper=dumper))
+
+    resolver = yaml.resolver.Resolver()
+    # Only scalars starting with these characters can resolve to non-strings
+    implicit_first = set(resolver.yaml_implicit_resolvers)
+
+    def plain(value: str) -> bool:
+        if IPV4_ADDRESS.fullmatch(value):
+            return True
+        return bool(
+            len(value) < SIMPLE_KEY_LENGTH
+            and PLAIN_SCALAR.fullmatch(value)
+            and not value.endswith(":")
+            and (
+                value[0] not in implicit_first
+                or resolver.resolve(  # type: ignore[no-untyped-call]
+                    yaml.ScalarNode, value, (True, False)
+                )
+                == STR_TAG
+            )
+        )
+
+    lines = ["all:\n  hosts:\n"]
+    for name in sorted(hosts):
+        ip = hosts[name]
+        if plain(name) and plain(ip):
+            lines.append(f"    {name}:\n      ansible_host: {ip}\n")
+            continue
+        entry = yaml.dump(
+            {name: {"ansible_host": ip}}, Dumper=dumper, default_flow_style=False
+        )
+        lines.extend(f"    {line}\n" for line in entry.splitlines())
+    return "".join(lines)
+
+
+def read_text(path: str) -> str | None:
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def write_inventory(path: str, content: str) -> None:
+    """Atomically replace the inventory, keeping the mode of the old file."""
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except OSError:
+        os.unlink(tmp)
+        raise
+
+
+def write_outputs(
+    module: AnsibleModule,
+    dest_path: str,
+    content: str | None,
+    path: str,
+    index: ZoneIndex | None,
+) -> None:
+    """
+    Save the index, then write the inventory when `content` is set.
+
+    A failure to save the index only warns.  When the inventory cannot be
+    written the new index is removed again, so the next run does not skip
+    the zone because of its serial.
+    """
+    saved = False
+    if index is not None:
+        try:
+            save_index(path, index)
+            saved = True
+        except OSError as e:
+            module.warn(f"Could not save the zone index {path}: {e!s}")
+    if content is None:
+        return
+    try:
+        write_inventory(dest_path, content)
+    except OSError:
+        if saved:
+            with contextlib.suppress(OSError):
+                os.unlink(path)
+        raise
+
+
+def update_index(
+    zone_path: str, path: str, profiler: Profiler, result: dict[str, Any]
+) -> tuple[ZoneIndex | None, dict[str, str] | None]:
+    """
+    Refresh the index of a zone and fill the delta fields of `result`.
+
+    Returns the new index and its host map, both None when the zone was
+    skipped because its serial did not change.
+    """
+    with profiler.phase("index"):
+        serial = read_soa_serial(zone_path)
+        header = read_index_header(path)
+    result.update(
+        serial=serial,
+        serial_unchanged=False,
+        initialized=header is None,
+        tokenized_lines=0,
+        added={},
+        removed={},
+        changed_hosts={},
+    )
+    if header is not None and serial is not None and header[0] == serial:
+        result.update(serial_unchanged=True, records=header[1])
+        return None, None
+
+    with profiler.phase("index"):
+        previous = load_index(path) if header is not None else None
+
+    with profiler.phase("parse"), open(zone_path, "rb") as f:
+        index, tokenized = scan_zone(f.read(), previous)
+    index = index._replace(serial=serial)
+    result.update(records=len(index.owners), tokenized_lines=tokenized)
+
+    with profiler.phase("diff"):
+        hosts = index_hosts(index)
+        if previous is not None:
+            added, removed, changed = host_delta(index_hosts(previous), hosts)
+            result.update(added=added, removed=removed, changed_hosts=changed)
+    return index, hosts
+
+
 def run_module() -> None:
+    profiler = Profiler()
     module_args = {
         "zone_file": {"type": "str", "required": True},
         "output_file": {"type": "str", "required": True},
+        "index_dir": {"type": "path"},
+        **PROFILE_ARGUMENT_SPEC,
     }
 
     result: dict[str, Any] = {"changed": False, "message": ""}
 
     module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+    profiler.configure(module.params)
 
     zone_path: str = module.params["zone_file"]
     dest_path: str = module.params["output_file"]
+    index_dir: str | None = module.params.get("index_dir")
 
     try:
-        records = parse_dns_zone(zone_path)
-
-        # Maps IP -> Hostname (native dict)
-        ip_to_hostname: dict[str, str] = {}
-        for record in records:
-            hostname, _, _, ip = record[:4]
-            ip_to_hostname[ip] = hostname
+        index: ZoneIndex | None = None
+        path = ""
+        if index_dir:
+            path = index_path(index_dir, zone_path, dest_path)
+            index, hosts = update_index(zone_path, path, profiler, result)
+            if hosts is None:
+                if os.path.exists(dest_path):
+                    result["message"] = f"Zone serial unchanged, {dest_path} is current"
+                    module.exit_json(**profiler.report(result))
+                    return
+                # Serial unchanged but the inventory is missing
+                index = load_index(path)
+                if index is None:
+                    raise ValueError(f"Unreadable index {path}")
+                hosts = index_hosts(index)
+        else:
+            with profiler.phase("parse"):
+                records = parse_dns_zone(zone_path)
+            hosts = host_map((record[0], record[3]) for record in records)
 
-        sorted_ips = sorted(ip_to_hostname.keys(), key=ip_address)
-
-        inventory = {
-            "all": {
-                "hosts": {ip_to_hostname[ip]: {"ansible_host": ip} for ip in sorted_ips}
-            }
-        }
+        # Without host changes since the indexed run the inventory is current
+        delta = result.get("initialized", True) or any(
+            result[key] for key in ("added", "removed", "changed_hosts")
+        )
+        if delta or not os.path.exists(dest_path):
+            with profiler.phase("render"):
+                content = render_inventory(hosts)
+                result["changed"] = read_text(dest_path) != content
 
-        # Check for changes if using check_mode
-        # In a real module, you'd compare existing file content here
-        with open(dest_path, "w") as f:
-            yaml.dump(inventory, f, default_flow_style=False)
+        if not module.check_mode:
+            with profiler.phase("write"):
+                write_outputs(
+                    module,
+                    dest_path,
+                    content if result["changed"] else None,
+                    path,
+                    index,
+                )
 
-        result["changed"] = True
         result["message"] = f"Inventory generated at {dest_path}"
-        module.exit_json(**result)
+        module.exit_json(**profiler.report(result))
 
     except Exception as e:
-        module.fail_json(msg=f"Failed to process zone file: {e!s}", **result)
+        module.fail_json(
+            msg=f"Failed to process zone file: {e!s}", **profiler.report(result)
+        )
 
 
 if __name__ == "__main__":
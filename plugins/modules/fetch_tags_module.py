@@ -18,10 +18,23 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+import urllib.error
 import urllib.parse
+import urllib.request
+from email.message import Message
+from typing import Any, NamedTuple
 
-import requests
 from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.jcook3701.utils.plugins.module_utils.profiling import (
+    PROFILE_ARGUMENT_SPEC,
+    Profiler,
+)
 
 DOCUMENTATION = r"""
 ---
@@ -32,6 +45,8 @@ description:
 version_added: "1.0.0"
 author:
     - Jared Cook
+extends_documentation_fragment:
+    - jcook3701.utils.profile
 options:
     provider:
         description: The git hosting platform.
@@ -54,6 +69,28 @@ options:
         description: If true, returns only the most recent tag instead of a list.
         type: bool
         default: false
+    api_url:
+        description:
+            - Base URL of the provider API, for example C(https://github.example.com/api/v3) or a local API emulator.
+            - Defaults to the public API of the provider.
+        type: str
+    per_page:
+        description: Number of tags requested per page. Every page is followed through the C(Link) or C(X-Next-Page) headers.
+        type: int
+        default: 100
+    retries:
+        description: Attempts per page when the API answers with a rate limit (403/429) or server error. C(0) and C(1) make a single attempt without retrying.
+        type: int
+        default: 3
+    max_wait:
+        description: Longest time in seconds to wait for a rate limit to reset before failing. C(0) fails on the first rate limit.
+        type: int
+        default: 60
+    cache_dir:
+        description:
+            - Directory used to cache pages together with their C(ETag).
+            - Cached pages are revalidated with C(If-None-Match); C(304) answers do not count against the GitHub rate limit.
+        type: path
 """
 
 EXAMPLES = r"""
@@ -63,6 +100,14 @@ EXAMPLES = r"""
     owner: ansible
     repo: ansible
     latest: true
+
+- name: Get every tag from a GitHub Enterprise server, reusing cached pages
+  jcook3701.utils.fetch_tags_module:
+    provider: github
+    owner: infra
+    repo: tools
+    api_url: https://github.example.com/api/v3
+    cache_dir: /var/cache/jcook3701.utils/tags
 """
 
 RETURN = r"""
@@ -72,6 +117,10 @@ tags:
     type: list
     elements: str
     sample: ["v1.0.0", "v1.1.0"]
+metrics:
+    description: Phase timings, peak RSS and optional cProfile summary of the module run.
+    returned: when _profile or _profile_top is set
+    type: dict
 """
 
 
@@ -82,21 +131,25 @@ class APIError(dict[str, str]):
 
 FetchResult = list[str] | str | APIError
 
+LINK_NEXT = re.compile(r'<([^>]+)>\s*;\s*rel="?next"?')
+
 
 class PlatformConfig:
     """Class to hold platform-specific API logic."""
 
-    def __init__(self, name: str, api_template: str, auth_type: str):
+    def __init__(self, name: str, base_url: str, path_template: str, auth_type: str):
         self.name = name
-        self.api_template = api_template
+        self.base_url = base_url
+        self.path_template = path_template
         self.auth_type = auth_type
 
-    def get_url(self, owner: str, repo: str) -> str:
+    def get_url(self, owner: str, repo: str, base_url: str | None = None) -> str:
+        base = (base_url or self.base_url).rstrip("/")
         # For GitLab, format owner/repo as `group%2Fproject`
         if "gitlab" in self.name:
             project_path = urllib.parse.quote_plus(f"{owner}/{repo}")
-            return self.api_template.format(project_path=project_path)
-        return self.api_template.format(owner=owner, repo=repo)
+            return base + self.path_template.format(project_path=project_path)
+        return base + self.path_template.format(owner=owner, repo=repo)
 
     def get_headers(self, token: str | None) -> dict[str, str]:
         if not token:
@@ -108,60 +161,232 @@ class PlatformConfig:
 
 PLATFORMS = {
     "github": PlatformConfig(
-        "github", "https://api.github.com/repos/{owner}/{repo}/tags", "bearer"
+        "github", "https://api.github.com", "/repos/{owner}/{repo}/tags", "bearer"
     ),
     "gitlab": PlatformConfig(
         "gitlab",
-        "https://gitlab.com/api/v4/projects/{project_path}/repository/tags",
+        "https://gitlab.com/api/v4",
+        "/projects/{project_path}/repository/tags",
         "token",
     ),
     "gitlab-freedesktop": PlatformConfig(
         "gitlab-freedesktop",
-        "https://gitlab.freedesktop.org/api/v4/projects/{project_path}/repository/tags",
+        "https://gitlab.freedesktop.org/api/v4",
+        "/projects/{project_path}/repository/tags",
         "token",
     ),
 }
 
 
-def fetch_tags(
-    platform: str, owner: str, repo: str, token: str | None, latest: bool
-) -> FetchResult:
+class FetchOptions(NamedTuple):
+    """Paging, retry and cache settings of a TagFetcher."""
+
+    api_url: str | None = None
+    per_page: int = 100
+    retries: int = 3
+    max_wait: int = 60
+    cache_dir: str | None = None
+
+
+class HTTPStatusError(Exception):
+    """Raised when the API answers with an unsuccessful status."""
+
+
+class RateLimitedError(Exception):
+    """Raised when the API keeps throttling after all retries."""
+
+
+def http_get(
+    url: str, headers: dict[str, str], timeout: int = 30
+) -> tuple[int, Message, bytes]:
     """
-    Fetch tags from a given platform's API.
+    Send a GET request with the standard library.
+
+    Returns the status code, headers and body; unsuccessful statuses are
+    returned instead of raised so rate limit headers can be inspected.
+    """
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        with e:
+            return e.code, e.headers, e.read()
 
-    Args:
-        platform (str): The platform name (e.g., 'github', 'gitlab').
-        owner (str): The owner or group of the repository.
-        repo (str): The repository name.
-        token (str): Authentication token (if required).
-        latest (bool): Whether to return only the most recent tag.
 
-    Returns:
-        list or dict: List of tags, a single tag if latest=True, or an error dictionary.
+def next_page_url(url: str, headers: Any) -> str | None:
     """
-    config = PLATFORMS.get(platform)
+    Return the URL of the next page from the `Link` or GitLab `X-Next-Page` headers.
+    """
+    link = headers.get("Link") or ""
+    match = LINK_NEXT.search(link)
+    if match:
+        return match.group(1)
+    next_page = headers.get("X-Next-Page")
+    if next_page:
+        parts = urllib.parse.urlsplit(url)
+        query = dict(urllib.parse.parse_qsl(parts.query))
+        query["page"] = str(next_page)
+        return urllib.parse.urlunsplit(
+            parts._replace(query=urllib.parse.urlencode(query))
+        )
+    return None
 
-    if not config:
-        return APIError(error=f"Unsupported platform: {platform}")
 
-    url = config.get_url(owner, repo)
-    headers = config.get_headers(token)
+def retry_delay(status: int, headers: Any, attempt: int) -> float | None:
+    """
+    Return how long to wait before retrying a response, or None if it is final.
 
-    try:
-        response = requests.get(url, headers=headers, timeout=30)
-        if response.status_code == 200:
-            data = response.json()
-            tags = [tag["name"] for tag in data]
-            if latest:
-                return tags[0] if latest and tags else tags
-            return tags
+    429 and rate limited 403 answers honour `Retry-After` or the rate limit
+    reset time; server errors back off exponentially.
+    """
+    remaining = headers.get("X-RateLimit-Remaining") or headers.get(
+        "RateLimit-Remaining"
+    )
+    if status == 429 or (status == 403 and remaining == "0"):
+        retry_after = headers.get("Retry-After")
+        if retry_after is not None:
+            return max(0.0, float(retry_after))
+        reset = headers.get("X-RateLimit-Reset") or headers.get("RateLimit-Reset")
+        if reset is not None:
+            return max(0.0, float(reset) - time.time())
+        return float(1 << attempt)
+    if status >= 500:
+        return min(0.5 * (1 << attempt), 8.0)
+    return None
+
+
+class TagFetcher:
+    """Fetch every page of a repository's tags with retries and ETag caching."""
+
+    def __init__(self, options: FetchOptions | None = None):
+        self.options = options or FetchOptions()
+        self.requests = 0
+
+    def _cache_path(self, url: str) -> str | None:
+        if not self.options.cache_dir:
+            return None
+        digest = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(self.options.cache_dir, f"{digest}.json")
+
+    def _load_cache(self, path: str | None) -> dict[str, Any] | None:
+        if not path:
+            return None
+        try:
+            with open(path) as f:
+                cached: dict[str, Any] = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cached
+
+    def _save_cache(self, path: str | None, entry: dict[str, Any]) -> None:
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+    def get_page(self, url: str, headers: dict[str, str]) -> tuple[Any, str | None]:
+        """
+        Return the JSON body of a page and the URL of the next page.
+
+        Raises:
+            RateLimitedError: If the API keeps throttling after all retries.
+            HTTPStatusError: For any other unsuccessful answer.
+        """
+        cache_path = self._cache_path(url)
+        cached = self._load_cache(cache_path)
+        request_headers = dict(headers)
+        if cached and cached.get("etag"):
+            request_headers["If-None-Match"] = cached["etag"]
+
+        attempts = max(1, self.options.retries)
+        for attempt in range(attempts):
+            self.requests += 1
+            status, response_headers, body = http_get(url, request_headers)
+            if status == 304 and cached:
+                return cached["data"], cached.get("next")
+            if status == 200:
+                data = json.loads(body)
+                next_url = next_page_url(url, response_headers)
+                etag = response_headers.get("ETag")
+                if etag:
+                    self._save_cache(
+                        cache_path, {"etag": etag, "data": data, "next": next_url}
+                    )
+                return data, next_url
+
+            delay = retry_delay(status, response_headers, attempt)
+            if delay is None:
+                break
+            if delay > self.options.max_wait:
+                raise RateLimitedError(
+                    f"Rate limited for {delay:.0f}s, longer than max_wait"
+                )
+            if attempt + 1 < attempts:
+                time.sleep(delay)
         else:
-            return APIError(error=f"API Request failed ({response.status_code})")
-    except Exception as e:
-        return APIError(error=f"Failed to fetch tags: {e!s}")
+            raise RateLimitedError(
+                f"API Request failed ({status}) after {attempts} attempts"
+            )
+        raise HTTPStatusError(f"API Request failed ({status})")
+
+    def fetch(
+        self, platform: str, owner: str, repo: str, token: str | None, latest: bool
+    ) -> FetchResult:
+        """
+        Fetch tags from a given platform's API.
+
+        Args:
+            platform (str): The platform name (e.g., 'github', 'gitlab').
+            owner (str): The owner or group of the repository.
+            repo (str): The repository name.
+            token (str): Authentication token (if required).
+            latest (bool): Whether to return only the most recent tag.
+
+        Returns:
+            list or dict: List of tags, a single tag if latest=True, or an error dictionary.
+        """
+        config = PLATFORMS.get(platform)
+
+        if not config:
+            return APIError(error=f"Unsupported platform: {platform}")
+
+        per_page = 1 if latest else self.options.per_page
+        url: str | None = (
+            config.get_url(owner, repo, self.options.api_url) + f"?per_page={per_page}"
+        )
+        headers = config.get_headers(token)
+        tags: list[str] = []
+
+        try:
+            while url:
+                data, url = self.get_page(url, headers)
+                tags.extend(tag["name"] for tag in data)
+                if latest:
+                    break
+        except HTTPStatusError as e:
+            return APIError(error=str(e))
+        except Exception as e:
+            return APIError(error=f"Failed to fetch tags: {e!s}")
+
+        if latest:
+            return tags[0] if tags else tags
+        return tags
+
+
+def fetch_tags(
+    platform: str, owner: str, repo: str, token: str | None, latest: bool
+) -> FetchResult:
+    """Fetch tags with the default paging and retry settings."""
+    return TagFetcher().fetch(platform, owner, repo, token, latest)
 
 
 def main() -> None:
+    profiler = Profiler()
+
     # Define Ansible module arguments
     module_args = {
         "provider": {
@@ -173,10 +398,17 @@ def main() -> None:
         "repo": {"type": "str", "required": True},
         "token": {"type": "str", "required": False, "no_log": True},
         "latest": {"type": "bool", "required": False, "default": False},
+        "api_url": {"type": "str", "required": False},
+        "per_page": {"type": "int", "default": 100},
+        "retries": {"type": "int", "default": 3},
+        "max_wait": {"type": "int", "default": 60},
+        "cache_dir": {"type": "path", "required": False},
+        **PROFILE_ARGUMENT_SPEC,
     }
 
     # Initialize Ansible module
     module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+    profiler.configure(module.params)
 
     # Extract parameters
     provider = module.params["provider"]
@@ -184,15 +416,27 @@ def main() -> None:
     repo = module.params["repo"]
     token = module.params.get("token")
     latest = module.params["latest"]
+    if module.params["per_page"] < 1:
+        module.fail_json(msg="per_page must be at least 1")
+    fetcher = TagFetcher(
+        FetchOptions(
+            api_url=module.params.get("api_url"),
+            per_page=module.params["per_page"],
+            retries=module.params["retries"],
+            max_wait=module.params["max_wait"],
+            cache_dir=module.params.get("cache_dir"),
+        )
+    )
 
     # Fetch tags
-    result = fetch_tags(provider, owner, repo, token, latest)
+    with profiler.phase("io"):
+        result = fetcher.fetch(provider, owner, repo, token, latest)
 
     # Return results
     if isinstance(result, dict) and "error" in result:
-        module.fail_json(msg=result["error"])
+        module.fail_json(**profiler.report({"msg": result["error"]}))
     else:
-        module.exit_json(changed=False, tags=result)
+        module.exit_json(**profiler.report({"changed": False, "tags": result}))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,533 @@
+#!/usr/bin/python3
+#
+# iso_download.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from urllib.error import HTTPError
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.common.text.formatters import human_to_bytes
+from ansible.module_utils.urls import open_url
+from ansible_collections.jcook3701.utils.plugins.module_utils.artifact_store import (
+    ArtifactStore,
+    file_sha256,
+)
+
+DOCUMENTATION = r"""
+---
+module: iso_download
+short_description: Download large images over parallel HTTP range requests
+description:
+    - This module downloads a file, typically an installer ISO, over several parallel HTTP range requests.
+    - The download is written into a preallocated sparse C(.part) file next to C(dest) and a chunk bitmap is kept in a C(.part.json) state file so an interrupted download resumes where it stopped.
+    - The SHA256 digest is computed while the chunks arrive, so no second full read of the image is needed to verify it.
+    - Servers without range support fall back to a single streamed download.
+    - The verified digest is kept with the size and modification time of C(dest) in a C(.sha256.json) file, so later runs only hash an existing C(dest) again when it changed.
+version_added: "1.0.0"
+author:
+    - Jared Cook
+options:
+    url:
+        description: URL of the file to download.
+        type: str
+        required: true
+    dest:
+        description: Absolute path of the downloaded file.
+        type: path
+        required: true
+    checksum:
+        description: Expected SHA256 digest, optionally prefixed with C(sha256:).
+        type: str
+    checksum_url:
+        description: URL of a C(SHA256SUMS) file. The entry matching the file name of C(url) is used.
+        type: str
+    connections:
+        description: Number of parallel connections.
+        type: int
+        default: 4
+    chunk_size:
+        description: Size in bytes of each range request.
+        type: int
+        default: 8388608
+    timeout:
+        description: Socket timeout in seconds for each request.
+        type: int
+        default: 30
+    retries:
+        description: Attempts per chunk before the download is aborted.
+        type: int
+        default: 3
+    force:
+        description: Download again even if C(dest) exists.
+        type: bool
+        default: false
+    validate_certs:
+        description: Whether to validate TLS certificates.
+        type: bool
+        default: true
+    cache_dir:
+        description:
+            - Root of a local content-addressed artifact store, see M(jcook3701.utils.artifact_cache).
+            - When the expected digest is already stored the image is materialized from the store without any network transfer, and new downloads are added to it.
+        type: path
+    cache_max_size:
+        description: Maximum size of the artifact store, for example C(50G). C(0) disables eviction.
+        type: str
+        default: "0"
+"""
+
+EXAMPLES = r"""
+- name: Download the Debian netinst image
+  jcook3701.utils.iso_download:
+    url: https://cdimage.debian.org/debian-cd/current/amd64/iso-cd/debian-13.1.0-amd64-netinst.iso
+    checksum_url: https://cdimage.debian.org/debian-cd/current/amd64/iso-cd/SHA256SUMS
+    dest: /srv/iso/debian-13.1.0-amd64-netinst.iso
+    connections: 8
+"""
+
+RETURN = r"""
+dest:
+    description: Path of the downloaded file.
+    returned: success
+    type: str
+    sample: "/srv/iso/debian-13.1.0-amd64-netinst.iso"
+sha256:
+    description: SHA256 digest of the file.
+    returned: success
+    type: str
+size:
+    description: Size of the file in bytes.
+    returned: success
+    type: int
+resumed_chunks:
+    description: Number of chunks taken over from an interrupted download.
+    returned: success
+    type: int
+elapsed:
+    description: Download time in seconds.
+    returned: success
+    type: float
+cached:
+    description: Whether the image was taken from the artifact store.
+    returned: success
+    type: bool
+"""
+
+READ_SIZE = 1024 * 1024
+
+
+class DownloadError(Exception):
+    """Raised when the download or its verification fails."""
+
+
+def parse_sha256sums(text: str, filename: str) -> str | None:
+    """
+    Find the digest of `filename` in the contents of a SHA256SUMS file.
+
+    Both the GNU (`<digest>  <name>` / `<digest> *<name>`) and BSD
+    (`SHA256 (<name>) = <digest>`) formats are supported.
+    """
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if line.startswith("SHA256 (") and ") = " in line:
+            name, digest = line[len("SHA256 (") :].rsplit(") = ", 1)
+        else:
+            parts = line.split(None, 1)
+            if len(parts) != 2:
+                continue
+            digest, name = parts
+        if name.lstrip("*").lstrip("./") == filename:
+            return digest.lower()
+    return None
+
+
+def encode_bitmap(done: list[bool]) -> str:
+    """Pack a list of chunk flags into a hex string."""
+    value = bytearray((len(done) + 7) // 8)
+    for index, flag in enumerate(done):
+        if flag:
+            value[index // 8] |= 1 << (index % 8)
+    return value.hex()
+
+
+def decode_bitmap(value: str, count: int) -> list[bool]:
+    """Unpack a hex string produced by encode_bitmap()."""
+    raw = bytes.fromhex(value)
+    return [bool(raw[i // 8] & (1 << (i % 8))) for i in range(count)]
+
+
+class RangeDownloader:
+    """Parallel range downloader with a resumable chunk bitmap and in-order hashing."""
+
+    def __init__(
+        self,
+        url: str,
+        dest: str,
+        connections: int = 4,
+        chunk_size: int = 8 * 1024 * 1024,
+        **request_options: Any,
+    ):
+        self.url = url
+        self.dest = dest
+        self.part = f"{dest}.part"
+        self.state_path = f"{dest}.part.json"
+        self.connections = max(1, connections)
+        self.chunk_size = max(READ_SIZE, chunk_size)
+        self.retries: int = request_options.pop("retries", 3)
+        self.request_options = request_options
+
+        self.size = 0
+        self.validator = ""
+        self.done: list[bool] = []
+        self.resumed_chunks = 0
+        self.digest = hashlib.sha256()
+        self.hashed = 0
+        self.buffers: dict[int, bytes] = {}
+        self.lock = threading.Lock()
+        self.fd = -1
+
+    def _open(self, headers: dict[str, str] | None = None, method: str = "GET") -> Any:
+        return open_url(
+            self.url,
+            headers=headers,
+            method=method,
+            decompress=False,
+            **self.request_options,
+        )
+
+    def probe(self) -> bool:
+        """Read size and validators. Returns whether ranges are supported."""
+        response = self._open(headers={"Range": "bytes=0-0"})
+        with response:
+            status = response.status
+            headers = response.headers
+            if status == 206:
+                content_range = headers.get("Content-Range", "")
+                total = content_range.rsplit("/", 1)[-1]
+                self.size = int(total) if total.isdigit() else 0
+            else:
+                self.size = int(headers.get("Content-Length") or 0)
+            self.validator = headers.get("ETag") or headers.get("Last-Modified") or ""
+        return status == 206 and self.size > 0
+
+    @property
+    def chunk_count(self) -> int:
+        return (self.size + self.chunk_size - 1) // self.chunk_size
+
+    def _chunk_range(self, index: int) -> tuple[int, int]:
+        start = index * self.chunk_size
+        return start, min(self.size, start + self.chunk_size) - 1
+
+    def _load_state(self) -> bool:
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if (
+            state.get("url") != self.url
+            or state.get("size") != self.size
+            or state.get("chunk_size") != self.chunk_size
+            or state.get("validator") != self.validator
+            or not os.path.exists(self.part)
+        ):
+            return False
+        self.done = decode_bitmap(state["done"], self.chunk_count)
+        self.resumed_chunks = sum(self.done)
+        return True
+
+    def _save_state(self) -> None:
+        state = {
+            "url": self.url,
+            "size": self.size,
+            "chunk_size": self.chunk_size,
+            "validator": self.validator,
+            "done": encode_bitmap(self.done),
+        }
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    def _advance_digest(self) -> None:
+        """Feed every contiguous finished chunk to the digest (lock held)."""
+        while self.hashed < len(self.done) and self.done[self.hashed]:
+            data = self.buffers.pop(self.hashed, None)
+            if data is None:
+                start, end = self._chunk_range(self.hashed)
+                data = os.pread(self.fd, end - start + 1, start)
+            self.digest.update(data)
+            self.hashed += 1
+
+    def _fetch_chunk(self, index: int) -> None:
+        start, end = self._chunk_range(index)
+        last_error: Exception | None = None
+        for _ in range(self.retries):
+            try:
+                data = bytearray()
+                with self._open(headers={"Range": f"bytes={start}-{end}"}) as response:
+                    if response.status != 206:
+                        raise DownloadError(f"Range request returned {response.status}")
+                    while block := response.read(READ_SIZE):
+                        os.pwrite(self.fd, block, start + len(data))
+                        data += block
+                if len(data) != end - start + 1:
+                    raise DownloadError(f"Short read for chunk {index}")
+                break
+            except Exception as e:
+                if isinstance(e, HTTPError):
+                    e.close()
+                last_error = e
+        else:
+            raise DownloadError(f"Chunk {index} failed: {last_error!s}")
+
+        with self.lock:
+            self.done[index] = True
+            # Chunks ahead of the digest cursor are kept so they need not be re-read.
+            if index > self.hashed and len(self.buffers) < self.connections * 2:
+                self.buffers[index] = bytes(data)
+            self._advance_digest()
+            self._save_state()
+
+    def _download_ranges(self) -> None:
+        if not self._load_state():
+            self.done = [False] * self.chunk_count
+            self.resumed_chunks = 0
+            with open(self.part, "wb") as f:
+                f.truncate(self.size)  # sparse preallocation
+            self._save_state()
+
+        self.fd = os.open(self.part, os.O_RDWR)
+        try:
+            with self.lock:
+                self._advance_digest()
+            pending = [i for i, flag in enumerate(self.done) if not flag]
+            pool = ThreadPoolExecutor(max_workers=self.connections)
+            try:
+                for future in [pool.submit(self._fetch_chunk, i) for i in pending]:
+                    future.result()
+            finally:
+                pool.shutdown(wait=True, cancel_futures=True)
+            os.fsync(self.fd)
+        finally:
+            os.close(self.fd)
+            self.fd = -1
+
+    def _download_stream(self) -> None:
+        self.resumed_chunks = 0
+        self.size = 0
+        with self._open() as response, open(self.part, "wb") as f:
+            while block := response.read(READ_SIZE):
+                f.write(block)
+                self.digest.update(block)
+                self.size += len(block)
+
+    def download(self, expected: str | None = None) -> str:
+        """Download to dest and return the SHA256 digest."""
+        if self.probe():
+            self._download_ranges()
+        else:
+            self._download_stream()
+
+        sha256 = self.digest.hexdigest()
+        if expected and sha256 != expected:
+            self.cleanup()
+            raise DownloadError(f"Checksum mismatch: expected {expected}, got {sha256}")
+
+        os.replace(self.part, self.dest)
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        return sha256
+
+    def cleanup(self) -> None:
+        for path in (self.part, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def verified_path(dest: str) -> str:
+    return f"{dest}.sha256.json"
+
+
+def load_verified(dest: str) -> str | None:
+    """Return the recorded digest of dest if the file is unchanged since it was verified."""
+    try:
+        with open(verified_path(dest)) as f:
+            state = json.load(f)
+        st = os.stat(dest)
+    except (OSError, ValueError):
+        return None
+    if (
+        not isinstance(state, dict)
+        or state.get("size") != st.st_size
+        or state.get("mtime_ns") != st.st_mtime_ns
+        or state.get("inode") != st.st_ino
+    ):
+        return None
+    sha256 = state.get("sha256")
+    return sha256 if isinstance(sha256, str) else None
+
+
+def save_verified(dest: str, sha256: str) -> None:
+    """Record the digest of dest with its size and modification time."""
+    st = os.stat(dest)
+    state = {
+        "sha256": sha256,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "inode": st.st_ino,
+    }
+    tmp = f"{verified_path(dest)}.tmp"
+    # The record only saves hashing time, so failing to write it is not an error
+    with contextlib.suppress(OSError):
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, verified_path(dest))
+
+
+def resolve_checksum(module: AnsibleModule) -> str | None:
+    """Return the expected digest from checksum or checksum_url."""
+    checksum = module.params["checksum"]
+    if checksum:
+        return str(checksum).lower().removeprefix("sha256:")
+
+    checksum_url = module.params["checksum_url"]
+    if not checksum_url:
+        return None
+
+    filename = os.path.basename(urllib.parse.urlparse(module.params["url"]).path)
+    with open_url(
+        checksum_url,
+        timeout=module.params["timeout"],
+        validate_certs=module.params["validate_certs"],
+    ) as response:
+        sums = response.read().decode("utf-8", errors="replace")
+    digest = parse_sha256sums(sums, filename)
+    if not digest:
+        raise DownloadError(f"No entry for {filename} in {checksum_url}")
+    return digest
+
+
+def run_module() -> None:
+    module_args = {
+        "url": {"type": "str", "required": True},
+        "dest": {"type": "path", "required": True},
+        "checksum": {"type": "str"},
+        "checksum_url": {"type": "str"},
+        "connections": {"type": "int", "default": 4},
+        "chunk_size": {"type": "int", "default": 8 * 1024 * 1024},
+        "timeout": {"type": "int", "default": 30},
+        "retries": {"type": "int", "default": 3},
+        "force": {"type": "bool", "default": False},
+        "validate_certs": {"type": "bool", "default": True},
+        "cache_dir": {"type": "path"},
+        "cache_max_size": {"type": "str", "default": "0"},
+    }
+
+    result: dict[str, Any] = {
+        "changed": False,
+        "dest": "",
+        "resumed_chunks": 0,
+        "cached": False,
+    }
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        mutually_exclusive=[("checksum", "checksum_url")],
+        supports_check_mode=True,
+    )
+
+    dest: str = module.params["dest"]
+    result["dest"] = dest
+
+    try:
+        expected = resolve_checksum(module)
+
+        if os.path.exists(dest) and not module.params["force"]:
+            sha256 = None
+            if expected:
+                sha256 = load_verified(dest)
+                if sha256 != expected:
+                    sha256 = file_sha256(dest)
+                    if sha256 == expected and not module.check_mode:
+                        save_verified(dest, sha256)
+            if not expected or sha256 == expected:
+                result.update(sha256=sha256, size=os.path.getsize(dest))
+                module.exit_json(**result)
+
+        store = None
+        if module.params["cache_dir"]:
+            store = ArtifactStore(
+                module.params["cache_dir"],
+                human_to_bytes(module.params["cache_max_size"]),
+            )
+
+        result["changed"] = True
+        if module.check_mode:
+            module.exit_json(**result)
+
+        if store and expected and store.has(expected):
+            store.materialize(expected, dest)
+            save_verified(dest, expected)
+            result.update(sha256=expected, size=os.path.getsize(dest), cached=True)
+            module.exit_json(**result)
+
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        downloader = RangeDownloader(
+            module.params["url"],
+            dest,
+            connections=module.params["connections"],
+            chunk_size=module.params["chunk_size"],
+            retries=module.params["retries"],
+            timeout=module.params["timeout"],
+            validate_certs=module.params["validate_certs"],
+        )
+        start = time.monotonic()
+        result["sha256"] = downloader.download(expected)
+        save_verified(dest, result["sha256"])
+        result["elapsed"] = round(time.monotonic() - start, 3)
+        result["size"] = downloader.size
+        result["resumed_chunks"] = downloader.resumed_chunks
+        if store:
+            store.add(dest, result["sha256"])
+            store.evict(keep=result["sha256"])
+        module.exit_json(**result)
+
+    except Exception as e:
+        module.fail_json(
+            msg=f"Failed to download {module.params['url']}: {e!s}", **result
+        )
+
+
+def main() -> None:
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/python3
+#
+# package_delta.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from typing import Any, TypedDict
+
+from ansible.module_utils.basic import AnsibleModule
+
+DOCUMENTATION = r"""
+---
+module: package_delta
+short_description: Report installed package changes since the last run
+description:
+    - This module keeps a local snapshot of the installed package inventory and returns only the packages added, removed or changed since the previous snapshot.
+    - The package database is only read again when the dpkg C(status) file or the rpmdb has been modified since the snapshot was taken.
+    - Use C(query) to look up a few packages or C(full) to return the whole inventory in the same format as M(ansible.builtin.package_facts).
+version_added: "1.0.0"
+author:
+    - Jared Cook
+options:
+    manager:
+        description: Package manager whose database is read.
+        type: str
+        default: auto
+        choices: ["auto", "dpkg", "rpm"]
+    snapshot_dir:
+        description: Directory holding the package snapshots.
+        type: path
+        default: /var/cache/jcook3701.utils/package_delta
+    query:
+        description: Package names whose installed versions are returned in C(packages).
+        type: list
+        elements: str
+        default: []
+    full:
+        description: Return the whole inventory in C(packages) and C(ansible_facts.packages).
+        type: bool
+        default: false
+"""
+
+EXAMPLES = r"""
+- name: Report package changes since the last audit
+  jcook3701.utils.package_delta:
+  register: package_delta
+
+- name: Check whether ansible is installed
+  jcook3701.utils.package_delta:
+    query:
+      - ansible
+  register: package_delta
+
+- name: Populate ansible_facts.packages like package_facts
+  jcook3701.utils.package_delta:
+    full: true
+"""
+
+RETURN = r"""
+manager:
+    description: Package manager that was read.
+    returned: always
+    type: str
+refreshed:
+    description: Whether the package database was read because it changed since the snapshot.
+    returned: always
+    type: bool
+initialized:
+    description: Whether this run created the first snapshot, in which case no delta is reported.
+    returned: always
+    type: bool
+added:
+    description: Packages installed since the last snapshot, mapped to their installed versions.
+    returned: always
+    type: dict
+removed:
+    description: Packages removed since the last snapshot, mapped to their previous versions.
+    returned: always
+    type: dict
+changed_packages:
+    description: Packages whose versions changed, mapped to C(before) and C(after) version lists.
+    returned: always
+    type: dict
+packages:
+    description: Installed versions of the queried packages, or of every package when C(full) is true.
+    returned: when query is set or full is true
+    type: dict
+ansible_facts:
+    description: The full inventory as C(packages), matching M(ansible.builtin.package_facts).
+    returned: when full is true
+    type: dict
+"""
+
+DPKG_STATUS = "/var/lib/dpkg/status"
+RPMDB_DIR = "/var/lib/rpm"
+RPM_QUERY_FORMAT = "%{NAME}\t%{EPOCHNUM}\t%{VERSION}\t%{RELEASE}\t%{ARCH}\n"
+
+
+class PackageVersion(TypedDict, total=False):
+    name: str
+    version: str
+    release: str
+    epoch: int
+    arch: str
+    source: str
+
+
+Inventory = dict[str, list[PackageVersion]]
+
+
+def parse_dpkg_status(text: str) -> Inventory:
+    """
+    Parse a dpkg status file into an inventory of installed packages.
+
+    Only stanzas whose status is `install ok installed` are reported.
+    """
+    packages: Inventory = {}
+    for stanza in text.split("\n\n"):
+        fields: dict[str, str] = {}
+        for line in stanza.splitlines():
+            if not line or line[0] in " \t":
+                continue
+            key, _, value = line.partition(":")
+            if key in ("Package", "Status", "Version", "Architecture"):
+                fields[key] = value.strip()
+        if not fields.get("Status", "").endswith(" installed"):
+            continue
+        name = fields.get("Package")
+        if not name:
+            continue
+        packages.setdefault(name, []).append(
+            {
+                "name": name,
+                "version": fields.get("Version", ""),
+                "arch": fields.get("Architecture", ""),
+                "source": "apt",
+            }
+        )
+    return packages
+
+
+def parse_rpm_query(text: str) -> Inventory:
+    """Parse the output of `rpm -qa` run with RPM_QUERY_FORMAT."""
+    packages: Inventory = {}
+    for line in text.splitlines():
+        parts = line.split("\t")
+        if len(parts) != 5:
+            continue
+        name, epoch, version, release, arch = parts
+        packages.setdefault(name, []).append(
+            {
+                "name": name,
+                "epoch": int(epoch) if epoch.isdigit() else 0,
+                "version": version,
+                "release": release,
+                "arch": arch,
+                "source": "rpm",
+            }
+        )
+    return packages
+
+
+def database_stamp(manager: str) -> list[float]:
+    """
+    Return a cheap fingerprint of the package database.
+
+    dpkg rewrites its status file on every transaction; the rpmdb is a
+    directory of files, so the newest mtime and total size are used.
+    """
+    if manager == "dpkg":
+        st = os.stat(DPKG_STATUS)
+        return [st.st_mtime, st.st_size]
+    mtime = 0.0
+    size = 0
+    for entry in os.scandir(RPMDB_DIR):
+        if entry.is_file():
+            st = entry.stat()
+            mtime = max(mtime, st.st_mtime)
+            size += st.st_size
+    return [mtime, size]
+
+
+def package_delta(
+    before: Inventory, after: Inventory
+) -> tuple[Inventory, Inventory, dict[str, dict[str, list[PackageVersion]]]]:
+    """Return the added, removed and changed packages between two inventories."""
+    added = {name: after[name] for name in sorted(after.keys() - before.keys())}
+    removed = {name: before[name] for name in sorted(before.keys() - after.keys())}
+    changed = {
+        name: {"before": before[name], "after": after[name]}
+        for name in sorted(before.keys() & after.keys())
+        if before[name] != after[name]
+    }
+    return added, removed, changed
+
+
+def load_snapshot(path: str) -> dict[str, Any] | None:
+    try:
+        with open(path) as f:
+            snapshot: dict[str, Any] = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return snapshot
+
+
+def save_snapshot(path: str, snapshot: dict[str, Any]) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, "w") as f:
+        json.dump(snapshot, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def detect_manager() -> str | None:
+    if os.path.isfile(DPKG_STATUS):
+        return "dpkg"
+    if os.path.isdir(RPMDB_DIR):
+        return "rpm"
+    return None
+
+
+def read_inventory(module: AnsibleModule, manager: str) -> Inventory:
+    """Read the installed packages from the dpkg status file or rpmdb."""
+    if manager == "dpkg":
+        with open(DPKG_STATUS, encoding="utf-8", errors="replace") as f:
+            return parse_dpkg_status(f.read())
+    rpm = module.get_bin_path("rpm", required=True)
+    rc, out, err = module.run_command([rpm, "-qa", "--qf", RPM_QUERY_FORMAT])
+    if rc != 0:
+        raise OSError(f"rpm query failed: {err}")
+    return parse_rpm_query(out)
+
+
+def run_module() -> None:
+    module_args = {
+        "manager": {
+            "type": "str",
+            "default": "auto",
+            "choices": ["auto", "dpkg", "rpm"],
+        },
+        "snapshot_dir": {
+            "type": "path",
+            "default": "/var/cache/jcook3701.utils/package_delta",
+        },
+        "query": {"type": "list", "elements": "str", "default": []},
+        "full": {"type": "bool", "default": False},
+    }
+
+    result: dict[str, Any] = {
+        "changed": False,
+        "refreshed": False,
+        "initialized": False,
+        "added": {},
+        "removed": {},
+        "changed_packages": {},
+    }
+
+    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+
+    manager = module.params["manager"]
+    if manager == "auto":
+        manager = detect_manager()
+        if manager is None:
+            module.fail_json(msg="No dpkg or rpm database found", **result)
+    result["manager"] = manager
+
+    path = os.path.join(module.params["snapshot_dir"], f"{manager}.json")
+
+    try:
+        stamp = database_stamp(manager)
+        snapshot = load_snapshot(path)
+
+        if snapshot is not None and snapshot.get("stamp") == stamp:
+            packages: Inventory = snapshot["packages"]
+        else:
+            packages = read_inventory(module, manager)
+
+            result["refreshed"] = True
+            if snapshot is None:
+                result["initialized"] = True
+            else:
+                added, removed, changed = package_delta(snapshot["packages"], packages)
+                result.update(added=added, removed=removed, changed_packages=changed)
+            if not module.check_mode:
+                save_snapshot(path, {"stamp": stamp, "packages": packages})
+
+    except OSError as e:
+        module.fail_json(msg=f"Error reading the package database: {e!s}", **result)
+
+    if module.params["full"]:
+        result["packages"] = packages
+        result["ansible_facts"] = {"packages": packages}
+    elif module.params["query"]:
+        result["packages"] = {
+            name: packages[name] for name in module.params["query"] if name in packages
+        }
+
+    module.exit_json(**result)
+
+
+def main() -> None:
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+#
+# package_requirements.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+# Documentation only; the work is done by the package_requirements action plugin.
+
+DOCUMENTATION = r"""
+---
+module: package_requirements
+short_description: Install package requirements of several packages in one transaction
+description:
+    - This action merges the C(apt), C(dnf) and C(pacman) package lists of several C(pkgs) dictionaries and installs them with a single call of the package module matching C(ansible_facts.os_family).
+    - The package cache is only refreshed when it is older than C(cache_valid_time).
+    - The full merged list is always passed to the package module, which leaves packages that are already installed alone.
+    - Requires gathered facts for C(os_family).
+version_added: "1.0.0"
+author:
+    - Jared Cook
+options:
+    requirements:
+        description: List of C(pkgs) dictionaries with optional C(apt), C(dnf) and C(pacman) package lists.
+        type: list
+        elements: dict
+        required: true
+    cache_valid_time:
+        description: Seconds after which the package cache is refreshed before installing. Not used by dnf, which follows its own metadata expiry.
+        type: int
+        default: 3600
+"""
+
+EXAMPLES = r"""
+- name: Install the requirements of every package in the batch
+  jcook3701.utils.package_requirements:
+    requirements: "{{ packages | selectattr('pkgs', 'defined') | map(attribute='pkgs') | list }}"
+    cache_valid_time: 86400
+  become: true
+
+- name: Install the requirements of a single package
+  jcook3701.utils.package_requirements:
+    requirements:
+      - apt: [build-essential, libgtk-3-dev]
+        dnf: [gcc, gtk3-devel]
+  become: true
+"""
+
+RETURN = r"""
+manager:
+    description: Requirements key used for the host, one of C(apt), C(dnf) or C(pacman).
+    returned: unless skipped
+    type: str
+packages:
+    description: Packages passed to the package module.
+    returned: unless skipped
+    type: list
+    elements: str
+"""
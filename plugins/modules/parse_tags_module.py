@@ -22,6 +22,10 @@ import re
 from typing import TypedDict
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.jcook3701.utils.plugins.module_utils.profiling import (
+    PROFILE_ARGUMENT_SPEC,
+    Profiler,
+)
 
 DOCUMENTATION = r"""
 ---
@@ -33,6 +37,8 @@ description:
 version_added: "1.0.0"
 author:
     - Jared Cook
+extends_documentation_fragment:
+    - jcook3701.utils.profile
 options:
     tags:
         description: A list of tag strings to be parsed.
@@ -75,6 +81,10 @@ parsed_tags:
         error:
             description: Error message if the format was unrecognized.
             type: str
+metrics:
+    description: Phase timings, peak RSS and optional cProfile summary of the module run.
+    returned: when _profile or _profile_top is set
+    type: dict
 """
 
 
@@ -125,24 +135,30 @@ def parse_tags(tags: str) -> list[ParsedTag]:
 
 
 def main() -> None:
+    profiler = Profiler()
     module_args = {
         "tags": {
             "type": "list",
             "required": True,
             "elements": "str",
         },  # Accepts a list of tag strings
+        **PROFILE_ARGUMENT_SPEC,
     }
 
     module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+    profiler.configure(module.params)
 
     # Get the input list of tags
     tags = module.params["tags"]
 
     try:
-        parsed_tags = parse_tags(tags)
-        module.exit_json(changed=False, parsed_tags=parsed_tags)
+        with profiler.phase("parse"):
+            parsed_tags = parse_tags(tags)
+        module.exit_json(
+            **profiler.report({"changed": False, "parsed_tags": parsed_tags})
+        )
     except Exception as e:
-        module.fail_json(msg=f"Error parsing tags: {e!s}")
+        module.fail_json(**profiler.report({"msg": f"Error parsing tags: {e!s}"}))
 
 
 if __name__ == "__main__":
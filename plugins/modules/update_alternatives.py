@@ -0,0 +1,154 @@
+#!/usr/bin/python3
+#
+# update_alternatives.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+from typing import Any
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.jcook3701.utils.plugins.module_utils.alternatives import (
+    ADMIN_DIR,
+    ALTERNATIVE_OPTIONS,
+    ALTERNATIVES_DIR,
+    apply_alternatives,
+)
+
+DOCUMENTATION = r"""
+---
+module: update_alternatives
+short_description: Register many alternatives in one idempotent task
+description:
+    - This module reads the current state of every affected alternative once from the dpkg administrative directory.
+    - Only alternatives that are not registered, or whose link or priority differ, are installed with C(update-alternatives --install).
+    - Manual selections are applied together with a single C(update-alternatives --set-selections) call.
+    - Reports C(changed) only when something was installed or selected.
+version_added: "1.0.0"
+author:
+    - Jared Cook
+requirements:
+    - C(update-alternatives) from dpkg.
+options:
+    alternatives:
+        description: The alternatives to register.
+        type: list
+        elements: dict
+        required: true
+        suboptions:
+            name:
+                description: Name of the alternative group, for example C(gcc).
+                type: str
+                required: true
+            link:
+                description: Generic name of the master link, for example C(/usr/bin/gcc).
+                type: path
+                required: true
+            path:
+                description: Alternative for the master link.
+                type: path
+                required: true
+            priority:
+                description: Priority of the alternative; the highest priority is used in automatic mode.
+                type: int
+                default: 50
+            manual:
+                description: Select this alternative manually instead of leaving the group in automatic mode.
+                type: bool
+                default: false
+    admin_dir:
+        description: The dpkg alternatives administrative directory, passed to C(update-alternatives --admindir).
+        type: path
+        default: /var/lib/dpkg/alternatives
+    altdir:
+        description: The directory of the alternative symlinks, passed to C(update-alternatives --altdir).
+        type: path
+        default: /etc/alternatives
+"""
+
+EXAMPLES = r"""
+- name: Register the GCC toolchains
+  jcook3701.utils.update_alternatives:
+    alternatives:
+      - name: gcc
+        link: /usr/bin/gcc
+        path: /usr/bin/gcc-13
+        priority: 130
+      - name: gcc
+        link: /usr/bin/gcc
+        path: /usr/bin/gcc-14
+        priority: 140
+      - name: g++
+        link: /usr/bin/g++
+        path: /usr/bin/g++-13
+        manual: true
+  become: true
+"""
+
+RETURN = r"""
+installed:
+    description: Alternatives that were installed or whose link or priority were updated.
+    returned: always
+    type: list
+    elements: dict
+selections:
+    description: Manual selections passed to C(update-alternatives --set-selections).
+    returned: always
+    type: list
+    elements: str
+    sample: ["g++ manual /usr/bin/g++-13"]
+"""
+
+
+def run_module() -> None:
+    module_args = {
+        "alternatives": {
+            "type": "list",
+            "elements": "dict",
+            "required": True,
+            "options": ALTERNATIVE_OPTIONS,
+        },
+        "admin_dir": {"type": "path", "default": ADMIN_DIR},
+        "altdir": {"type": "path", "default": ALTERNATIVES_DIR},
+    }
+
+    result: dict[str, Any] = {"changed": False, "installed": [], "selections": []}
+
+    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+
+    try:
+        result.update(
+            apply_alternatives(
+                module,
+                module.params["alternatives"],
+                module.params["admin_dir"],
+                module.params["altdir"],
+            )
+        )
+    except OSError as e:
+        module.fail_json(msg=f"Error updating alternatives: {e!s}", **result)
+
+    module.exit_json(**result)
+
+
+def main() -> None:
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
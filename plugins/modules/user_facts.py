@@ -0,0 +1,268 @@
+#!/usr/bin/python3
+#
+# user_facts.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import grp
+import os
+import pwd
+from typing import Any, TypedDict
+
+from ansible.module_utils.basic import AnsibleModule
+
+DOCUMENTATION = r"""
+---
+module: user_facts
+short_description: Collect the sudo user and interactive users from the account database
+description:
+    - This module reads the account database with the Python C(pwd) and C(grp) modules instead of running C(getent) or C(id).
+    - Returns the uid, gid, home directory and group memberships of the sudo user.
+    - Optionally returns every interactive user with a home directory and a login shell.
+    - The sudo user details are also returned as host facts, so they are computed once per host and kept in the fact cache when one is configured.
+version_added: "1.0.0"
+author:
+    - Jared Cook
+options:
+    user:
+        description:
+            - Name of the user to describe.
+            - Defaults to C(SUDO_USER) of the module process, falling back to the user running the module.
+        type: str
+    interactive:
+        description: Whether to enumerate interactive users. Disable on hosts with very large directories when only the sudo user is needed.
+        type: bool
+        default: true
+    home_prefix:
+        description: Home directory prefix an interactive user must have.
+        type: str
+        default: /home/
+    shells:
+        description: Login shells that make a user interactive.
+        type: list
+        elements: str
+        default: ["/bin/bash", "/bin/zsh", "/bin/sh"]
+    include_root:
+        description: Whether to always include C(root) in the interactive users.
+        type: bool
+        default: true
+"""
+
+EXAMPLES = r"""
+- name: Collect the sudo user
+  jcook3701.utils.user_facts:
+    user: "{{ ansible_env.SUDO_USER or ansible_user_id }}"
+    interactive: false
+  register: user_facts
+
+- name: Collect the sudo user facts once per host
+  jcook3701.utils.user_facts:
+    interactive: false
+  when: sudo_user_home is not defined
+
+- name: Collect interactive users with a zsh login shell
+  jcook3701.utils.user_facts:
+    shells:
+      - /bin/zsh
+      - /usr/bin/zsh
+  register: user_facts
+"""
+
+RETURN = r"""
+ansible_facts:
+    description: Facts describing the sudo user.
+    returned: always
+    type: dict
+    contains:
+        sudo_user:
+            description: Name of the sudo user.
+            type: str
+        sudo_user_uid:
+            description: User id of the sudo user.
+            type: int
+        sudo_user_gid:
+            description: Primary group id of the sudo user.
+            type: int
+        sudo_user_home:
+            description: Home directory of the sudo user.
+            type: str
+        sudo_user_groups:
+            description: Names of every group the sudo user belongs to.
+            type: list
+            elements: str
+sudo_user:
+    description: Account details of the sudo user.
+    returned: always
+    type: dict
+    contains:
+        name:
+            description: User name.
+            type: str
+        uid:
+            description: User id.
+            type: int
+        gid:
+            description: Primary group id.
+            type: int
+        home:
+            description: Home directory.
+            type: str
+        shell:
+            description: Login shell.
+            type: str
+        groups:
+            description: Names of every group the user belongs to, primary group first.
+            type: list
+            elements: str
+interactive_users:
+    description: Users with a home directory below C(home_prefix) and a login shell in C(shells).
+    returned: when interactive is true
+    type: list
+    elements: dict
+    contains:
+        name:
+            description: User name.
+            type: str
+        uid:
+            description: User id.
+            type: int
+        gid:
+            description: Primary group id.
+            type: int
+        home:
+            description: Home directory.
+            type: str
+        shell:
+            description: Login shell.
+            type: str
+"""
+
+
+class UserEntry(TypedDict):
+    name: str
+    uid: int
+    gid: int
+    home: str
+    shell: str
+
+
+def user_entry(entry: pwd.struct_passwd) -> UserEntry:
+    """Convert a passwd entry into a structured dictionary."""
+    return {
+        "name": entry.pw_name,
+        "uid": entry.pw_uid,
+        "gid": entry.pw_gid,
+        "home": entry.pw_dir,
+        "shell": entry.pw_shell,
+    }
+
+
+def group_names(name: str, gid: int) -> list[str]:
+    """
+    Return the names of every group a user belongs to.
+
+    Group ids without a group entry are returned as numbers, like `id -Gn`.
+    """
+    names = []
+    for group_id in os.getgrouplist(name, gid):
+        try:
+            names.append(grp.getgrgid(group_id).gr_name)
+        except KeyError:
+            names.append(str(group_id))
+    return names
+
+
+def interactive_users(
+    home_prefix: str, shells: list[str], include_root: bool = True
+) -> list[UserEntry]:
+    """
+    Return users with a home directory below `home_prefix` and a login shell.
+
+    The account database is read once; duplicate names returned by multiple
+    NSS sources are reported once.
+    """
+    allowed = set(shells)
+    users: list[UserEntry] = []
+    seen: set[str] = set()
+    for entry in pwd.getpwall():
+        if entry.pw_name in seen:
+            continue
+        if (entry.pw_uid == 0 and include_root) or (
+            entry.pw_shell in allowed
+            and entry.pw_dir.startswith(home_prefix)
+            and len(entry.pw_dir) > len(home_prefix)
+        ):
+            seen.add(entry.pw_name)
+            users.append(user_entry(entry))
+    return users
+
+
+def run_module() -> None:
+    module_args = {
+        "user": {"type": "str"},
+        "interactive": {"type": "bool", "default": True},
+        "home_prefix": {"type": "str", "default": "/home/"},
+        "shells": {
+            "type": "list",
+            "elements": "str",
+            "default": ["/bin/bash", "/bin/zsh", "/bin/sh"],
+        },
+        "include_root": {"type": "bool", "default": True},
+    }
+
+    result: dict[str, Any] = {"changed": False}
+
+    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+
+    name: str | None = module.params["user"] or os.environ.get("SUDO_USER")
+
+    try:
+        entry = pwd.getpwnam(name) if name else pwd.getpwuid(os.getuid())
+        sudo_user: dict[str, Any] = dict(user_entry(entry))
+        sudo_user["groups"] = group_names(entry.pw_name, entry.pw_gid)
+        result["sudo_user"] = sudo_user
+        result["ansible_facts"] = {
+            "sudo_user": sudo_user["name"],
+            "sudo_user_uid": sudo_user["uid"],
+            "sudo_user_gid": sudo_user["gid"],
+            "sudo_user_home": sudo_user["home"],
+            "sudo_user_groups": sudo_user["groups"],
+        }
+
+        if module.params["interactive"]:
+            result["interactive_users"] = interactive_users(
+                module.params["home_prefix"],
+                module.params["shells"],
+                module.params["include_root"],
+            )
+
+    except KeyError:
+        module.fail_json(msg=f"User {name} does not exist", **result)
+    except OSError as e:
+        module.fail_json(msg=f"Error reading the account database: {e!s}", **result)
+
+    module.exit_json(**result)
+
+
+def main() -> None:
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+#!/usr/bin/python3
+#
+# api_emulator.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Local emulator of the GitHub and GitLab tag APIs.
+
+Serves paginated tags with the headers of the real services so the paging,
+ETag and rate limit handling of fetch_tags_module can be tested offline:
+
+    $ python tests/benchmarks/api_emulator.py --tags 5000 --rate-limit 60
+    $ ansible localhost -m jcook3701.utils.fetch_tags_module \\
+        -a "provider=github owner=o repo=r api_url=http://127.0.0.1:8080"
+
+GitHub routes answer `/repos/{owner}/{repo}/tags` with `Link`, `ETag` and
+`X-RateLimit-*` headers and a 403 once the limit is used up; GitLab routes
+answer `/projects/{id}/repository/tags` with `X-Page`, `X-Next-Page`,
+`X-Total` and `RateLimit-*` headers and a 429 with `Retry-After`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import TracebackType
+from typing import Any
+
+GITHUB_PREFIX = "/repos/"
+GITLAB_PREFIX = "/projects/"
+DEFAULT_PER_PAGE = {"github": 30, "gitlab": 20}
+MAX_PER_PAGE = 100
+
+
+class ApiEmulator:
+    """
+    Serve a fixed list of tags on a local port.
+
+    Args:
+        tags: Tag names, newest first, served by every repository.
+        latency: Seconds slept before answering each request.
+        rate_limit: Requests allowed per `rate_window`; None disables limiting.
+        rate_window: Length of a rate limit window in seconds.
+        throttle_every: Answer every Nth request with a 429 and `Retry-After: 0`,
+            like a secondary rate limit; 0 disables it.
+    """
+
+    def __init__(
+        self,
+        tags: list[str],
+        latency: float = 0.0,
+        rate_limit: int | None = None,
+        rate_window: float = 60.0,
+        throttle_every: int = 0,
+    ):
+        self.tags = tags
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.throttle_every = throttle_every
+        self.stats = {"requests": 0, "ok": 0, "not_modified": 0, "throttled": 0}
+        self._lock = threading.Lock()
+        self._used = 0
+        self._reset = time.time() + rate_window
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        """Base URL to pass as `api_url`."""
+        if self._server is None:
+            raise RuntimeError("The emulator is not running")
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self, port: int = 0) -> ApiEmulator:
+        """Listen on `port`, or a free port when 0, in a background thread."""
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+        self._server = self._thread = None
+
+    def __enter__(self) -> ApiEmulator:
+        return self if self._server else self.start()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.stop()
+
+    def _take_request(self, free: bool) -> tuple[bool, bool, int]:
+        """
+        Count a request against the limits.
+
+        Returns whether it is throttled by the secondary limit, whether the
+        primary limit is exhausted and the requests remaining in the window.
+        `free` requests are not counted against the primary limit.
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+            if (
+                self.throttle_every
+                and self.stats["requests"] % self.throttle_every == 0
+            ):
+                self.stats["throttled"] += 1
+                return True, False, self._remaining()
+            now = time.time()
+            if now >= self._reset:
+                self._used = 0
+                self._reset = now + self.rate_window
+            if free:
+                return False, False, self._remaining()
+            if self.rate_limit is not None and self._used >= self.rate_limit:
+                self.stats["throttled"] += 1
+                return False, True, 0
+            self._used += 1
+            return False, False, self._remaining()
+
+    def _remaining(self) -> int:
+        if self.rate_limit is None:
+            return 5000
+        return max(0, self.rate_limit - self._used)
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        emulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                emulator._handle(self)
+
+            def log_message(self, fmt: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def _handle(self, request: BaseHTTPRequestHandler) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+        parts = urllib.parse.urlsplit(request.path)
+        if parts.path.startswith(GITHUB_PREFIX) and parts.path.endswith("/tags"):
+            flavour = "github"
+        elif parts.path.startswith(GITLAB_PREFIX) and parts.path.endswith(
+            "/repository/tags"
+        ):
+            flavour = "gitlab"
+        else:
+            self._send(request, 404, {}, {"message": "Not Found"})
+            return
+
+        payload, headers = self._page(flavour, parts)
+        not_modified = request.headers.get("If-None-Match") == headers["ETag"]
+        # GitHub does not count conditional requests answered with 304
+        secondary, exhausted, remaining = self._take_request(
+            free=not_modified and flavour == "github"
+        )
+        headers.update(self._rate_headers(flavour, remaining))
+        if secondary:
+            headers["Retry-After"] = "0"
+            self._send(request, 429, headers, {"message": "Too Many Requests"})
+        elif exhausted and flavour == "gitlab":
+            headers["Retry-After"] = str(math.ceil(self._reset - time.time()))
+            self._send(request, 429, headers, {"message": "Retry later"})
+        elif exhausted:
+            self._send(request, 403, headers, {"message": "API rate limit exceeded"})
+        elif not_modified:
+            with self._lock:
+                self.stats["not_modified"] += 1
+            self._send_raw(request, 304, {"ETag": headers["ETag"]}, b"")
+        else:
+            with self._lock:
+                self.stats["ok"] += 1
+            self._send_raw(request, 200, headers, payload)
+
+    def _page(
+        self, flavour: str, parts: urllib.parse.SplitResult
+    ) -> tuple[bytes, dict[str, str]]:
+        """Return the body and pagination headers of the requested page."""
+        query = dict(urllib.parse.parse_qsl(parts.query))
+        per_page = min(
+            int(query.get("per_page", DEFAULT_PER_PAGE[flavour])), MAX_PER_PAGE
+        )
+        page = max(1, int(query.get("page", 1)))
+        pages = max(1, math.ceil(len(self.tags) / per_page))
+        body = [
+            {"name": tag} for tag in self.tags[(page - 1) * per_page : page * per_page]
+        ]
+        payload = json.dumps(body).encode()
+
+        links = []
+        if page < pages:
+            links.append((page + 1, "next"))
+        links.extend([(1, "first"), (pages, "last")])
+        headers = {
+            "ETag": f'"{hashlib.sha1(payload).hexdigest()}"',
+            "Link": ", ".join(
+                f'<{self.url}{parts.path}?per_page={per_page}&page={n}>; rel="{rel}"'
+                for n, rel in links
+            ),
+        }
+        if flavour == "gitlab":
+            headers.update(
+                {
+                    "X-Page": str(page),
+                    "X-Per-Page": str(per_page),
+                    "X-Next-Page": str(page + 1) if page < pages else "",
+                    "X-Total": str(len(self.tags)),
+                    "X-Total-Pages": str(pages),
+                }
+            )
+        return payload, headers
+
+    def _rate_headers(self, flavour: str, remaining: int) -> dict[str, str]:
+        prefix = "X-RateLimit-" if flavour == "github" else "RateLimit-"
+        return {
+            f"{prefix}Limit": str(self.rate_limit or 5000),
+            f"{prefix}Remaining": str(remaining),
+            f"{prefix}Reset": str(math.ceil(self._reset)),
+        }
+
+    def _send(
+        self,
+        request: BaseHTTPRequestHandler,
+        status: int,
+        headers: dict[str, str],
+        body: Any,
+    ) -> None:
+        self._send_raw(request, status, headers, json.dumps(body).encode())
+
+    def _send_raw(
+        self,
+        request: BaseHTTPRequestHandler,
+        status: int,
+        headers: dict[str, str],
+        payload: bytes,
+    ) -> None:
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(payload)))
+        for key, value in headers.items():
+            request.send_header(key, value)
+        request.end_headers()
+        request.wfile.write(payload)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tags", type=int, default=1000, help="Number of tags")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds")
+    parser.add_argument("--rate-limit", type=int, default=None)
+    parser.add_argument("--rate-window", type=float, default=60.0, help="Seconds")
+    parser.add_argument("--throttle-every", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    tags = [f"v{n // 100}.{n // 10 % 10}.{n % 10}" for n in range(args.tags, 0, -1)]
+    emulator = ApiEmulator(
+        tags,
+        latency=args.latency,
+        rate_limit=args.rate_limit,
+        rate_window=args.rate_window,
+        throttle_every=args.throttle_every,
+    )
+    with emulator.start(args.port):
+        print(f"Serving {len(tags)} tags on {emulator.url}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
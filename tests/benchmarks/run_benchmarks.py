@@ -0,0 +1,383 @@
+#!/usr/bin/python3
+#
+# run_benchmarks.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Benchmarks of the module hot paths on synthetic inputs.
+
+Every case runs in a forked child so its peak RSS is measured in isolation.
+Results are written as JSON and can be compared against a stored baseline:
+
+    $ python tests/benchmarks/run_benchmarks.py --scale small -o baseline.json
+    $ python tests/benchmarks/run_benchmarks.py --compare baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from contextlib import ExitStack
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+from ansible_collections.jcook3701.utils.plugins.modules import (
+    ansible_doc_gen,
+    dns_inventory_gen,
+)
+from ansible_collections.jcook3701.utils.plugins.modules.dns_inventory_gen import (
+    parse_dns_zone,
+)
+from ansible_collections.jcook3701.utils.plugins.modules.fetch_tags_module import (
+    FetchOptions,
+    TagFetcher,
+)
+from ansible_collections.jcook3701.utils.plugins.modules.parse_tags_module import (
+    parse_tags,
+)
+from api_emulator import ApiEmulator
+
+# Input sizes per benchmark for each scale
+SCALES: dict[str, dict[str, list[int]]] = {
+    "smoke": {
+        "parse_dns_zone": [1_000],
+        "dns_inventory_update": [1_000],
+        "parse_tags": [100],
+        "fetch_tags": [100],
+        "ansible_doc_gen": [10],
+    },
+    "small": {
+        "parse_dns_zone": [1_000, 10_000, 100_000],
+        "dns_inventory_update": [1_000, 10_000, 100_000],
+        "parse_tags": [100, 1_000, 10_000],
+        "fetch_tags": [100, 1_000, 10_000],
+        "ansible_doc_gen": [10, 100],
+    },
+    "full": {
+        "parse_dns_zone": [1_000, 10_000, 100_000, 1_000_000, 5_000_000],
+        "dns_inventory_update": [1_000, 10_000, 100_000, 1_000_000],
+        "parse_tags": [100, 1_000, 10_000, 100_000],
+        "fetch_tags": [100, 1_000, 10_000, 100_000],
+        "ansible_doc_gen": [10, 100, 500, 2_000],
+    },
+}
+
+# Fixed seed so every run generates identical inputs
+SEED = 3701
+
+
+# --------------------------------------------------
+# Synthetic inputs
+# --------------------------------------------------
+def write_zone_file(path: Path, records: int) -> None:
+    """Write a zone file with an SOA, NS and `records` A/AAAA/CNAME records."""
+    rng = random.Random(SEED)
+    with path.open("w") as f:
+        f.write("$TTL 3600\n")
+        f.write(
+            "@   IN  SOA ns1.example.com. admin.example.com. "
+            "( 2026010101 3600 600 1209600 3600 )\n"
+        )
+        f.write("@   IN  NS  ns1.example.com.\n")
+        for i in range(records):
+            kind = rng.random()
+            if kind < 0.8:
+                f.write(
+                    f"host{i}   IN  A   10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}\n"
+                )
+            elif kind < 0.95:
+                f.write(f"host{i}   IN  AAAA    2001:db8::{i >> 16:x}:{i & 0xFFFF:x}\n")
+            else:
+                f.write(f"; alias for host{i - 1}\nalias{i}  IN  CNAME   host{i - 1}\n")
+
+
+def make_tags(count: int) -> list[str]:
+    """Return a mix of v1.2.3, project-1.2.3, 1.2 and unparseable tags."""
+    rng = random.Random(SEED)
+    formats = ["v{}.{}.{}", "project-{}.{}.{}", "{}.{}", "release_{}_{}_{}"]
+    return [
+        rng.choice(formats).format(
+            rng.randint(0, 40), rng.randint(0, 99), rng.randint(0, 999)
+        )
+        for _ in range(count)
+    ]
+
+
+def write_role_tree(root: Path, roles: int) -> None:
+    """Write `roles` roles with defaults, meta and a few task files each."""
+    for i in range(roles):
+        role = root / f"role_{i}"
+        (role / "tasks").mkdir(parents=True)
+        (role / "defaults").mkdir()
+        (role / "meta").mkdir()
+        (role / "defaults" / "main.yml").write_text(
+            "---\n" + "".join(f"role_{i}_var_{v}: value_{v}\n" for v in range(10))
+        )
+        (role / "meta" / "main.yml").write_text(
+            f"---\ngalaxy_info:\n  role_name: role_{i}\n  author: bench\n"
+            "  min_ansible_version: '2.15'\ndependencies: []\n"
+        )
+        for t in range(3):
+            (role / "tasks" / f"task_{t}.yml").write_text(
+                "---\n"
+                + "".join(
+                    f"- name: Task {t}.{n}\n  ansible.builtin.debug:\n"
+                    f"    msg: '{{{{ role_{i}_var_{n} }}}}'\n"
+                    for n in range(5)
+                )
+            )
+
+
+# --------------------------------------------------
+# Benchmark cases
+# --------------------------------------------------
+# A case prepares its input in `workdir`, registers cleanups on `stack` and
+# returns the callable to time.
+Case = Callable[[Path, int, ExitStack], Callable[[], Any]]
+
+
+def case_parse_dns_zone(
+    workdir: Path, size: int, stack: ExitStack
+) -> Callable[[], Any]:
+    zone = workdir / "db.example.com"
+    write_zone_file(zone, size)
+    return lambda: parse_dns_zone(str(zone))
+
+
+def case_dns_inventory_update(
+    workdir: Path, size: int, stack: ExitStack
+) -> Callable[[], Any]:
+    """Regenerate an indexed inventory after 1% of the records changed."""
+    zone = workdir / "db.example.com"
+    write_zone_file(zone, size)
+    module = MagicMock()
+    module.check_mode = False
+    module.params = {
+        "zone_file": str(zone),
+        "output_file": str(workdir / "hosts.yml"),
+        "index_dir": str(workdir / "index"),
+    }
+    stack.enter_context(
+        patch.object(dns_inventory_gen, "AnsibleModule", return_value=module)
+    )
+    dns_inventory_gen.run_module()
+
+    index = Path(
+        dns_inventory_gen.index_path(
+            module.params["index_dir"], str(zone), module.params["output_file"]
+        )
+    )
+    previous = index.read_bytes()
+    lines = zone.read_text().replace("2026010101", "2026010102").splitlines()
+    for i in range(3, len(lines), 100):
+        lines[i] = lines[i].replace("IN", "IN ", 1)
+    zone.write_text("\n".join(lines) + "\n")
+
+    def run() -> None:
+        # Every repeat starts from the index of the previous serial
+        index.write_bytes(previous)
+        dns_inventory_gen.run_module()
+
+    return run
+
+
+def case_parse_tags(workdir: Path, size: int, stack: ExitStack) -> Callable[[], Any]:
+    tags = make_tags(size)
+    return lambda: parse_tags(tags)
+
+
+def case_fetch_tags(workdir: Path, size: int, stack: ExitStack) -> Callable[[], Any]:
+    emulator = stack.enter_context(ApiEmulator(make_tags(size)))
+    fetcher = TagFetcher(FetchOptions(api_url=emulator.url))
+    return lambda: fetcher.fetch("github", "owner", "repo", None, False)
+
+
+def case_ansible_doc_gen(
+    workdir: Path, size: int, stack: ExitStack
+) -> Callable[[], Any]:
+    roles = workdir / "roles"
+    write_role_tree(roles, size)
+    module = MagicMock()
+    module.params = {
+        "roles_path": str(roles),
+        "playbooks_path": None,
+        "output_path": str(workdir / "docs"),
+        "include_tasks": True,
+        "include_defaults": True,
+        "include_meta": True,
+    }
+
+    stack.enter_context(
+        patch.object(ansible_doc_gen, "AnsibleModule", return_value=module)
+    )
+    run: Callable[[], Any] = ansible_doc_gen.run_module
+    return run
+
+
+CASES: dict[str, Case] = {
+    "parse_dns_zone": case_parse_dns_zone,
+    "dns_inventory_update": case_dns_inventory_update,
+    "parse_tags": case_parse_tags,
+    "fetch_tags": case_fetch_tags,
+    "ansible_doc_gen": case_ansible_doc_gen,
+}
+
+
+def _child(name: str, size: int, repeat: int, conn: Connection) -> None:
+    try:
+        with (
+            tempfile.TemporaryDirectory(prefix="jcook3701-bench-") as tmp,
+            ExitStack() as stack,
+        ):
+            baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            func = CASES[name](Path(tmp), size, stack)
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - start)
+            peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        best = min(timings)
+        conn.send(
+            {
+                "seconds": round(best, 6),
+                "items_per_second": round(size / best, 1) if best else None,
+                "peak_rss_kb": peak_rss,
+                "rss_growth_kb": peak_rss - baseline_rss,
+                "repeat": repeat,
+            }
+        )
+    except Exception as e:
+        conn.send({"error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+
+def run_case(name: str, size: int, repeat: int) -> dict[str, Any]:
+    """Run one benchmark case in a forked child and return its measurements."""
+    ctx = multiprocessing.get_context("fork")
+    parent, child = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_child, args=(name, size, repeat, child))
+    process.start()
+    child.close()
+    try:
+        result: dict[str, Any] = parent.recv()
+    except EOFError:
+        result = {"error": "benchmark process died"}
+    process.join()
+    return result
+
+
+def run_suite(
+    scale: str, only: list[str] | None = None, repeat: int = 3
+) -> dict[str, Any]:
+    """Run every case of a scale and return the JSON report."""
+    results: dict[str, dict[str, Any]] = {}
+    for name, sizes in SCALES[scale].items():
+        if only and name not in only:
+            continue
+        results[name] = {}
+        for size in sizes:
+            # Very large inputs are only timed once
+            runs = repeat if size <= 100_000 else 1
+            results[name][str(size)] = run_case(name, size, runs)
+            print(f"{name:16} {size:>10}  {results[name][str(size)]}", file=sys.stderr)
+    return {
+        "meta": {
+            "scale": scale,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+
+
+def compare(
+    baseline: dict[str, Any], current: dict[str, Any], threshold: float
+) -> list[str]:
+    """
+    Return a line per case that is slower than the baseline by `threshold`.
+
+    Both time and peak RSS are compared; cases missing from either report are
+    skipped.
+    """
+    regressions = []
+    for name, sizes in current["results"].items():
+        for size, now in sizes.items():
+            before = baseline["results"].get(name, {}).get(size)
+            if not before or "error" in before or "error" in now:
+                continue
+            for metric in ("seconds", "peak_rss_kb"):
+                if before[metric] and now[metric] > before[metric] * (1 + threshold):
+                    regressions.append(
+                        f"{name}[{size}] {metric}: {before[metric]} -> {now[metric]}"
+                        f" (+{now[metric] / before[metric] - 1:.0%})"
+                    )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--only", nargs="*", choices=sorted(CASES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", type=Path, help="Write the JSON report here")
+    parser.add_argument("--compare", type=Path, help="Baseline report to diff against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown before a case is reported as a regression",
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        scale = baseline["meta"]["scale"]
+    else:
+        scale = args.scale
+    report = run_suite(scale, args.only, args.repeat)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        regressions = compare(baseline, report, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
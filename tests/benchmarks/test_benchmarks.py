@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+#
+# test_benchmarks.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+from run_benchmarks import SCALES, compare, main, run_case
+
+
+def test_smoke_cases_run() -> None:
+    """Verify every benchmark case runs at the smoke scale."""
+    for name, sizes in SCALES["smoke"].items():
+        result = run_case(name, sizes[0], repeat=1)
+        assert "error" not in result, result
+        assert result["seconds"] > 0
+        assert result["peak_rss_kb"] > 0
+
+
+def test_compare_reports_regressions() -> None:
+    """Verify slowdowns beyond the threshold are reported."""
+    baseline: dict[str, Any] = {
+        "results": {"parse_tags": {"100": {"seconds": 1.0, "peak_rss_kb": 1000}}}
+    }
+    current: dict[str, Any] = {
+        "results": {
+            "parse_tags": {"100": {"seconds": 1.5, "peak_rss_kb": 1010}},
+            "fetch_tags": {"100": {"seconds": 9.0, "peak_rss_kb": 1000}},
+        }
+    }
+    assert compare(baseline, current, 0.25) == [
+        "parse_tags[100] seconds: 1.0 -> 1.5 (+50%)"
+    ]
+
+
+def test_main_writes_report(tmp_path: Path) -> None:
+    """Test the CLI writes a report and accepts it as its own baseline."""
+    report = tmp_path / "report.json"
+    argv = ["--scale", "smoke", "--only", "parse_tags", "--repeat", "1"]
+    assert main([*argv, "-o", str(report)]) == 0
+    data = json.loads(report.read_text())
+    assert data["meta"]["scale"] == "smoke"
+    assert list(data["results"]) == ["parse_tags"]
+    assert (
+        main(["--compare", str(report), "--only", "parse_tags", "--threshold", "100"])
+        == 0
+    )
@@ -0,0 +1,127 @@
+#!/usr/bin/python3
+#
+# test_package_requirements.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from __future__ import annotations
+
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# FQCN Import for the jcook3701.utils collection
+from ansible_collections.jcook3701.utils.plugins.action.package_requirements import (
+    ActionModule,
+    merge_requirements,
+)
+
+
+def test_merge_requirements() -> None:
+    """Verify package lists are merged in order without duplicates."""
+    requirements: list[dict[str, Any]] = [
+        {"apt": ["git", "make"], "dnf": ["git"]},
+        {"apt": "make"},
+        {"pacman": ["base-devel"]},
+        {"apt": ["cmake", "git"]},
+    ]
+    assert merge_requirements(requirements, "apt") == ["git", "make", "cmake"]
+    assert merge_requirements(requirements, "dnf") == ["git"]
+    assert merge_requirements(requirements, "pacman") == ["base-devel"]
+
+
+def make_action(args: dict[str, Any]) -> ActionModule:
+    task = MagicMock()
+    task.args = args
+    task.async_val = 0
+    task.check_mode = False
+    connection = MagicMock()
+    connection._shell.tmpdir = "/tmp"
+    return ActionModule(task, connection, MagicMock(), MagicMock(), MagicMock(), None)
+
+
+@pytest.mark.parametrize(
+    "os_family,module_name,key",
+    [
+        ("Debian", "ansible.builtin.apt", "pkg"),
+        ("RedHat", "ansible.builtin.dnf", "name"),
+    ],
+)
+def test_run_single_transaction(os_family: str, module_name: str, key: str) -> None:
+    """Test the merged requirements are installed with one module call."""
+    action = make_action(
+        {
+            "requirements": [
+                {"apt": ["git", "make"], "dnf": ["git", "make"]},
+                {"apt": ["git", "cmake"], "dnf": ["git", "cmake"]},
+            ]
+        }
+    )
+    task_vars = {"ansible_facts": {"os_family": os_family}}
+
+    with patch.object(
+        action, "_execute_module", return_value={"changed": True}
+    ) as execute:
+        result = action.run(task_vars=task_vars)
+
+    execute.assert_called_once()
+    kwargs = execute.call_args[1]
+    assert kwargs["module_name"] == module_name
+    assert kwargs["module_args"][key] == ["git", "make", "cmake"]
+    if module_name.endswith("apt"):
+        assert kwargs["module_args"]["cache_valid_time"] == 3600
+    assert result["changed"] is True
+    assert "ansible_facts" not in result
+
+
+def test_run_nothing_pending() -> None:
+    """Test no package module runs when there are no requirements for the manager."""
+    action = make_action({"requirements": [{"dnf": ["git"]}]})
+    task_vars = {"ansible_facts": {"os_family": "Debian"}}
+
+    with patch.object(action, "_execute_module") as execute:
+        result = action.run(task_vars=task_vars)
+
+    execute.assert_not_called()
+    assert result["changed"] is False
+    assert result["packages"] == []
+
+
+def test_run_pacman_fresh_cache() -> None:
+    """Test the pacman sync databases are not refreshed while still fresh."""
+    action = make_action({"requirements": [{"pacman": ["git"]}]})
+    task_vars = {"ansible_facts": {"os_family": "Archlinux"}}
+
+    with (
+        patch(
+            "ansible_collections.jcook3701.utils.plugins.action.package_requirements.time.time",
+            return_value=1000.0,
+        ),
+        patch.object(
+            action,
+            "_execute_module",
+            side_effect=[
+                {"stat": {"exists": True, "mtime": 900.0}},
+                {"changed": False},
+            ],
+        ) as execute,
+    ):
+        action.run(task_vars=task_vars)
+
+    assert execute.call_args[1]["module_args"]["update_cache"] is False
@@ -0,0 +1,145 @@
+#!/usr/bin/python3
+#
+# test_task_profile.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# FQCN Import for the jcook3701.utils collection
+from ansible_collections.jcook3701.utils.plugins.callback.task_profile import (
+    CallbackModule,
+)
+
+MODULE = "ansible_collections.jcook3701.utils.plugins.callback.task_profile"
+
+
+def make_display() -> MagicMock:
+    display = MagicMock()
+    display.verbosity = 0
+    return display
+
+
+def make_task(
+    uuid: str, name: str, path: str, action: str, role: str = ""
+) -> MagicMock:
+    task = MagicMock()
+    task._uuid = uuid
+    task.get_name.return_value = name
+    task.get_path.return_value = path
+    task.action = action
+    task._role = None
+    if role:
+        task._role = MagicMock()
+        task._role.get_name.return_value = role
+    return task
+
+
+def make_host(name: str) -> MagicMock:
+    host = MagicMock()
+    host.get_name.return_value = name
+    return host
+
+
+def run_task(
+    callback: CallbackModule,
+    clock: list[float],
+    task: MagicMock,
+    host: str,
+    seconds: float,
+) -> None:
+    result = MagicMock()
+    result._task = task
+    result._host = make_host(host)
+    callback.v2_runner_on_start(result._host, task)
+    clock[0] += seconds
+    callback.v2_runner_on_ok(result)
+
+
+def test_summary_and_report(tmp_path: Path) -> None:
+    """Verify durations are aggregated by task file, role and host and written out."""
+    clock = [100.0]
+    with patch(f"{MODULE}.time.monotonic", side_effect=lambda: clock[0]):
+        callback = CallbackModule(display=make_display())
+        callback.output_dir = str(tmp_path)
+        callback.top = 2
+
+        facts = make_task(
+            "1",
+            "Collect running user facts",
+            "/roles/autobuild/tasks/build-tools/make-build.yml:6",
+            "jcook3701.utils.user_facts",
+            role="autobuild",
+        )
+        include = make_task(
+            "2",
+            "Make Build",
+            "/roles/autobuild/tasks/pkg-source-build-routine.yml:104",
+            "ansible.builtin.include_tasks",
+            role="autobuild",
+        )
+        compile_ = make_task(
+            "3",
+            "Build",
+            "/roles/autobuild/tasks/build-tools/make-build.yml:20",
+            "ansible.builtin.command",
+            role="autobuild",
+        )
+        debug = make_task("4", "debug", "/site.yml:3", "ansible.builtin.debug")
+
+        run_task(callback, clock, facts, "web1", 0.5)
+        run_task(callback, clock, facts, "web2", 0.25)
+        run_task(callback, clock, include, "web1", 0.1)
+        run_task(callback, clock, compile_, "web1", 30.0)
+        run_task(callback, clock, debug, "web1", 0.01)
+
+        summary = callback.summary()
+        callback.v2_playbook_on_stats(MagicMock())
+
+    assert summary["files"][0] == {
+        "name": "/roles/autobuild/tasks/build-tools/make-build.yml",
+        "seconds": 30.75,
+    }
+    assert summary["roles"][1] == {"name": "(play)", "seconds": 0.01}
+    assert summary["hosts"][0]["name"] == "web1"
+    assert summary["includes"] == [
+        {"name": "/roles/autobuild/tasks/pkg-source-build-routine.yml", "seconds": 0.1}
+    ]
+    facts_entry = next(t for t in summary["tasks"] if t["task"] == facts.get_name())
+    assert facts_entry["count"] == 2
+    assert facts_entry["max"] == 0.5
+
+    written = json.loads(next(tmp_path.glob("*.json")).read_text())
+    assert written["tasks"][0]["task"] == "Build"
+    assert len(next(tmp_path.glob("*.csv")).read_text().splitlines()) == 6
+    # three tables of at most two rows each
+    assert callback._display.display.call_count == 6
+
+
+def test_unstarted_results_are_ignored() -> None:
+    """Test results without a recorded start do not produce records."""
+    callback = CallbackModule(display=make_display())
+    result = MagicMock()
+    result._task = make_task("9", "late", "/site.yml:1", "ansible.builtin.ping")
+    result._host = make_host("web1")
+    callback.v2_runner_on_failed(result)
+    assert callback.records == []
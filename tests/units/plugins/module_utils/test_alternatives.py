@@ -0,0 +1,196 @@
+#!/usr/bin/python3
+#
+# test_alternatives.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from ansible_collections.jcook3701.utils.plugins.module_utils.alternatives import (
+    apply_alternatives,
+    parse_admin_file,
+    plan_alternatives,
+    read_state,
+)
+
+# Two slaves; gcc-13 has no gcov slave, which leaves an empty line
+GCC_ADMIN_FILE = """auto
+/usr/bin/gcc
+gcc.1.gz
+/usr/share/man/man1/gcc.1.gz
+gcov
+/usr/bin/gcov
+
+/usr/bin/gcc-13
+130
+/usr/share/man/man1/gcc-13.1.gz
+
+/usr/bin/gcc-14
+140
+/usr/share/man/man1/gcc-14.1.gz
+/usr/bin/gcov-14
+
+"""
+
+
+def write_admin_dir(root: Path) -> str:
+    """Write a dpkg alternatives directory with a gcc group."""
+    admin_dir = root / "admin"
+    admin_dir.mkdir()
+    (admin_dir / "gcc").write_text(GCC_ADMIN_FILE)
+    return str(admin_dir)
+
+
+def test_parse_admin_file() -> None:
+    """Verify alternatives are parsed even when a slave line is empty."""
+    state = parse_admin_file(GCC_ADMIN_FILE)
+
+    assert state["status"] == "auto"
+    assert state["link"] == "/usr/bin/gcc"
+    assert state["choices"] == {"/usr/bin/gcc-13": 130, "/usr/bin/gcc-14": 140}
+
+
+def test_read_state(tmp_path: Path) -> None:
+    """Verify the current value is read from the alternatives symlink."""
+    admin_dir = write_admin_dir(tmp_path)
+    links = tmp_path / "etc"
+    links.mkdir()
+    os.symlink("/usr/bin/gcc-14", links / "gcc")
+
+    state = read_state("gcc", admin_dir, str(links))
+    assert state is not None
+    assert state["value"] == "/usr/bin/gcc-14"
+    assert read_state("clang", admin_dir, str(links)) is None
+
+
+def test_plan_alternatives() -> None:
+    """Verify only missing or different alternatives are installed."""
+    states = {"gcc": parse_admin_file(GCC_ADMIN_FILE), "clang": None}
+    entries = [
+        {
+            "name": "gcc",
+            "link": "/usr/bin/gcc",
+            "path": "/usr/bin/gcc-13",
+            "priority": 130,
+        },
+        {
+            "name": "gcc",
+            "link": "/usr/bin/gcc",
+            "path": "/usr/bin/gcc-14",
+            "priority": 10,
+        },
+        {
+            "name": "gcc",
+            "link": "/usr/bin/gcc",
+            "path": "/usr/bin/gcc-15",
+            "manual": True,
+        },
+        {"name": "clang", "link": "/usr/bin/clang", "path": "/usr/bin/clang-18"},
+    ]
+
+    installs, selections = plan_alternatives(entries, states)
+
+    assert [entry["path"] for entry in installs] == [
+        "/usr/bin/gcc-14",
+        "/usr/bin/gcc-15",
+        "/usr/bin/clang-18",
+    ]
+    assert installs[1]["priority"] == 50
+    assert selections == ["gcc manual /usr/bin/gcc-15"]
+
+
+def test_plan_alternatives_priority_zero() -> None:
+    """Verify an explicit priority of 0 is kept instead of the default."""
+    entries = [{"name": "cc", "link": "/usr/bin/cc", "path": "/opt/cc", "priority": 0}]
+
+    installs, _ = plan_alternatives(entries, {"cc": None})
+
+    assert installs[0]["priority"] == 0
+
+
+def test_apply_alternatives_batches_selections(tmp_path: Path) -> None:
+    """Verify installs run once each and selections run in a single call."""
+    admin_dir = write_admin_dir(tmp_path)
+    links = str(tmp_path / "links")
+    module = MagicMock()
+    module.check_mode = False
+    module.get_bin_path.return_value = "/usr/bin/update-alternatives"
+    module.run_command.return_value = (0, "", "")
+    entries = [
+        {
+            "name": "gcc",
+            "link": "/usr/bin/gcc",
+            "path": "/usr/bin/gcc-13",
+            "priority": 130,
+        },
+        {
+            "name": "gcc",
+            "link": "/usr/bin/gcc",
+            "path": "/usr/bin/gcc-14",
+            "priority": 140,
+            "manual": True,
+        },
+        {
+            "name": "cc",
+            "link": "/usr/bin/cc",
+            "path": "/usr/bin/gcc-14",
+            "manual": True,
+        },
+    ]
+
+    summary = apply_alternatives(module, entries, admin_dir, links)
+
+    assert summary["changed"] is True
+    assert [entry["name"] for entry in summary["installed"]] == ["cc"]
+    calls = module.run_command.call_args_list
+    assert len(calls) == 2
+    directories = ["--admindir", admin_dir, "--altdir", links]
+    assert calls[0].args[0][1:] == [
+        *directories,
+        "--install",
+        "/usr/bin/cc",
+        "cc",
+        "/usr/bin/gcc-14",
+        "50",
+    ]
+    assert calls[1].args[0][1:] == [*directories, "--set-selections"]
+    assert calls[1].kwargs["data"] == (
+        "gcc manual /usr/bin/gcc-14\ncc manual /usr/bin/gcc-14\n"
+    )
+
+
+def test_apply_alternatives_converged(tmp_path: Path) -> None:
+    """Verify nothing runs when every alternative is already registered."""
+    admin_dir = write_admin_dir(tmp_path)
+    module = MagicMock()
+    entries = [
+        {
+            "name": "gcc",
+            "link": "/usr/bin/gcc",
+            "path": "/usr/bin/gcc-13",
+            "priority": 130,
+        },
+    ]
+
+    summary = apply_alternatives(module, entries, admin_dir)
+
+    assert summary["changed"] is False
+    module.run_command.assert_not_called()
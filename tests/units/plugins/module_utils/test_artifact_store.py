@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+#
+# test_artifact_store.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+
+from ansible_collections.jcook3701.utils.plugins.module_utils.artifact_store import (
+    ArtifactStore,
+)
+
+
+def make_file(path: Path, content: bytes) -> str:
+    path.write_bytes(content)
+    return hashlib.sha256(content).hexdigest()
+
+
+def test_add_and_materialize(tmp_path: Path) -> None:
+    """Verify artifacts are stored by digest and materialized at a new path."""
+    store = ArtifactStore(str(tmp_path / "store"))
+    sha256 = make_file(tmp_path / "pkg.deb", b"package contents")
+
+    assert store.add(str(tmp_path / "pkg.deb")) == sha256
+    assert store.has(sha256)
+
+    dest = tmp_path / "out" / "pkg.deb"
+    method = store.materialize(sha256, str(dest))
+
+    assert method in ("reflink", "hardlink", "copy")
+    assert dest.read_bytes() == b"package contents"
+
+
+def test_materialize_copy(tmp_path: Path) -> None:
+    """Verify an explicit copy does not share the inode with the store."""
+    store = ArtifactStore(str(tmp_path / "store"))
+    make_file(tmp_path / "a.iso", b"iso")
+    sha256 = store.add(str(tmp_path / "a.iso"))
+
+    dest = tmp_path / "copy.iso"
+    assert store.materialize(sha256, str(dest), "copy") == "copy"
+    assert os.stat(dest).st_ino != os.stat(store.path(sha256)).st_ino
+
+
+def test_add_is_independent_of_source(tmp_path: Path) -> None:
+    """Verify rewriting the source in place after add() leaves the object intact."""
+    store = ArtifactStore(str(tmp_path / "store"))
+    source = tmp_path / "pkg.deb"
+    sha256 = make_file(source, b"package contents")
+    store.add(str(source))
+
+    with open(source, "r+b") as f:
+        f.write(b"corrupted")
+
+    stored = store.path(sha256)
+    assert os.stat(stored).st_ino != os.stat(source).st_ino
+    assert os.stat(stored).st_mode & 0o777 == 0o444
+    with open(stored, "rb") as f:
+        assert hashlib.sha256(f.read()).hexdigest() == sha256
+
+
+def test_bind_and_resolve(tmp_path: Path) -> None:
+    """Verify logical keys resolve only while their artifact is stored."""
+    store = ArtifactStore(str(tmp_path / "store"))
+    make_file(tmp_path / "a", b"a")
+    sha256 = store.add(str(tmp_path / "a"))
+
+    store.bind("emacs-29.4:abc", sha256)
+    assert store.resolve("emacs-29.4:abc") == sha256
+    assert store.resolve("emacs-30.1:abc") is None
+
+    os.remove(store.path(sha256))
+    assert store.resolve("emacs-29.4:abc") is None
+
+
+def test_evict_least_recently_used(tmp_path: Path) -> None:
+    """Verify eviction removes the least recently used artifacts first."""
+    store = ArtifactStore(str(tmp_path / "store"), max_size=25)
+    digests = []
+    for index, name in enumerate(["old", "used", "new"]):
+        digests.append(make_file(tmp_path / name, name.encode().ljust(10, b".")))
+        store.add(str(tmp_path / name), digests[-1])
+        os.utime(store.path(digests[-1]), (index * 10, index * 10))
+    # Touch 'used' so it becomes the most recently used artifact
+    store.materialize(digests[1], str(tmp_path / "used-copy"), "copy")
+
+    assert store.evict(keep=digests[2]) == [digests[0]]
+    assert store.has(digests[1])
+    assert store.has(digests[2])
+    assert store.size() == 20
@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+#
+# test_autobuild.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from ansible_collections.jcook3701.utils.plugins.module_utils.autobuild import (
+    DependencyError,
+    build_phases,
+    checkinstall_phase,
+    clean_phase,
+    compiler_cache_environment,
+    dependency_order,
+)
+
+
+def test_dependency_order_respects_depends_on() -> None:
+    """Verify every package is ordered after its dependencies."""
+    order = dependency_order(
+        {"mesa": ["libdrm", "llvm"], "libdrm": [], "llvm": [], "xorg": ["mesa"]}
+    )
+    assert order.index("libdrm") < order.index("mesa")
+    assert order.index("llvm") < order.index("mesa")
+    assert order[-1] == "xorg"
+
+
+def test_dependency_order_cycle() -> None:
+    """Verify cycles are reported instead of looping forever."""
+    with pytest.raises(DependencyError, match="cycle"):
+        dependency_order({"a": ["b"], "b": ["a"], "c": []})
+
+
+def test_dependency_order_unknown() -> None:
+    """Verify unknown dependencies are rejected."""
+    with pytest.raises(DependencyError, match="unknown package 'missing'"):
+        dependency_order({"a": ["missing"]})
+
+
+def test_build_phases_make_with_configure(tmp_path: Path) -> None:
+    """Verify autotools projects are configured with the prefix and built in parallel."""
+    (tmp_path / "configure").write_text("#!/bin/sh\n")
+    phases = build_phases("make", str(tmp_path), 8, install_prefix="/opt/emacs")
+
+    assert [p.name for p in phases] == ["configure", "compile", "install"]
+    assert phases[0].argv == ["./configure", "--prefix=/opt/emacs"]
+    assert phases[1].argv == ["make", "-j8"]
+
+
+def test_build_phases_cmake(tmp_path: Path) -> None:
+    """Verify cmake builds use the parallel build step."""
+    phases = build_phases("cmake", str(tmp_path), 4)
+
+    assert [p.name for p in phases] == ["configure", "compile", "install"]
+    assert phases[1].argv[-2:] == ["--parallel", "4"]
+
+
+def test_clean_phase_only_after_a_build(tmp_path: Path) -> None:
+    """Verify cleaning is skipped until there are build outputs to remove."""
+    assert clean_phase("meson-ninja", str(tmp_path)) is None
+
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "build.ninja").write_text("")
+    phase = clean_phase("meson-ninja", str(tmp_path))
+
+    assert phase is not None
+    assert phase.argv == ["meson", "compile", "-C", "build", "--clean"]
+
+
+def test_checkinstall_phase_wraps_install(tmp_path: Path) -> None:
+    """Verify the install step runs through checkinstall with the role's package name."""
+    (install,) = [
+        p for p in build_phases("cmake", str(tmp_path), 2) if p.name == "install"
+    ]
+    phase = checkinstall_phase(install, "emacs", "emacs-29.4", "/home/builder/pkgs")
+
+    assert phase.name == "checkinstall"
+    assert "--pkgname=emacs-29.4" in phase.argv
+    assert "--pakdir=/home/builder/pkgs" in phase.argv
+    assert phase.argv[-len(install.argv) :] == install.argv
+
+
+def test_compiler_cache_environment() -> None:
+    """Verify the compiler cache settings become launcher and cache variables."""
+    assert compiler_cache_environment({}, "make", "/home/builder") == {}
+
+    environment = compiler_cache_environment(
+        {"enabled": True, "tool": "ccache", "max_size": "2G"}, "make", "/home/builder"
+    )
+
+    assert environment["CCACHE_DIR"] == "/home/builder/.cache/ccache"
+    assert environment["CCACHE_MAXSIZE"] == "2G"
+    assert environment["CC"] == "ccache cc"
+    assert environment["CMAKE_CXX_COMPILER_LAUNCHER"] == "ccache"
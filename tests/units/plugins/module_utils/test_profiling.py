@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+#
+# test_profiling.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from __future__ import annotations
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# FQCN Import for the jcook3701.utils collection
+from ansible_collections.jcook3701.utils.plugins.module_utils.profiling import (
+    PROFILE_ENV,
+    Profiler,
+)
+from ansible_collections.jcook3701.utils.plugins.modules.parse_tags_module import (
+    main as parse_tags_main,
+)
+
+
+def test_disabled_profiler_reports_nothing(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify no metrics are collected unless profiling is requested."""
+    monkeypatch.delenv(PROFILE_ENV, raising=False)
+    profiler = Profiler()
+    profiler.configure({"_profile": False, "_profile_top": 0})
+    with profiler.phase("parse"):
+        pass
+    assert profiler.phases == {}
+    assert profiler.report({"changed": False}) == {"changed": False}
+
+
+def test_phases_are_summed(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify repeated phases accumulate and the env var enables profiling."""
+    monkeypatch.setenv(PROFILE_ENV, "1")
+    profiler = Profiler()
+    profiler.configure({})
+    for _ in range(3):
+        with profiler.phase("io"):
+            pass
+    metrics = profiler.report({})["metrics"]
+    assert set(metrics["phases"]) == {"arg_parsing", "io"}
+    assert metrics["peak_rss_kb"] > 0
+    assert "cprofile" not in metrics
+
+
+def test_cprofile_top(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify cProfile returns at most the requested number of functions."""
+    monkeypatch.delenv(PROFILE_ENV, raising=False)
+    profiler = Profiler()
+    profiler.configure({"_profile_top": 3})
+    with profiler.phase("render"):
+        sorted(str(i) for i in range(1000))
+    rows = profiler.metrics()["cprofile"]
+    assert 0 < len(rows) <= 3
+    assert {"function", "calls", "tottime", "cumtime"} <= set(rows[0])
+
+
+@patch(
+    "ansible_collections.jcook3701.utils.plugins.modules.parse_tags_module.AnsibleModule"
+)
+def test_module_returns_metrics(mock_ansible_module: MagicMock) -> None:
+    """Test a profiled module returns metrics alongside its result."""
+    mock_module_instance = MagicMock()
+    mock_module_instance.params = {"tags": ["v1.2.3"], "_profile": True}
+    mock_ansible_module.return_value = mock_module_instance
+
+    parse_tags_main()
+
+    kwargs = mock_module_instance.exit_json.call_args[1]
+    assert kwargs["parsed_tags"][0]["major"] == 1
+    assert set(kwargs["metrics"]["phases"]) == {"arg_parsing", "parse"}
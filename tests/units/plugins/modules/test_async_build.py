@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+#
+# test_async_build.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+# FQCN Import for the jcook3701.utils collection
+from ansible_collections.jcook3701.utils.plugins.modules.async_build import (
+    BuildJob,
+    main,
+    parse_progress,
+    process_start,
+)
+
+MODULE = "ansible_collections.jcook3701.utils.plugins.modules.async_build"
+
+
+def test_parse_progress() -> None:
+    """Verify ninja and CMake progress lines are parsed and plain make is not."""
+    ninja = b"[1/40] Compiling C object a.o\nwarning: x\n[12/40] Linking b\n"
+    assert parse_progress(ninja) == {"done": 12, "total": 40, "percent": 30.0}
+    cmake = b"[  9%] Building C object a.o\n[ 42%] Building C object b.o\n"
+    assert parse_progress(cmake) == {"percent": 42.0}
+    assert parse_progress(b"cc -c a.c\ncc -c b.c\n") is None
+
+
+def run(tmp_path: Path, **params: Any) -> MagicMock:
+    mock_module_instance = MagicMock()
+    mock_module_instance.check_mode = False
+    mock_module_instance.params = {
+        "job": "pkg",
+        "phases": None,
+        "state": "started",
+        "state_dir": str(tmp_path),
+        "wait": 0,
+        "tail": 40,
+        **params,
+    }
+    with patch(f"{MODULE}.AnsibleModule", return_value=mock_module_instance):
+        main()
+    return mock_module_instance
+
+
+def test_main_runs_phases_in_background(tmp_path: Path) -> None:
+    """Test phases run detached and the status reports durations per phase."""
+    phases = [
+        {"name": "configure", "cmd": "echo configured", "chdir": str(tmp_path)},
+        {"name": "compile", "cmd": ["printf", "[1/2] a\\n[2/2] b\\n"]},
+        {"name": "install", "cmd": "false", "creates": str(tmp_path)},
+    ]
+    started = run(tmp_path, phases=phases)
+    started.fail_json.assert_not_called()
+    assert started.exit_json.call_args[1]["changed"] is True
+
+    module = run(tmp_path, state="status", wait=30)
+    module.fail_json.assert_not_called()
+    result = module.exit_json.call_args[1]
+    assert result["status"] == "succeeded"
+    assert result["finished"] is True
+    assert list(result["durations"]) == ["configure", "compile", "install"]
+    assert result["phases"][2]["skipped"] is True
+    assert (tmp_path / "pkg" / "configure.log").read_text() == "configured\n"
+
+    job = BuildJob(str(tmp_path), "pkg")
+    assert job.load(job.history_path) == {"configure": 1, "compile": 2}
+
+
+def test_main_reports_failure(tmp_path: Path) -> None:
+    """Test a failed phase stops the job and fails with the log tail."""
+    phases = [
+        {"name": "compile", "cmd": "echo one; echo two; exit 3"},
+        {"name": "checkinstall", "cmd": "echo never"},
+    ]
+    run(tmp_path, phases=phases)
+    module = run(tmp_path, state="status", wait=30, tail=1)
+
+    kwargs = module.fail_json.call_args[1]
+    assert kwargs["msg"] == "Build phase compile failed with rc 3"
+    assert kwargs["log_tail"] == ["two"]
+    assert [p["name"] for p in kwargs["phases"]] == ["compile"]
+
+
+def test_progress_estimated_from_previous_run(tmp_path: Path) -> None:
+    """Verify plain make progress is estimated from the previous log length."""
+    job = BuildJob(str(tmp_path), "pkg")
+    (tmp_path / "pkg").mkdir()
+    job.save({"compile": 200}, job.history_path)
+    Path(job.log_path("compile")).write_text("cc -c x.c\n" * 50)
+
+    assert job.progress({"phase": "compile"}) == {"percent": 25.0, "estimated": True}
+    assert job.progress({"phase": "configure"}) == {"percent": None}
+
+
+def test_status_detects_reused_pid(tmp_path: Path) -> None:
+    """Verify a running job whose pid now belongs to another process is failed."""
+    job = BuildJob(str(tmp_path), "pkg")
+    (tmp_path / "pkg").mkdir()
+    own_start = process_start(os.getpid())
+    job.save({"status": "running", "pid": os.getpid(), "pid_start": own_start})
+
+    status = job.status()
+    assert status is not None
+    assert status["status"] == "running"
+
+    job.save({"status": "running", "pid": os.getpid(), "pid_start": "other-boot/1"})
+    status = job.status()
+    assert status is not None
+    assert status["status"] == "failed"
@@ -0,0 +1,198 @@
+#!/usr/bin/python3
+#
+# test_autobuild_batch.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import pwd
+import threading
+import time
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+from ansible_collections.jcook3701.utils.plugins.modules.autobuild_batch import (
+    CloneOptions,
+    PackageBuilder,
+    PackageResult,
+    clone_commands,
+    run_batch,
+)
+
+MODULE = "ansible_collections.jcook3701.utils.plugins.modules.autobuild_batch"
+
+# Mock dependency graph: two independent chains joined by 'app'
+MOCK_DEPENDENCIES: dict[str, list[str]] = {
+    "zlib": [],
+    "openssl": ["zlib"],
+    "libffi": [],
+    "python": ["openssl", "libffi"],
+    "app": ["python"],
+}
+
+
+def test_run_batch_builds_dependencies_first() -> None:
+    """Verify no package starts before its dependencies have finished."""
+    finished: list[str] = []
+    lock = threading.Lock()
+
+    def build(name: str) -> PackageResult:
+        with lock:
+            assert all(dep in finished for dep in MOCK_DEPENDENCIES[name])
+        time.sleep(0.01)
+        with lock:
+            finished.append(name)
+        return PackageResult(name=name, status="built")
+
+    results = run_batch(MOCK_DEPENDENCIES, 3, build)
+
+    assert {r["name"] for r in results} == set(MOCK_DEPENDENCIES)
+    assert all(r["status"] == "built" for r in results)
+    assert finished[-1] == "app"
+
+
+def test_run_batch_bounded_workers() -> None:
+    """Verify independent packages run concurrently but never above the worker count."""
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def build(name: str) -> PackageResult:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+        return PackageResult(name=name, status="built")
+
+    run_batch({f"pkg{i}": [] for i in range(8)}, 3, build)
+
+    assert peak == 3
+
+
+def test_run_batch_skips_dependents_of_failure() -> None:
+    """Verify a failed build skips everything that depends on it."""
+
+    def build(name: str) -> PackageResult:
+        if name == "openssl":
+            return PackageResult(name=name, status="failed", msg="compile failed")
+        return PackageResult(name=name, status="built")
+
+    results = {r["name"]: r for r in run_batch(MOCK_DEPENDENCIES, 2, build)}
+
+    assert results["openssl"]["status"] == "failed"
+    assert results["python"]["status"] == "skipped"
+    assert results["app"]["status"] == "skipped"
+    assert results["libffi"]["status"] == "built"
+
+
+def test_clone_commands_new_checkout() -> None:
+    """Verify a fresh clone only fetches the requested tag."""
+    commands = clone_commands(
+        "https://example.com/repo.git", "/nonexistent/repo", "v1.0"
+    )
+    assert commands == [
+        [
+            "git",
+            "clone",
+            "--depth=1",
+            "--single-branch",
+            "--branch",
+            "v1.0",
+            "https://example.com/repo.git",
+            "/nonexistent/repo",
+        ]
+    ]
+
+
+def test_clone_commands_reference_mirror() -> None:
+    """Verify a full clone borrows objects from the local mirror."""
+    options = CloneOptions(depth=0, reference="/srv/mirrors/repo.git", dissociate=True)
+    (argv,) = clone_commands(
+        "https://example.com/repo.git", "/nonexistent/repo", None, options
+    )
+
+    assert "--depth=1" not in argv
+    assert argv[2:5] == ["--reference-if-able", "/srv/mirrors/repo.git", "--dissociate"]
+
+
+def test_clone_commands_existing_checkout(tmp_path: Path) -> None:
+    """Verify an existing checkout fetches only the tag instead of all history."""
+    (tmp_path / ".git").mkdir()
+    commands = clone_commands("https://example.com/repo.git", str(tmp_path), "v2.0")
+
+    assert commands[0][-3:] == ["--depth=1", "origin", "v2.0"]
+    assert commands[1][-1] == "FETCH_HEAD"
+
+
+def test_package_builder_installs_as_root(tmp_path: Path) -> None:
+    """Verify only the checkinstall step skips runuser and the build environment is passed."""
+    builder_user = pwd.struct_passwd(
+        ("builder", "x", 4242, 4242, "", str(tmp_path / "home"), "/bin/sh")
+    )
+    module = MagicMock()
+    module.params = {
+        "build_root": str(tmp_path),
+        "environment": {"MAKEFLAGS": "-s"},
+        "mirror_dir": None,
+        "depth": 1,
+        "dissociate": False,
+        "workers": 1,
+        "jobs": 2,
+        "build_user": "builder",
+        "install": True,
+        "pakdir": str(tmp_path / "pkgs"),
+    }
+    module.get_bin_path.return_value = "/usr/sbin/runuser"
+    module.run_command.return_value = (0, "", "")
+    package: dict[str, Any] = {
+        "name": "emacs",
+        "repo": "https://example.com/emacs.git",
+        "version": "emacs-29.4",
+        "directory": None,
+        "script": "cmake",
+        "flags": [],
+        "install_prefix": None,
+        "jobs": None,
+        "environment": {"CFLAGS": "-O2", "CMAKE_C_COMPILER_LAUNCHER": "distcc"},
+        "clean": False,
+        "checkinstall": True,
+        "compiler_cache": {"enabled": True, "tool": "ccache", "max_size": "5G"},
+    }
+
+    with (
+        patch(f"{MODULE}.pwd.getpwnam", return_value=builder_user),
+        patch(f"{MODULE}.os.chown") as chown,
+    ):
+        result = PackageBuilder(module, {"emacs": package})("emacs")
+
+    assert result["status"] == "built"
+    assert set(result["phases"]) == {"clone", "configure", "compile", "checkinstall"}
+    for call in module.run_command.call_args_list:
+        argv = call.args[0]
+        assert (argv[0] == "checkinstall") != (
+            argv[:3] == ["/usr/sbin/runuser", "-u", "builder"]
+        )
+        assert call.kwargs["environ_update"]["CFLAGS"] == "-O2"
+        assert call.kwargs["environ_update"]["MAKEFLAGS"] == "-s"
+        assert call.kwargs["environ_update"]["CMAKE_C_COMPILER_LAUNCHER"] == "ccache"
+    assert (tmp_path / "home" / ".cache" / "ccache").is_dir()
+    chown.assert_any_call(str(tmp_path / "emacs.log"), 4242, 4242)
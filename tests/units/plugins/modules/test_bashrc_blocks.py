@@ -0,0 +1,143 @@
+#!/usr/bin/python3
+#
+# test_bashrc_blocks.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+# FQCN Import for the jcook3701.utils collection
+from ansible_collections.jcook3701.utils.plugins.modules.bashrc_blocks import (
+    main,
+    update_blocks,
+)
+
+MODULE = "ansible_collections.jcook3701.utils.plugins.modules.bashrc_blocks"
+
+BASHRC = """\
+alias ll='ls -l'
+# BEGIN Ansible - emacs
+export PATH=/opt/emacs-29/bin:$PATH
+# END Ansible - emacs
+# BEGIN Ansible - old
+export OLD=1
+# END Ansible - old
+export EDITOR=vim"""
+
+
+def test_update_blocks() -> None:
+    """Verify blocks are updated, removed and appended in a single pass."""
+    text, actions = update_blocks(
+        BASHRC,
+        [
+            {"name": "emacs", "block": "export PATH=/opt/emacs-30/bin:$PATH"},
+            {"name": "old", "state": "absent"},
+            {"name": "mesa", "block": "export MESA=1\n"},
+            {"name": "gone", "state": "absent"},
+        ],
+    )
+    assert actions == {
+        "emacs": "updated",
+        "old": "removed",
+        "mesa": "added",
+        "gone": "unchanged",
+    }
+    assert text == (
+        "alias ll='ls -l'\n"
+        "# BEGIN Ansible - emacs\n"
+        "export PATH=/opt/emacs-30/bin:$PATH\n"
+        "# END Ansible - emacs\n"
+        "export EDITOR=vim\n"
+        "# BEGIN Ansible - mesa\n"
+        "export MESA=1\n"
+        "# END Ansible - mesa\n"
+    )
+
+    again, actions = update_blocks(
+        text,
+        [
+            {"name": "emacs", "block": "export PATH=/opt/emacs-30/bin:$PATH"},
+            {"name": "mesa", "block": "export MESA=1", "marker": None},
+        ],
+    )
+    assert again == text
+    assert set(actions.values()) == {"unchanged"}
+
+
+def test_update_blocks_custom_marker() -> None:
+    """Verify custom markers are used and the last duplicate wins."""
+    text, actions = update_blocks(
+        "",
+        [
+            {"name": "a", "block": "one", "marker": "## {mark} a"},
+            {"name": "a", "block": "two", "marker": "## {mark} a"},
+        ],
+        marker_begin="start",
+        marker_end="stop",
+    )
+    assert text == "## start a\ntwo\n## stop a\n"
+    assert actions == {"a": "added"}
+
+
+def run(path: Path, check_mode: bool = False, **params: Any) -> dict[str, Any]:
+    mock_module_instance = MagicMock()
+    mock_module_instance.check_mode = check_mode
+    mock_module_instance.params = {
+        "path": str(path),
+        "marker_begin": "BEGIN",
+        "marker_end": "END",
+        "create": True,
+        **params,
+    }
+    with patch(f"{MODULE}.AnsibleModule", return_value=mock_module_instance):
+        main()
+    mock_module_instance.fail_json.assert_not_called()
+    kwargs: dict[str, Any] = mock_module_instance.exit_json.call_args[1]
+    return kwargs
+
+
+def test_main_writes_once(tmp_path: Path) -> None:
+    """Test the file behind a symlink is rewritten once and keeps its mode."""
+    target = tmp_path / "dotfiles" / "bashrc"
+    target.parent.mkdir()
+    target.write_text(BASHRC)
+    target.chmod(0o600)
+    link = tmp_path / ".bashrc"
+    link.symlink_to(target)
+    blocks = [{"name": "emacs", "block": "export PATH=/opt/emacs-30/bin:$PATH"}]
+
+    preview = run(link, check_mode=True, blocks=blocks)
+    assert preview["changed"] is True
+    assert target.read_text() == BASHRC
+
+    with patch(f"{MODULE}.os.replace", wraps=os.replace) as replace:
+        first = run(link, blocks=blocks)
+        second = run(link, blocks=blocks)
+    assert replace.call_count == 1
+
+    assert first["changed_blocks"] == ["emacs"]
+    assert second["changed"] is False
+    assert second["blocks"] == {"emacs": "unchanged"}
+    assert link.is_symlink()
+    assert "emacs-30" in target.read_text()
+    assert target.stat().st_mode & 0o777 == 0o600
@@ -21,13 +21,21 @@
 
 from __future__ import annotations
 
+import os
+from pathlib import Path
 from typing import Any
 from unittest.mock import MagicMock, mock_open, patch
 
 import yaml
 from ansible_collections.jcook3701.utils.plugins.modules.dns_inventory_gen import (
+    load_index,
     parse_dns_zone,
+    read_index_header,
+    read_soa_serial,
+    render_inventory,
     run_module,
+    save_index,
+    scan_zone,
 )
 
 # Mock DNS Zone file content
@@ -59,16 +67,16 @@ def test_parse_dns_zone() -> None:
 @patch(
     "ansible_collections.jcook3701.utils.plugins.modules.dns_inventory_gen.parse_dns_zone"
 )
-@patch("builtins.open", new_callable=mock_open)
 def test_run_module_success(
-    mock_file: MagicMock, mock_parse: MagicMock, mock_ansible_module: MagicMock
+    mock_parse: MagicMock, mock_ansible_module: MagicMock, tmp_path: Path
 ) -> None:
     """Test the full module execution and inventory sorting."""
     # Setup Mock Inputs
+    output_file = tmp_path / "inventory.yml"
     mock_module_instance = MagicMock()
     mock_module_instance.params = {
         "zone_file": "db.example.com",
-        "output_file": "inventory.yml",
+        "output_file": str(output_file),
     }
     mock_module_instance.check_mode = False
     mock_ansible_module.return_value = mock_module_instance
@@ -83,12 +91,7 @@ def test_run_module_success(
     run_module()
 
     # Verify Output Data
-    # cast write calls to string for analysis
-    handle = mock_file()
-    written_content: str = "".join(
-        str(call.args[0]) for call in handle.write.call_args_list
-    )
-    output_inventory: dict[str, Any] = yaml.safe_load(written_content)
+    output_inventory: dict[str, Any] = yaml.safe_load(output_file.read_text())
 
     # Check for correct inventory structure and IP sorting
     hosts: dict[str, Any] = output_inventory["all"]["hosts"]
@@ -99,3 +102,194 @@ def test_run_module_success(
 
     # Verify Ansible module exit call
     mock_module_instance.exit_json.assert_called_once()
+
+
+ZONE_HEADER = """$TTL 3600
+@   IN  SOA ns1.example.com. admin.example.com. (
+        {serial} ; serial
+        3600 600 1209600 3600 )
+@   IN  NS  ns1.example.com.
+"""
+
+
+def run_with_index(tmp_path: Path, zone: str, check_mode: bool = False) -> Any:
+    """Run the module on a zone with an index directory and return its result."""
+    zone_file = tmp_path / "db.example.com"
+    zone_file.write_text(zone)
+    mock_module_instance = MagicMock()
+    mock_module_instance.params = {
+        "zone_file": str(zone_file),
+        "output_file": str(tmp_path / "hosts.yml"),
+        "index_dir": str(tmp_path / "index"),
+    }
+    mock_module_instance.check_mode = check_mode
+    with patch(
+        "ansible_collections.jcook3701.utils.plugins.modules.dns_inventory_gen.AnsibleModule",
+        return_value=mock_module_instance,
+    ):
+        run_module()
+    mock_module_instance.fail_json.assert_not_called()
+    return mock_module_instance.exit_json.call_args.kwargs
+
+
+def test_read_soa_serial_multiline(tmp_path: Path) -> None:
+    """Verify the serial is read from an SOA spanning several lines."""
+    zone_file = tmp_path / "db.example.com"
+    zone_file.write_text(ZONE_HEADER.format(serial=2026030301))
+    assert read_soa_serial(str(zone_file)) == 2026030301
+
+    zone_file.write_text("web01 IN A 192.168.1.2\n")
+    assert read_soa_serial(str(zone_file)) is None
+
+
+def test_index_round_trip(tmp_path: Path) -> None:
+    """Verify an index is saved and loaded unchanged."""
+    data = (ZONE_HEADER.format(serial=1) + MOCK_ZONE_DATA).encode()
+    index, tokenized = scan_zone(data, None)
+    index = index._replace(serial=1)
+    path = str(tmp_path / "zone.idx")
+    save_index(path, index)
+
+    assert tokenized > 0
+    assert load_index(path) == index
+    assert read_index_header(path) == (1, 4)
+
+
+def test_scan_zone_reuses_unchanged_lines() -> None:
+    """Verify only new or edited lines are tokenized against a previous index."""
+    lines = [f"host{i} IN A 10.0.{i // 256}.{i % 256}" for i in range(500)]
+    previous, _ = scan_zone("\n".join(lines).encode(), None)
+
+    lines[10] = "host10 IN A 10.9.9.9"
+    lines.insert(0, "new IN AAAA 2001:db8::1")
+    index, tokenized = scan_zone("\n".join(lines).encode(), previous)
+
+    assert tokenized == 2
+    assert index.owners[0] == b"new"
+    assert index.addresses[11] == b"10.9.9.9"
+    assert len(index.owners) == 501
+
+
+def test_run_module_incremental(tmp_path: Path) -> None:
+    """Verify unchanged serials are skipped and host deltas are reported."""
+    zone = ZONE_HEADER.format(serial=1) + MOCK_ZONE_DATA
+    first = run_with_index(tmp_path, zone)
+    assert first["changed"] is True
+    assert first["initialized"] is True
+    assert first["records"] == 4
+
+    second = run_with_index(tmp_path, zone)
+    assert second["changed"] is False
+    assert second["serial_unchanged"] is True
+
+    zone = (
+        ZONE_HEADER.format(serial=2)
+        + MOCK_ZONE_DATA.replace("192.168.1.5", "192.168.1.9").replace(
+            "ns1     IN      A       192.168.1.10\n", ""
+        )
+        + "web03   IN      A       192.168.1.7\n"
+    )
+    third = run_with_index(tmp_path, zone)
+    assert third["changed"] is True
+    # Six SOA/NS/$TTL lines are not indexed, plus the two edited records
+    assert third["tokenized_lines"] == 8
+    assert third["added"] == {"web03": "192.168.1.7"}
+    assert third["removed"] == {"ns1": "192.168.1.10"}
+    assert third["changed_hosts"] == {
+        "web02": {"before": "192.168.1.5", "after": "192.168.1.9"}
+    }
+
+    hosts = yaml.safe_load((tmp_path / "hosts.yml").read_text())["all"]["hosts"]
+    assert hosts["db01"] == {"ansible_host": "2001:db8::1"}
+    assert sorted(hosts) == ["db01", "web01", "web02", "web03"]
+
+
+def test_run_module_check_mode_writes_nothing(tmp_path: Path) -> None:
+    """Verify check mode reports changes without writing the inventory or index."""
+    result = run_with_index(tmp_path, MOCK_ZONE_DATA, check_mode=True)
+
+    assert result["changed"] is True
+    assert not (tmp_path / "hosts.yml").exists()
+    assert not (tmp_path / "index").exists()
+
+
+def test_render_inventory_matches_yaml_dump() -> None:
+    """Verify the direct renderer quotes scalars exactly like PyYAML."""
+    hosts = {
+        "web01": "192.168.1.2",
+        "yes": "2001:db8::1",
+        "010": "1:2:3:4:5:6:7:8",
+        "host.example.com": "2001:db8:0:1::",
+        "_srv": "::1",
+        "on": "10.0.0.1",
+        "x" * 130: "10.0.0.2",
+    }
+    expected = yaml.dump(
+        {"all": {"hosts": {name: {"ansible_host": ip} for name, ip in hosts.items()}}},
+        default_flow_style=False,
+    )
+    assert render_inventory(hosts) == expected
+    assert render_inventory({}) == yaml.dump({"all": {"hosts": {}}})
+
+
+def test_run_module_index_not_writable(tmp_path: Path) -> None:
+    """Verify a failed index save only warns and the inventory is still written."""
+    zone_file = tmp_path / "db.example.com"
+    zone_file.write_text(ZONE_HEADER.format(serial=1) + MOCK_ZONE_DATA)
+    (tmp_path / "index").write_text("not a directory")
+    mock_module_instance = MagicMock()
+    mock_module_instance.params = {
+        "zone_file": str(zone_file),
+        "output_file": str(tmp_path / "hosts.yml"),
+        "index_dir": str(tmp_path / "index"),
+    }
+    mock_module_instance.check_mode = False
+    with patch(
+        "ansible_collections.jcook3701.utils.plugins.modules.dns_inventory_gen.AnsibleModule",
+        return_value=mock_module_instance,
+    ):
+        run_module()
+
+    mock_module_instance.fail_json.assert_not_called()
+    mock_module_instance.warn.assert_called_once()
+    assert "web01" in (tmp_path / "hosts.yml").read_text()
+
+
+def test_run_module_failed_write_keeps_output(tmp_path: Path) -> None:
+    """Verify a failed inventory write leaves the old inventory and no index."""
+    zone = ZONE_HEADER.format(serial=1) + MOCK_ZONE_DATA
+    real_replace = os.replace
+
+    def replace(src: str, dst: str) -> None:
+        if dst.endswith("hosts.yml"):
+            raise PermissionError("read-only")
+        real_replace(src, dst)
+
+    with patch(
+        "ansible_collections.jcook3701.utils.plugins.modules.dns_inventory_gen.os.replace",
+        side_effect=replace,
+    ):
+        (tmp_path / "hosts.yml").write_text("old")
+        zone_file = tmp_path / "db.example.com"
+        zone_file.write_text(zone)
+        mock_module_instance = MagicMock()
+        mock_module_instance.params = {
+            "zone_file": str(zone_file),
+            "output_file": str(tmp_path / "hosts.yml"),
+            "index_dir": str(tmp_path / "index"),
+        }
+        mock_module_instance.check_mode = False
+        with patch(
+            "ansible_collections.jcook3701.utils.plugins.modules.dns_inventory_gen.AnsibleModule",
+            return_value=mock_module_instance,
+        ):
+            run_module()
+
+    mock_module_instance.fail_json.assert_called_once()
+    assert (tmp_path / "hosts.yml").read_text() == "old"
+    assert not list((tmp_path / "index").iterdir())
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "db.example.com",
+        "hosts.yml",
+        "index",
+    ]
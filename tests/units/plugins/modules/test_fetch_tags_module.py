@@ -20,6 +20,8 @@
 
 from __future__ import annotations
 
+import json
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -27,9 +29,15 @@ import pytest
 # Fixed: Importing 'main' because that is what is in your source file
 from ansible_collections.jcook3701.utils.plugins.modules.fetch_tags_module import (
     PLATFORMS,
+    FetchOptions,
+    TagFetcher,
     fetch_tags,
     main,
+    next_page_url,
 )
+from api_emulator import ApiEmulator
+
+MODULE = "ansible_collections.jcook3701.utils.plugins.modules.fetch_tags_module"
 
 # Mock API Data
 MOCK_GITHUB_TAGS: list[dict[str, str]] = [
@@ -41,11 +49,8 @@ MOCK_GITHUB_TAGS: list[dict[str, str]] = [
 
 def test_fetch_tags_github_success() -> None:
     """Test successful tag retrieval from GitHub."""
-    with patch("requests.get") as mock_get:
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = MOCK_GITHUB_TAGS
-        mock_get.return_value = mock_response
+    with patch(f"{MODULE}.http_get") as mock_get:
+        mock_get.return_value = (200, {}, json.dumps(MOCK_GITHUB_TAGS).encode())
 
         result = fetch_tags("github", "ansible", "ansible", None, False)
 
@@ -57,11 +62,8 @@ def test_fetch_tags_github_success() -> None:
 
 def test_fetch_tags_latest_only() -> None:
     """Test that 'latest=True' returns a single string."""
-    with patch("requests.get") as mock_get:
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = MOCK_GITHUB_TAGS
-        mock_get.return_value = mock_response
+    with patch(f"{MODULE}.http_get") as mock_get:
+        mock_get.return_value = (200, {}, json.dumps(MOCK_GITHUB_TAGS).encode())
 
         result = fetch_tags("github", "ansible", "ansible", None, True)
 
@@ -73,7 +75,7 @@ def test_fetch_tags_latest_only() -> None:
     "ansible_collections.jcook3701.utils.plugins.modules.fetch_tags_module.AnsibleModule"
 )
 @patch(
-    "ansible_collections.jcook3701.utils.plugins.modules.fetch_tags_module.fetch_tags"
+    "ansible_collections.jcook3701.utils.plugins.modules.fetch_tags_module.TagFetcher.fetch"
 )
 def test_main_failure(mock_fetch: MagicMock, mock_ansible_module: MagicMock) -> None:
     """Test module behavior when fetch_tags returns an error."""
@@ -84,6 +86,11 @@ def test_main_failure(mock_fetch: MagicMock, mock_ansible_module: MagicMock) ->
         "repo": "ansible",
         "token": None,
         "latest": False,
+        "api_url": None,
+        "per_page": 100,
+        "retries": 3,
+        "max_wait": 60,
+        "cache_dir": None,
     }
     mock_ansible_module.return_value = mock_module_instance
 
@@ -123,3 +130,97 @@ def test_platform_url_generation(
     config = PLATFORMS[platform]
     generated_url: str = config.get_url(owner, repo)
     assert generated_url == expected_url
+
+
+def test_platform_url_override() -> None:
+    """Verify api_url replaces the provider base URL."""
+    config = PLATFORMS["github"]
+    generated_url = config.get_url("jcook", "utils", "http://127.0.0.1:8080/")
+    assert generated_url == "http://127.0.0.1:8080/repos/jcook/utils/tags"
+
+
+def test_next_page_url_gitlab_header() -> None:
+    """Verify X-Next-Page is used when no Link header is present."""
+    url = "https://gitlab.com/api/v4/projects/a%2Fb/repository/tags?per_page=20"
+    next_url = next_page_url(url, {"X-Next-Page": "2"})
+    assert next_url == (
+        "https://gitlab.com/api/v4/projects/a%2Fb/repository/tags?per_page=20&page=2"
+    )
+    assert next_page_url(url, {"X-Next-Page": ""}) is None
+
+
+@pytest.mark.parametrize("provider", ["github", "gitlab"])
+def test_fetch_tags_follows_pagination(provider: str) -> None:
+    """Verify every page is fetched from the API emulator."""
+    tags = [f"v{n}" for n in range(250, 0, -1)]
+    with ApiEmulator(tags) as emulator:
+        fetcher = TagFetcher(FetchOptions(api_url=emulator.url))
+        result = fetcher.fetch(provider, "owner", "repo", None, False)
+        latest = fetcher.fetch(provider, "owner", "repo", None, True)
+
+    assert result == tags
+    assert latest == "v250"
+    assert emulator.stats["ok"] == 4
+
+
+def test_fetch_tags_revalidates_with_etag(tmp_path: Path) -> None:
+    """Verify cached pages are revalidated and not counted as new downloads."""
+    tags = [f"v{n}" for n in range(150, 0, -1)]
+    options = FetchOptions(cache_dir=str(tmp_path))
+    with ApiEmulator(tags, rate_limit=2) as emulator:
+        options = options._replace(api_url=emulator.url)
+        first = TagFetcher(options).fetch("github", "owner", "repo", None, False)
+        second = TagFetcher(options).fetch("github", "owner", "repo", None, False)
+
+    assert first == second == tags
+    assert emulator.stats["ok"] == 2
+    assert emulator.stats["not_modified"] == 2
+
+
+def test_fetch_tags_retries_when_throttled() -> None:
+    """Verify 429 answers with Retry-After are retried."""
+    tags = [f"v{n}" for n in range(300, 0, -1)]
+    with ApiEmulator(tags, throttle_every=2) as emulator:
+        fetcher = TagFetcher(FetchOptions(api_url=emulator.url))
+        result = fetcher.fetch("gitlab", "owner", "repo", None, False)
+
+    assert result == tags
+    assert emulator.stats["throttled"] == 2
+
+
+def test_fetch_tags_no_retries() -> None:
+    """Verify retries of 0 reaches the fetcher and fails on the first throttle."""
+    tags = [f"v{n}" for n in range(300, 0, -1)]
+    module = MagicMock()
+    module.params = {
+        "provider": "gitlab",
+        "owner": "owner",
+        "repo": "repo",
+        "token": None,
+        "latest": False,
+        "per_page": 100,
+        "retries": 0,
+        "max_wait": 60,
+        "cache_dir": None,
+    }
+    with (
+        ApiEmulator(tags, throttle_every=2) as emulator,
+        patch(f"{MODULE}.AnsibleModule", return_value=module),
+    ):
+        module.params["api_url"] = emulator.url
+        main()
+
+    assert emulator.stats["throttled"] == 1
+    assert "after 1 attempts" in module.fail_json.call_args.kwargs["msg"]
+
+
+def test_fetch_tags_rate_limit_exceeds_max_wait() -> None:
+    """Verify an exhausted rate limit fails instead of waiting past max_wait."""
+    tags = [f"v{n}" for n in range(200, 0, -1)]
+    with ApiEmulator(tags, rate_limit=1, rate_window=3600) as emulator:
+        fetcher = TagFetcher(FetchOptions(api_url=emulator.url, max_wait=5))
+        result = fetcher.fetch("github", "owner", "repo", None, False)
+
+    assert isinstance(result, dict)
+    assert "longer than max_wait" in result["error"]
+    assert fetcher.requests == 2
@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+#
+# test_import_time.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+PACKAGE = "ansible_collections.jcook3701.utils.plugins.modules"
+BASIC = "ansible.module_utils.basic"
+
+# Dependencies that must only be imported on the code paths that use them
+DEFERRED = {"requests", "urllib3", "charset_normalizer", "idna", "yaml", "pstats"}
+
+
+def import_times(module: str) -> dict[str, int]:
+    """
+    Import `module` in a fresh interpreter with `-X importtime`.
+
+    Returns the cumulative import time in microseconds of every module loaded.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    times: dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self, cumulative, name = line.split(":", 1)[1].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize(
+    "module",
+    ["fetch_tags_module", "parse_tags_module", "dns_inventory_gen", "ansible_doc_gen"],
+)
+def test_module_import_is_lightweight(module: str) -> None:
+    """Verify heavy dependencies are deferred and start-up cost stays small."""
+    times = import_times(f"{PACKAGE}.{module}")
+
+    assert not DEFERRED & {name.split(".")[0] for name in times}
+    # The module's own imports must cost less than AnsibleModule itself
+    overhead = times[f"{PACKAGE}.{module}"] - times[BASIC]
+    assert overhead < times[BASIC], f"{module} adds {overhead}us of imports"
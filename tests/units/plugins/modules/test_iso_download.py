@@ -0,0 +1,215 @@
+#!/usr/bin/python3
+#
+# test_iso_download.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from ansible_collections.jcook3701.utils.plugins.module_utils.artifact_store import (
+    file_sha256,
+)
+from ansible_collections.jcook3701.utils.plugins.modules.iso_download import (
+    DownloadError,
+    RangeDownloader,
+    decode_bitmap,
+    encode_bitmap,
+    load_verified,
+    parse_sha256sums,
+    run_module,
+    save_verified,
+)
+
+MODULE = "ansible_collections.jcook3701.utils.plugins.modules.iso_download"
+
+MIB = 1024 * 1024
+
+# Mock image: 5.5 MiB of non-repeating data so misplaced chunks change the digest
+MOCK_IMAGE: bytes = b"".join(
+    i.to_bytes(4, "little") for i in range(int(5.5 * MIB) // 4)
+)
+MOCK_SHA256: str = hashlib.sha256(MOCK_IMAGE).hexdigest()
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves MOCK_IMAGE with byte range support."""
+
+    server: RangeServer
+
+    def do_GET(self) -> None:
+        self.server.requests += 1
+        header = self.headers.get("Range")
+        if not header or not self.server.ranges:
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(MOCK_IMAGE)))
+            self.end_headers()
+            self.wfile.write(MOCK_IMAGE)
+            return
+
+        start_text, end_text = header.removeprefix("bytes=").split("-")
+        start, end = int(start_text), int(end_text)
+        if start in self.server.fail_offsets:
+            self.send_error(500)
+            return
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(MOCK_IMAGE)}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("ETag", '"mock-image"')
+        self.end_headers()
+        self.wfile.write(MOCK_IMAGE[start : end + 1])
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+
+class RangeServer(ThreadingHTTPServer):
+    requests: int = 0
+    ranges: bool = True
+    fail_offsets: set[int]
+
+
+@pytest.fixture
+def server() -> Iterator[RangeServer]:
+    httpd = RangeServer(("127.0.0.1", 0), RangeHandler)
+    httpd.fail_offsets = set()
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url_of(server: RangeServer) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}/image.iso"
+
+
+def test_parallel_download(server: RangeServer, tmp_path: Path) -> None:
+    """Verify a ranged download reassembles the file and hashes it while streaming."""
+    dest = tmp_path / "image.iso"
+    downloader = RangeDownloader(
+        url_of(server), str(dest), connections=4, chunk_size=MIB
+    )
+
+    assert downloader.download(MOCK_SHA256) == MOCK_SHA256
+    assert dest.read_bytes() == MOCK_IMAGE
+    assert not Path(f"{dest}.part.json").exists()
+    # One probe plus one request per chunk
+    assert server.requests == 1 + 6
+
+
+def test_resume_after_failure(server: RangeServer, tmp_path: Path) -> None:
+    """Verify an interrupted download keeps its bitmap and resumes the missing chunks."""
+    dest = tmp_path / "image.iso"
+    server.fail_offsets = {3 * MIB}
+    first = RangeDownloader(
+        url_of(server), str(dest), connections=2, chunk_size=MIB, retries=1
+    )
+    with pytest.raises(DownloadError):
+        first.download(MOCK_SHA256)
+    assert Path(f"{dest}.part.json").exists()
+
+    server.fail_offsets = set()
+    server.requests = 0
+    second = RangeDownloader(url_of(server), str(dest), connections=2, chunk_size=MIB)
+
+    assert second.download(MOCK_SHA256) == MOCK_SHA256
+    assert second.resumed_chunks >= 3
+    assert server.requests == 1 + 6 - second.resumed_chunks
+    assert dest.read_bytes() == MOCK_IMAGE
+
+
+def test_checksum_mismatch(server: RangeServer, tmp_path: Path) -> None:
+    """Verify a wrong digest fails and removes the partial download."""
+    dest = tmp_path / "image.iso"
+    downloader = RangeDownloader(url_of(server), str(dest), chunk_size=MIB)
+
+    with pytest.raises(DownloadError, match="Checksum mismatch"):
+        downloader.download("0" * 64)
+    assert not dest.exists()
+    assert not os.path.exists(f"{dest}.part")
+
+
+def test_stream_fallback(server: RangeServer, tmp_path: Path) -> None:
+    """Verify servers without range support fall back to a single stream."""
+    server.ranges = False
+    dest = tmp_path / "image.iso"
+
+    assert (
+        RangeDownloader(url_of(server), str(dest)).download(MOCK_SHA256) == MOCK_SHA256
+    )
+    assert dest.read_bytes() == MOCK_IMAGE
+
+
+def test_parse_sha256sums() -> None:
+    """Verify GNU and BSD checksum file formats."""
+    sums = f"{'a' * 64}  other.iso\n{'B' * 64} *image.iso\n"
+    assert parse_sha256sums(sums, "image.iso") == "b" * 64
+    assert parse_sha256sums(f"SHA256 (image.iso) = {'c' * 64}", "image.iso") == "c" * 64
+    assert parse_sha256sums(sums, "missing.iso") is None
+
+
+def test_bitmap_round_trip() -> None:
+    """Verify the chunk bitmap survives encoding."""
+    done = [True, False, True, True, False, False, False, False, True]
+    assert decode_bitmap(encode_bitmap(done), len(done)) == done
+
+
+def test_verified_digest_invalidated_by_change(tmp_path: Path) -> None:
+    """Verify the recorded digest is dropped once the file size or mtime changes."""
+    dest = tmp_path / "image.iso"
+    dest.write_bytes(b"image")
+    save_verified(str(dest), "a" * 64)
+
+    assert load_verified(str(dest)) == "a" * 64
+
+    dest.write_bytes(b"other image")
+    assert load_verified(str(dest)) is None
+
+
+def test_existing_dest_not_hashed_again(tmp_path: Path) -> None:
+    """Verify an unchanged dest is only hashed on the first run."""
+    dest = tmp_path / "image.iso"
+    dest.write_bytes(b"image")
+    module = MagicMock()
+    module.check_mode = False
+    module.params = {
+        "url": "https://example.com/image.iso",
+        "dest": str(dest),
+        "checksum": hashlib.sha256(b"image").hexdigest(),
+        "force": False,
+    }
+    module.exit_json.side_effect = SystemExit
+
+    with (
+        patch(f"{MODULE}.AnsibleModule", return_value=module),
+        patch(f"{MODULE}.file_sha256", wraps=file_sha256) as hashed,
+    ):
+        for _ in range(2):
+            with pytest.raises(SystemExit):
+                run_module()
+
+    assert hashed.call_count == 1
+    assert module.exit_json.call_args.kwargs["sha256"] == module.params["checksum"]
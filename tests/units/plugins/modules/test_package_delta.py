@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+#
+# test_package_delta.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+# FQCN Import for the jcook3701.utils collection
+from ansible_collections.jcook3701.utils.plugins.modules.package_delta import (
+    main,
+    package_delta,
+    parse_dpkg_status,
+    parse_rpm_query,
+)
+
+MODULE = "ansible_collections.jcook3701.utils.plugins.modules.package_delta"
+
+STATUS = """\
+Package: bash
+Status: install ok installed
+Priority: required
+Architecture: amd64
+Version: 5.2.37-2
+Description: GNU Bourne Again SHell
+ Bash is an sh-compatible command language interpreter.
+ Version: 0.0 (continuation lines are ignored)
+
+Package: vim
+Status: deinstall ok config-files
+Architecture: amd64
+Version: 2:9.1.1230-2
+
+Package: libc6
+Status: install ok installed
+Architecture: i386
+Version: 2.41-12
+"""
+
+
+def test_parse_dpkg_status() -> None:
+    """Verify only installed stanzas are parsed and continuation lines ignored."""
+    packages = parse_dpkg_status(STATUS)
+    assert sorted(packages) == ["bash", "libc6"]
+    assert packages["bash"] == [
+        {"name": "bash", "version": "5.2.37-2", "arch": "amd64", "source": "apt"}
+    ]
+
+
+def test_parse_rpm_query() -> None:
+    """Verify rpm query output is parsed and multilib versions are grouped."""
+    packages = parse_rpm_query(
+        "bash\t0\t5.2.26\t3.fc41\tx86_64\n"
+        "glibc\t0\t2.40\t1.fc41\tx86_64\n"
+        "glibc\t0\t2.40\t1.fc41\ti686\n"
+    )
+    assert len(packages["glibc"]) == 2
+    assert packages["bash"][0]["release"] == "3.fc41"
+
+
+def test_package_delta() -> None:
+    """Verify added, removed and changed packages are reported."""
+    before: Any = {"a": [{"version": "1"}], "b": [{"version": "1"}]}
+    after: Any = {"b": [{"version": "2"}], "c": [{"version": "1"}]}
+    added, removed, changed = package_delta(before, after)
+    assert list(added) == ["c"]
+    assert list(removed) == ["a"]
+    assert changed == {"b": {"before": before["b"], "after": after["b"]}}
+
+
+def run(tmp_path: Path, **params: Any) -> dict[str, Any]:
+    mock_module_instance = MagicMock()
+    mock_module_instance.check_mode = False
+    mock_module_instance.params = {
+        "manager": "dpkg",
+        "snapshot_dir": str(tmp_path / "snapshots"),
+        "query": [],
+        "full": False,
+        **params,
+    }
+    with patch(f"{MODULE}.AnsibleModule", return_value=mock_module_instance):
+        main()
+    mock_module_instance.fail_json.assert_not_called()
+    kwargs: dict[str, Any] = mock_module_instance.exit_json.call_args[1]
+    return kwargs
+
+
+def test_main_reports_delta(tmp_path: Path) -> None:
+    """Test snapshots are reused until the status file changes."""
+    status = tmp_path / "status"
+    status.write_text(STATUS)
+
+    with patch(f"{MODULE}.DPKG_STATUS", str(status)):
+        first = run(tmp_path)
+        assert first["initialized"] is True
+        assert first["added"] == {}
+
+        with patch(f"{MODULE}.parse_dpkg_status") as parse:
+            second = run(tmp_path, query=["bash", "missing"])
+            parse.assert_not_called()
+        assert second["refreshed"] is False
+        assert list(second["packages"]) == ["bash"]
+
+        status.write_text(
+            STATUS.replace("5.2.37-2", "5.3-1") + "\nPackage: git\n"
+            "Status: install ok installed\nVersion: 2.47\n"
+        )
+        third = run(tmp_path, full=True)
+
+    assert third["refreshed"] is True
+    assert list(third["added"]) == ["git"]
+    assert third["changed_packages"]["bash"]["after"][0]["version"] == "5.3-1"
+    assert "git" in third["ansible_facts"]["packages"]
@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+#
+# test_user_facts.py for jcook3701.utils
+#
+# SPDX-FileCopyrightText: Jared Cook
+# SPDX-License-Identifier: AGPL-3.0-or-later
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import grp
+import pwd
+from unittest.mock import MagicMock, patch
+
+# FQCN Import for the jcook3701.utils collection
+from ansible_collections.jcook3701.utils.plugins.modules.user_facts import (
+    group_names,
+    interactive_users,
+    main,
+)
+
+MODULE = "ansible_collections.jcook3701.utils.plugins.modules.user_facts"
+
+PASSWD = [
+    pwd.struct_passwd(("root", "x", 0, 0, "root", "/root", "/bin/bash")),
+    pwd.struct_passwd(("daemon", "x", 1, 1, "", "/usr/sbin", "/usr/sbin/nologin")),
+    pwd.struct_passwd(("alice", "x", 1000, 1000, "", "/home/alice", "/bin/bash")),
+    pwd.struct_passwd(("svc", "x", 998, 998, "", "/home/svc", "/usr/sbin/nologin")),
+    pwd.struct_passwd(("bob", "x", 1001, 1001, "", "/home/bob", "/bin/zsh")),
+    pwd.struct_passwd(("alice", "x", 1000, 1000, "", "/home/alice", "/bin/bash")),
+]
+
+
+@patch(f"{MODULE}.pwd.getpwall", return_value=PASSWD)
+def test_interactive_users(_getpwall: MagicMock) -> None:
+    """Verify only users with a home directory and login shell are returned once."""
+    users = interactive_users("/home/", ["/bin/bash", "/bin/zsh"])
+    assert [user["name"] for user in users] == ["root", "alice", "bob"]
+    assert users[1] == {
+        "name": "alice",
+        "uid": 1000,
+        "gid": 1000,
+        "home": "/home/alice",
+        "shell": "/bin/bash",
+    }
+
+    users = interactive_users("/home/", ["/bin/zsh"], include_root=False)
+    assert [user["name"] for user in users] == ["bob"]
+
+
+@patch(f"{MODULE}.grp.getgrgid")
+@patch(f"{MODULE}.os.getgrouplist", return_value=[1000, 27, 4242])
+def test_group_names(_getgrouplist: MagicMock, getgrgid: MagicMock) -> None:
+    """Verify group ids are resolved to names, keeping unknown ids numeric."""
+    groups = {
+        1000: grp.struct_group(("alice", "x", 1000, [])),
+        27: grp.struct_group(("sudo", "x", 27, ["alice"])),
+    }
+
+    def lookup(gid: int) -> grp.struct_group:
+        return groups[gid]
+
+    getgrgid.side_effect = lookup
+    assert group_names("alice", 1000) == ["alice", "sudo", "4242"]
+
+
+@patch(f"{MODULE}.group_names", return_value=["alice", "sudo"])
+@patch(f"{MODULE}.pwd.getpwall", return_value=PASSWD)
+@patch(f"{MODULE}.pwd.getpwnam", return_value=PASSWD[2])
+@patch(f"{MODULE}.AnsibleModule")
+def test_main_success(mock_ansible_module: MagicMock, *_mocks: MagicMock) -> None:
+    """Test the sudo user and interactive users are returned in one call."""
+    mock_module_instance = MagicMock()
+    mock_module_instance.params = {
+        "user": "alice",
+        "interactive": True,
+        "home_prefix": "/home/",
+        "shells": ["/bin/bash"],
+        "include_root": True,
+    }
+    mock_ansible_module.return_value = mock_module_instance
+
+    main()
+
+    kwargs = mock_module_instance.exit_json.call_args[1]
+    assert kwargs["changed"] is False
+    assert kwargs["sudo_user"]["uid"] == 1000
+    assert kwargs["sudo_user"]["home"] == "/home/alice"
+    assert kwargs["sudo_user"]["groups"] == ["alice", "sudo"]
+    assert [user["name"] for user in kwargs["interactive_users"]] == ["root", "alice"]
+    assert kwargs["ansible_facts"] == {
+        "sudo_user": "alice",
+        "sudo_user_uid": 1000,
+        "sudo_user_gid": 1000,
+        "sudo_user_home": "/home/alice",
+        "sudo_user_groups": ["alice", "sudo"],
+    }
+
+
+@patch(f"{MODULE}.pwd.getpwnam", side_effect=KeyError("missing"))
+@patch(f"{MODULE}.AnsibleModule")
+def test_main_unknown_user(
+    mock_ansible_module: MagicMock, _getpwnam: MagicMock
+) -> None:
+    """Test module failure when the user does not exist."""
+    mock_module_instance = MagicMock()
+    mock_module_instance.params = {
+        "user": "missing",
+        "interactive": False,
+        "home_prefix": "/home/",
+        "shells": [],
+        "include_root": True,
+    }
+    mock_ansible_module.return_value = mock_module_instance
+
+    main()
+
+    mock_module_instance.fail_json.assert_called_once()
+    assert (
+        "missing does not exist" in mock_module_instance.fail_json.call_args[1]["msg"]
+    )